@@ -0,0 +1 @@
+"""Бенчмарки производительности (запуск: python -m benchmarks.<name>)."""
@@ -0,0 +1,129 @@
+"""Бенчмарк пропускной способности API: ресурсы на запрос против общих из lifespan.
+
+Режим per-request воспроизводит прежнее поведение get_chat_manager: на каждый
+запрос создаются Config (чтение .env), Database (новый пул) и LLMClient
+(новый HTTP клиент). Режим lifespan использует ресурсы из app.state.
+Нагрузка - GET /api/chat/history/{session_id} (чтение из БД без вызова LLM),
+запросы идут через ASGI транспорт httpx без сетевого стека.
+
+Запуск:
+    DATABASE_URL=postgresql://... python -m benchmarks.api_throughput
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+
+from src.api.app import app
+from src.api.chat import get_chat_manager
+from src.chat_manager import ChatManager
+from src.config import Config
+from src.database import Database
+from src.llm_client import LLMClient
+from src.migrations import run_migrations
+
+# Обязательные параметры Config, не влияющие на бенчмарк (LLM не вызывается)
+PLACEHOLDER_ENV = {
+    "TELEGRAM_BOT_TOKEN": "benchmark",
+    "OPENROUTER_API_KEY": "benchmark",
+    "OPENROUTER_MODEL": "benchmark",
+    "SYSTEM_PROMPT": "benchmark",
+}
+
+BENCH_SESSION_ID = "benchmark-api-throughput"
+
+
+async def per_request_chat_manager() -> AsyncIterator[ChatManager]:
+    """Прежняя реализация get_chat_manager: все ресурсы создаются на каждый запрос.
+
+    Yields:
+        ChatManager: Экземпляр менеджера чата
+    """
+    config = Config()
+    database = Database(
+        config.database_url,
+        config.database_timeout,
+        pool_min_size=config.database_pool_min_size,
+        pool_max_size=config.database_pool_max_size,
+        pool_max_idle=config.database_pool_max_idle,
+    )
+    llm_client = LLMClient(config)
+
+    try:
+        yield ChatManager(database, llm_client)
+    finally:
+        await database.close()
+
+
+async def run_load(concurrency: int, duration: float) -> tuple[int, int]:
+    """Отправка запросов несколькими воркерами в течение duration секунд.
+
+    Args:
+        concurrency: Количество параллельных воркеров
+        duration: Длительность замера в секундах
+
+    Returns:
+        Количество успешных и неуспешных запросов
+    """
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.perf_counter() + duration
+    ok = failed = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker() -> None:
+            nonlocal ok, failed
+            while time.perf_counter() < deadline:
+                response = await client.get(f"/api/chat/history/{BENCH_SESSION_ID}?limit=10")
+                if response.status_code == 200:
+                    ok += 1
+                else:
+                    failed += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return ok, failed
+
+
+async def main(concurrency: int, duration: float) -> None:
+    """Запуск бенчмарка в обоих режимах.
+
+    Args:
+        concurrency: Количество параллельных воркеров
+        duration: Длительность замера каждого режима в секундах
+    """
+    load_dotenv()
+    for name, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ.setdefault("USE_REAL_STATS", "false")
+
+    database = Database(os.environ["DATABASE_URL"], timeout=30)
+    await run_migrations(database)
+    await database.close()
+
+    print(f"GET /api/chat/history, concurrency={concurrency}, {duration:.0f}s per mode")
+    print(f"{'mode':>12} {'requests':>10} {'errors':>8} {'req/s':>10}")
+    async with app.router.lifespan_context(app):
+        for mode in ("per-request", "lifespan"):
+            if mode == "per-request":
+                app.dependency_overrides[get_chat_manager] = per_request_chat_manager
+            else:
+                app.dependency_overrides.clear()
+
+            # Прогрев
+            await run_load(concurrency, 1.0)
+            ok, failed = await run_load(concurrency, duration)
+            print(f"{mode:>12} {ok:>10} {failed:>8} {ok / duration:>10.1f}")
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10, help="Параллельных запросов")
+    parser.add_argument("--duration", type=float, default=10.0, help="Секунд на режим")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.duration))
@@ -0,0 +1,126 @@
+"""Бенчмарк латентности Database.get_history в зависимости от объема истории.
+
+Для одного пользователя последовательно создается 1k, 10k и 100k сообщений,
+после чего замеряется время чтения последних N сообщений. С индексом
+idx_messages_history латентность не должна расти вместе с историей.
+
+Запуск:
+    DATABASE_URL=postgresql://... python -m benchmarks.history_latency
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from src.database import Database
+from src.migrations import run_migrations
+
+# ID чата и пользователя, которые не пересекаются с реальными данными
+BENCH_CHAT_ID = -900_000_001
+BENCH_USER_ID = -900_000_001
+
+HISTORY_SIZES = (1_000, 10_000, 100_000)
+
+
+async def seed_messages(database: Database, total: int) -> None:
+    """Дозаполнение истории тестового пользователя до total сообщений.
+
+    Args:
+        database: Экземпляр Database
+        total: Требуемое количество сообщений
+    """
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            "SELECT COUNT(*) AS cnt FROM messages WHERE chat_id = %s AND user_id = %s",
+            (BENCH_CHAT_ID, BENCH_USER_ID),
+        )
+        row = await cur.fetchone()
+        existing = row["cnt"] if row else 0
+
+        await cur.execute(
+            """
+            INSERT INTO messages (chat_id, user_id, role, content, character_count, created_at)
+            SELECT %s, %s,
+                   CASE WHEN i %% 2 = 0 THEN 'user' ELSE 'assistant' END,
+                   'Benchmark message ' || i, 18 + length(i::text),
+                   NOW() - make_interval(secs => %s::int - i)
+            FROM generate_series(%s::int, %s::int) AS i
+            """,
+            (BENCH_CHAT_ID, BENCH_USER_ID, total, existing + 1, total),
+        )
+        await cur.execute("ANALYZE messages")
+
+
+async def measure(database: Database, limit: int, iterations: int) -> list[float]:
+    """Замер латентности get_history.
+
+    Args:
+        database: Экземпляр Database
+        limit: Количество последних сообщений
+        iterations: Количество замеров
+
+    Returns:
+        Латентности в миллисекундах
+    """
+    # Прогрев пула и кеша страниц
+    await database.get_history(BENCH_CHAT_ID, BENCH_USER_ID, limit)
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await database.get_history(BENCH_CHAT_ID, BENCH_USER_ID, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def cleanup(database: Database) -> None:
+    """Удаление тестового пользователя и его сообщений.
+
+    Args:
+        database: Экземпляр Database
+    """
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("DELETE FROM users WHERE user_id = %s", (BENCH_USER_ID,))
+
+
+async def main(limit: int, iterations: int) -> None:
+    """Запуск бенчмарка.
+
+    Args:
+        limit: Количество последних сообщений
+        iterations: Количество замеров на каждый объем истории
+    """
+    load_dotenv()
+    database = Database(os.environ["DATABASE_URL"], timeout=30)
+    await run_migrations(database)
+    try:
+        await cleanup(database)
+        await database.upsert_user(
+            BENCH_USER_ID, None, "Benchmark", None, None, is_premium=False, is_bot=False
+        )
+
+        print(f"get_history(limit={limit}), {iterations} iterations")
+        print(f"{'messages':>10} {'p50, ms':>10} {'p95, ms':>10} {'max, ms':>10}")
+        for size in HISTORY_SIZES:
+            await seed_messages(database, size)
+            timings = sorted(await measure(database, limit, iterations))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(
+                f"{size:>10} {statistics.median(timings):>10.2f} "
+                f"{p95:>10.2f} {timings[-1]:>10.2f}"
+            )
+    finally:
+        await cleanup(database)
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=10, help="Количество сообщений")
+    parser.add_argument("--iterations", type=int, default=200, help="Замеров на объем")
+    args = parser.parse_args()
+    asyncio.run(main(args.limit, args.iterations))
@@ -0,0 +1,185 @@
+"""Бенчмарк пропускной способности параллельной записи в messages.
+
+workers параллельных соединений вставляют по одному сообщению в транзакции
+(как Database.add_message) в течение duration секунд, каждое от своего
+пользователя. --work-ms добавляет ожидание внутри транзакции после вставки:
+так моделируется транзакция, которая делает что-то еще после записи
+сообщения, и видно, сколько держатся блокировки, взятые триггерами
+агрегатов. --no-rollups отключает триггеры на соединениях бенчмарка
+(session_replication_role = replica, нужен суперпользователь) - это базовая
+линия без агрегатов. После замера показывается время свертки накопленных
+изменений агрегатов (stats_fold_deltas). Статистика и свертка общие для
+всей БД, поэтому DATABASE_URL должен указывать на отдельную базу для
+бенчмарка.
+
+Запуск:
+    DATABASE_URL=postgresql://... python -m benchmarks.insert_concurrency
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.database import Database
+from src.migrations import run_migrations
+
+# Пользователи бенчмарка: user_id от BENCH_USER_ID_BASE - 1 вниз
+BENCH_USER_ID_BASE = -900_000_000
+
+
+async def worker(
+    database: Database, user_id: int, deadline: float, work_ms: float, no_rollups: bool
+) -> int:
+    """Вставка сообщений до deadline на одном соединении.
+
+    Args:
+        database: Экземпляр Database
+        user_id: Пользователь (и чат) сообщений
+        deadline: Момент окончания замера по time.perf_counter()
+        work_ms: Ожидание внутри транзакции после вставки, мс
+        no_rollups: Отключить триггеры агрегатов на соединении
+
+    Returns:
+        Количество зафиксированных транзакций
+    """
+    committed = 0
+    async with database.connection() as conn, conn.cursor() as cur:
+        if no_rollups:
+            await cur.execute("SET session_replication_role = replica")
+            await conn.commit()
+        while time.perf_counter() < deadline:
+            await cur.execute(
+                """
+                INSERT INTO messages (chat_id, user_id, role, content, character_count)
+                VALUES (%s, %s, %s, 'Benchmark message', 17)
+                """,
+                (user_id, user_id, "user" if committed % 2 == 0 else "assistant"),
+            )
+            if work_ms > 0:
+                await cur.execute("SELECT pg_sleep(%s)", (work_ms / 1000,))
+            await conn.commit()
+            committed += 1
+        if no_rollups:
+            await cur.execute("RESET session_replication_role")
+            await conn.commit()
+    return committed
+
+
+async def measure(
+    database: Database, workers: int, duration: float, work_ms: float, no_rollups: bool
+) -> float:
+    """Замер транзакций в секунду при workers параллельных соединениях.
+
+    Args:
+        database: Экземпляр Database
+        workers: Количество параллельных соединений
+        duration: Длительность замера, секунды
+        work_ms: Ожидание внутри транзакции после вставки, мс
+        no_rollups: Отключить триггеры агрегатов
+
+    Returns:
+        Транзакций в секунду
+    """
+    started = time.perf_counter()
+    counts = await asyncio.gather(
+        *(
+            worker(database, BENCH_USER_ID_BASE - i, started + duration, work_ms, no_rollups)
+            for i in range(1, workers + 1)
+        )
+    )
+    return sum(counts) / (time.perf_counter() - started)
+
+
+async def fold(database: Database) -> float:
+    """Свертка накопленных изменений агрегатов.
+
+    Args:
+        database: Экземпляр Database
+
+    Returns:
+        Время свертки в миллисекундах
+    """
+    started = time.perf_counter()
+    async with database.connection() as conn:
+        await conn.execute("SELECT stats_fold_deltas()")
+    return (time.perf_counter() - started) * 1000
+
+
+async def main(
+    concurrency: list[int], work_ms: list[float], duration: float, no_rollups: bool
+) -> None:
+    """Запуск бенчмарка.
+
+    Args:
+        concurrency: Варианты количества параллельных соединений
+        work_ms: Варианты ожидания внутри транзакции, мс
+        duration: Длительность одного замера, секунды
+        no_rollups: Отключить триггеры агрегатов
+    """
+    load_dotenv()
+    database = Database(
+        os.environ["DATABASE_URL"],
+        timeout=30,
+        pool_min_size=max(concurrency),
+        pool_max_size=max(concurrency),
+    )
+    await run_migrations(database)
+    try:
+        async with database.connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO users (user_id, username, first_name, language_code)
+                SELECT %(base)s - i, 'insert_bench_' || i, 'Benchmark', 'en'
+                FROM generate_series(1, %(users)s) AS i
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                {"base": BENCH_USER_ID_BASE, "users": max(concurrency)},
+            )
+        await fold(database)
+
+        mode = "without rollup triggers" if no_rollups else "with rollup triggers"
+        print(f"INSERT INTO messages, {duration:.0f} s per run, {mode}")
+        print(f"{'workers':>8} {'work, ms':>9} {'tx/s':>9} {'fold, ms':>9}")
+        for workers in concurrency:
+            for work in work_ms:
+                tps = await measure(database, workers, duration, work, no_rollups)
+                fold_ms = await fold(database)
+                print(f"{workers:>8} {work:>9.1f} {tps:>9.0f} {fold_ms:>9.1f}")
+    finally:
+        # Сообщения удаляются в том же режиме триггеров, в котором
+        # вставлялись, иначе агрегаты вычтут строки, которые в них не попадали
+        async with database.connection() as conn:
+            if no_rollups:
+                await conn.execute("SET LOCAL session_replication_role = replica")
+            await conn.execute("DELETE FROM messages WHERE user_id < %s", (BENCH_USER_ID_BASE,))
+        async with database.connection() as conn:
+            await conn.execute("DELETE FROM users WHERE user_id < %s", (BENCH_USER_ID_BASE,))
+        await fold(database)
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[16, 32],
+        help="Количество параллельных соединений",
+    )
+    parser.add_argument(
+        "--work-ms",
+        type=float,
+        nargs="+",
+        default=[0.0, 2.0],
+        help="Ожидание внутри транзакции после вставки, мс",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность замера, с")
+    parser.add_argument(
+        "--no-rollups", action="store_true", help="Отключить триггеры агрегатов (базовая линия)"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.work_ms, args.duration, args.no_rollups))
@@ -0,0 +1,330 @@
+"""Бенчмарк HTTP транспорта LLMClient против локального stub-сервера OpenRouter.
+
+Stub-сервер отвечает на POST /chat/completions фиксированным ответом через
+stub_delay секунд по TLS (самоподписанный сертификат, нужен openssl) и
+поддерживает HTTP/1.1 и HTTP/2 (выбор через ALPN). Режимы:
+- per-request: новый AsyncOpenAI с настройками SDK по умолчанию на каждый
+  запрос (прежнее поведение веб-API): TLS handshake на каждый запрос;
+- shared-http1: один AsyncOpenAI с настройками SDK по умолчанию на процесс
+  (HTTP/1.1, keep-alive), без прогрева;
+- tuned-http1: LLMClient с общим клиентом create_llm_http_client и
+  прогревом warm-up, но с LLM_HTTP2=false;
+- tuned: LLMClient с общим клиентом create_llm_http_client (HTTP/2, пул
+  keep-alive, отдельный connect timeout) и прогревом warm-up.
+
+Для каждого режима выводится латентность первого запроса, p50/p95,
+пропускная способность и количество TLS соединений, принятых сервером.
+
+Запуск:
+    python -m benchmarks.llm_transport
+"""
+
+import argparse
+import asyncio
+import json
+import ssl
+import subprocess
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import h2.config
+import h2.connection
+import h2.events
+import h11
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from src.config import Config
+from src.llm_client import LLMClient
+from src.llm_http_client import create_llm_http_client
+
+COMPLETION = json.dumps(
+    {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub/model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+    }
+).encode()
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+class StubServer:
+    """TLS сервер, имитирующий /chat/completions по HTTP/1.1 и HTTP/2."""
+
+    def __init__(self, cert_dir: Path, delay: float) -> None:
+        """Инициализация сервера.
+
+        Args:
+            cert_dir: Каталог для самоподписанного сертификата
+            delay: Задержка ответа в секундах (время генерации)
+        """
+        self.delay = delay
+        self.cert = cert_dir / "cert.pem"
+        key = cert_dir / "key.pem"
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                "-keyout", str(key), "-out", str(self.cert), "-days", "1",
+                "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+            ],
+            check=True,
+            capture_output=True,
+        )  # fmt: skip
+        self.server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.server_context.load_cert_chain(self.cert, key)
+        self.server_context.set_alpn_protocols(["h2", "http/1.1"])
+        self.connections = 0
+        self.port = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL API сервера."""
+        return f"https://localhost:{self.port}/api/v1"
+
+    def client_context(self) -> ssl.SSLContext:
+        """SSL контекст клиента, доверяющий сертификату сервера."""
+        return ssl.create_default_context(cafile=str(self.cert))
+
+    async def start(self) -> None:
+        """Запуск сервера на свободном порту."""
+        self._server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0, ssl=self.server_context
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Остановка сервера."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка соединения по протоколу, выбранному через ALPN."""
+        self.connections += 1
+        ssl_object = writer.get_extra_info("ssl_object")
+        try:
+            if ssl_object is not None and ssl_object.selected_alpn_protocol() == "h2":
+                await self._serve_h2(reader, writer)
+            else:
+                await self._serve_http1(reader, writer)
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_http1(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Обработка keep-alive соединения HTTP/1.1."""
+        connection = h11.Connection(h11.SERVER)
+        method = b""
+        while True:
+            event = connection.next_event()
+            if event is h11.NEED_DATA:
+                connection.receive_data(await reader.read(65536))
+            elif isinstance(event, h11.Request):
+                method = event.method
+            elif isinstance(event, h11.EndOfMessage):
+                await asyncio.sleep(self.delay)
+                headers = [
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(COMPLETION))),
+                ]
+                writer.write(connection.send(h11.Response(status_code=200, headers=headers)))
+                if method != b"HEAD":
+                    writer.write(connection.send(h11.Data(data=COMPLETION)))
+                writer.write(connection.send(h11.EndOfMessage()))
+                await writer.drain()
+                if connection.our_state is not h11.DONE or connection.their_state is not h11.DONE:
+                    return
+                connection.start_next_cycle()
+            elif isinstance(event, h11.ConnectionClosed) or event is h11.PAUSED:
+                return
+
+    async def _serve_h2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка соединения HTTP/2: потоки обслуживаются параллельно."""
+        connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        methods: dict[int, str] = {}
+        tasks: set[asyncio.Task[None]] = set()
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(self.delay)
+            headers = [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(COMPLETION))),
+            ]
+            if methods.pop(stream_id) == "HEAD":
+                connection.send_headers(stream_id, headers, end_stream=True)
+            else:
+                connection.send_headers(stream_id, headers)
+                connection.send_data(stream_id, COMPLETION, end_stream=True)
+            writer.write(connection.data_to_send())
+
+        while data := await reader.read(65536):
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    methods[event.stream_id] = dict(event.headers)[":method"]
+                elif isinstance(event, h2.events.DataReceived):
+                    connection.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    task = asyncio.create_task(respond(event.stream_id))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            writer.write(connection.data_to_send())
+            await writer.drain()
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    """Перцентиль латентности в миллисекундах."""
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000
+
+
+async def run_load(
+    send: Callable[[], Awaitable[None]], requests: int, concurrency: int
+) -> tuple[list[float], float]:
+    """Отправка requests запросов concurrency воркерами.
+
+    Args:
+        send: Функция, выполняющая один запрос
+        requests: Общее количество запросов
+        concurrency: Количество параллельных воркеров
+
+    Returns:
+        Латентности запросов в секундах и общее время в секундах
+    """
+    latencies: list[float] = []
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+async def main(requests: int, concurrency: int, stub_delay: float) -> None:
+    """Запуск бенчмарка во всех режимах.
+
+    Args:
+        requests: Количество запросов на режим
+        concurrency: Количество параллельных запросов
+        stub_delay: Задержка ответа stub-сервера в секундах
+    """
+    with tempfile.TemporaryDirectory() as cert_dir:
+        server = StubServer(Path(cert_dir), stub_delay)
+        await server.start()
+        verify = server.client_context()
+        config = Config(
+            telegram_bot_token="benchmark",
+            openrouter_api_key="benchmark",
+            openrouter_model="stub/model",
+            system_prompt="benchmark",
+            openrouter_base_url=server.base_url,
+            llm_response_cache_backend="none",
+            llm_max_concurrent=0,
+        )
+
+        async def per_request() -> None:
+            client = AsyncOpenAI(
+                base_url=server.base_url,
+                api_key="benchmark",
+                http_client=DefaultAsyncHttpxClient(verify=verify),
+            )
+            try:
+                await client.chat.completions.create(model="stub/model", messages=MESSAGES)  # type: ignore[arg-type]
+            finally:
+                await client.close()
+
+        shared = AsyncOpenAI(
+            base_url=server.base_url,
+            api_key="benchmark",
+            http_client=DefaultAsyncHttpxClient(verify=verify),
+        )
+
+        async def shared_http1() -> None:
+            await shared.chat.completions.create(model="stub/model", messages=MESSAGES)  # type: ignore[arg-type]
+
+        http_client = create_llm_http_client(config, verify=verify)
+        llm_client = LLMClient(config, http_client=http_client)
+        http1_config = config.model_copy(update={"llm_http2": False})
+        http1_client = create_llm_http_client(http1_config, verify=verify)
+        llm_client_http1 = LLMClient(http1_config, http_client=http1_client)
+
+        async def tuned() -> None:
+            await llm_client.get_completion(MESSAGES, cache=False)
+
+        async def tuned_http1() -> None:
+            await llm_client_http1.get_completion(MESSAGES, cache=False)
+
+        print(
+            f"POST /chat/completions, {requests} requests, concurrency={concurrency}, "
+            f"stub delay {stub_delay * 1000:.0f}ms"
+        )
+        print(
+            f"{'mode':>13} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'req/s':>8} {'TLS conns':>10}"
+        )
+        modes: list[tuple[str, Callable[[], Awaitable[None]]]] = [
+            ("per-request", per_request),
+            ("shared-http1", shared_http1),
+            ("tuned-http1", tuned_http1),
+            ("tuned", tuned),
+        ]
+        for mode, send in modes:
+            # Соединения прогрева тоже учитываются
+            server.connections = 0
+            if mode == "tuned-http1":
+                await llm_client_http1.warm_up()
+            elif mode == "tuned":
+                await llm_client.warm_up()
+            first, _ = await run_load(send, 1, 1)
+            latencies, elapsed = await run_load(send, requests, concurrency)
+            print(
+                f"{mode:>13} {first[0] * 1000:>9.1f} {percentile(latencies, 50):>8.1f} "
+                f"{percentile(latencies, 95):>8.1f} {requests / elapsed:>8.1f} "
+                f"{server.connections:>10}"
+            )
+
+        await shared.close()
+        await http_client.aclose()
+        await http1_client.aclose()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Запросов на режим")
+    parser.add_argument("--concurrency", type=int, default=20, help="Параллельных запросов")
+    parser.add_argument(
+        "--stub-delay", type=float, default=0.02, help="Задержка ответа stub-сервера (сек)"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.stub_delay))
@@ -0,0 +1,162 @@
+"""Бенчмарк латентности RealStatCollector.get_dashboard_stats на большом объеме данных.
+
+Создаются users пользователей (10% ботов, 20% Premium, несколько языков) и
+messages сообщений, равномерно распределенных по последним 90 дням (5%
+помечены удаленными). Данные создаются один раз и переиспользуются
+следующими запусками с теми же параметрами; --cleanup удаляет их после замера.
+Статистика считается по всей БД, поэтому DATABASE_URL должен указывать на
+отдельную базу для бенчмарка.
+
+Запуск:
+    DATABASE_URL=postgresql://... python -m benchmarks.stats_latency
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from src.database import Database
+from src.migrations import run_migrations
+from src.stats.real_collector import RealStatCollector
+
+# Пользователи бенчмарка: user_id от BENCH_USER_ID_BASE - 1 вниз
+BENCH_USER_ID_BASE = -800_000_000
+
+# Сообщения вставляются пакетами, чтобы не держать одну огромную транзакцию
+SEED_BATCH = 1_000_000
+
+
+async def seed(database: Database, users: int, messages: int) -> None:
+    """Дозаполнение данных бенчмарка до users пользователей и messages сообщений.
+
+    Args:
+        database: Экземпляр Database
+        users: Количество пользователей
+        messages: Количество сообщений
+    """
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            """
+            INSERT INTO users (user_id, username, first_name, language_code, is_premium, is_bot)
+            SELECT %(base)s - i, 'bench_' || i, 'Benchmark',
+                   (ARRAY['ru', 'en', 'de', 'fr', NULL])[1 + i %% 5],
+                   i %% 5 = 0, i %% 10 = 0
+            FROM generate_series(1, %(users)s) AS i
+            ON CONFLICT (user_id) DO NOTHING
+            """,
+            {"base": BENCH_USER_ID_BASE, "users": users},
+        )
+        await cur.execute(
+            "SELECT COUNT(*) AS cnt FROM messages WHERE user_id < %s", (BENCH_USER_ID_BASE,)
+        )
+        row = await cur.fetchone()
+        existing = row["cnt"] if row else 0
+        await conn.commit()
+
+        for start in range(existing + 1, messages + 1, SEED_BATCH):
+            end = min(start + SEED_BATCH - 1, messages)
+            await cur.execute(
+                """
+                INSERT INTO messages (
+                    chat_id, user_id, role, content, character_count,
+                    token_count, prompt_tokens, completion_tokens, created_at, deleted_at
+                )
+                SELECT %(base)s - u, %(base)s - u,
+                       CASE WHEN i %% 2 = 0 THEN 'user' ELSE 'assistant' END,
+                       'Benchmark message', 17 + i %% 200, 5 + i %% 50,
+                       CASE WHEN i %% 2 = 1 THEN 100 + i %% 900 END,
+                       CASE WHEN i %% 2 = 1 THEN 5 + i %% 50 END,
+                       created_at,
+                       CASE WHEN i %% 20 = 0 THEN created_at END
+                FROM generate_series(%(start)s::bigint, %(end)s::bigint) AS i,
+                     LATERAL (SELECT 1 + (i * 7919) %% %(users)s AS u) AS picked,
+                     LATERAL (
+                         SELECT NOW() - make_interval(secs => (i * 104729) %% 7776000) AS created_at
+                     ) AS ts
+                """,
+                {"base": BENCH_USER_ID_BASE, "users": users, "start": start, "end": end},
+            )
+            await conn.commit()
+            print(f"seeded {end:,} / {messages:,} messages")
+    # VACUUM нельзя выполнить внутри транзакции
+    async with database.connection() as conn:
+        await conn.set_autocommit(True)
+        await conn.execute("VACUUM ANALYZE users")
+        await conn.execute("VACUUM ANALYZE messages")
+
+
+async def measure(collector: RealStatCollector, iterations: int) -> list[float]:
+    """Замер латентности get_dashboard_stats.
+
+    Args:
+        collector: Сборщик статистики
+        iterations: Количество замеров
+
+    Returns:
+        Латентности в миллисекундах
+    """
+    # Прогрев пула и кеша страниц
+    await collector.get_dashboard_stats()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await collector.get_dashboard_stats()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def cleanup(database: Database) -> None:
+    """Удаление пользователей бенчмарка (сообщения удаляются каскадно).
+
+    Args:
+        database: Экземпляр Database
+    """
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("DELETE FROM users WHERE user_id < %s", (BENCH_USER_ID_BASE,))
+        await conn.commit()
+
+
+async def main(users: int, messages: int, iterations: int, remove: bool) -> None:
+    """Запуск бенчмарка.
+
+    Args:
+        users: Количество пользователей
+        messages: Количество сообщений
+        iterations: Количество замеров
+        remove: Удалить данные бенчмарка после замера
+    """
+    load_dotenv()
+    database = Database(os.environ["DATABASE_URL"], timeout=30, pool_min_size=2)
+    await run_migrations(database)
+    try:
+        await seed(database, users, messages)
+        timings = sorted(await measure(RealStatCollector(database), iterations))
+        print(
+            f"get_dashboard_stats, {users:,} users, {messages:,} messages, {iterations} iterations"
+        )
+        print(f"{'p50, ms':>10} {'mean, ms':>10} {'max, ms':>10}")
+        print(
+            f"{statistics.median(timings):>10.1f} {statistics.mean(timings):>10.1f} "
+            f"{timings[-1]:>10.1f}"
+        )
+    finally:
+        if remove:
+            await cleanup(database)
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000, help="Количество пользователей")
+    parser.add_argument("--messages", type=int, default=10_000_000, help="Количество сообщений")
+    parser.add_argument("--iterations", type=int, default=10, help="Количество замеров")
+    parser.add_argument(
+        "--cleanup", action="store_true", help="Удалить данные бенчмарка после замера"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.messages, args.iterations, args.cleanup))
@@ -84,7 +84,7 @@ export function DashboardClient({ stats }: DashboardClientProps) {
             </div>
 
             {/* Additional Stats Row */}
-            <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-3">
+            <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-4">
                 <StatsCard
                     title="Средняя длина"
                     value={`${stats.messages.avg_length.toFixed(0)} символов`}
@@ -103,6 +103,14 @@ export function DashboardClient({ stats }: DashboardClientProps) {
                     description="Сообщений пользователь/бот"
                     icon={<Clock className="h-4 w-4 text-muted-foreground" />}
                 />
+                <StatsCard
+                    title="Токены LLM"
+                    value={(
+                        stats.messages.prompt_tokens + stats.messages.completion_tokens
+                    ).toLocaleString('en-US')}
+                    description={`${stats.messages.prompt_tokens.toLocaleString('en-US')} промпт / ${stats.messages.completion_tokens.toLocaleString('en-US')} ответ`}
+                    icon={<BarChart3 className="h-4 w-4 text-muted-foreground" />}
+                />
             </div>
 
             {/* Period Filter and Activity Chart */}
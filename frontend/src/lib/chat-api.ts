@@ -3,6 +3,7 @@ import type {
     ChatMessageRequest,
     ChatMessageResponse,
     ChatMode,
+    ChatStreamEvent,
 } from '@/types/chat'
 
 // Для server-side запросов используем API_URL (внутренний Docker network)
@@ -45,6 +46,61 @@ export async function sendChatMessage(
     return response.json()
 }
 
+// Потоковая отправка сообщения: onEvent вызывается для каждого SSE события
+export async function streamChatMessage(
+    message: string,
+    sessionId: string,
+    mode: ChatMode = 'normal',
+    onEvent: (event: ChatStreamEvent) => void
+): Promise<void> {
+    const request: ChatMessageRequest = {
+        message,
+        session_id: sessionId,
+        mode,
+    }
+
+    const response = await fetch(`${API_URL}/api/chat/message/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+        },
+        body: JSON.stringify(request),
+    })
+
+    if (!response.ok || !response.body) {
+        const error = await response.text()
+        throw new Error(`Failed to send message: ${error}`)
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+
+    while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+
+        // События разделены пустой строкой
+        let separator = buffer.indexOf('\n\n')
+        while (separator !== -1) {
+            const block = buffer.slice(0, separator)
+            buffer = buffer.slice(separator + 2)
+            separator = buffer.indexOf('\n\n')
+
+            let event = ''
+            let data = ''
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7)
+                else if (line.startsWith('data: ')) data += line.slice(6)
+            }
+            if (event && data) {
+                onEvent({ event, data: JSON.parse(data) } as ChatStreamEvent)
+            }
+        }
+    }
+}
+
 export async function getChatHistory(
     sessionId: string,
     limit: number = 50
@@ -41,3 +41,10 @@ export interface ChatHistoryResponse {
     session_id: string
 }
 
+// Событие SSE потока POST /api/chat/message/stream
+export type ChatStreamEvent =
+    | { event: 'sql'; data: { sql_query: string } }
+    | { event: 'rows'; data: { row_count: number } }
+    | { event: 'token'; data: { content: string } }
+    | { event: 'done'; data: { response: string; sql_query: string | null } }
+    | { event: 'error'; data: { detail: string } }
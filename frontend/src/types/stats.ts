@@ -24,11 +24,16 @@ export interface MessageStats {
     first_message_date: string
     last_message_date: string
     user_to_assistant_ratio: number
+    avg_tokens: number
+    total_tokens: number
+    prompt_tokens: number
+    completion_tokens: number
 }
 
 export interface MetadataStats {
     generated_at: string
     is_mock: boolean
+    cache_age_seconds: number
 }
 
 export interface DashboardStats {
@@ -0,0 +1,10 @@
+-- Индекс для чтения последних N сообщений диалога (Database.get_history)
+-- Частичный индекс покрывает фильтр deleted_at IS NULL и порядок выборки,
+-- поэтому запрос с LIMIT читает только N последних записей без сортировки
+-- всей истории пользователя. id добавлен как tie-breaker для сообщений,
+-- записанных в одной транзакции (одинаковый created_at).
+-- content не включается в INCLUDE: длинные сообщения превышают
+-- максимальный размер строки btree-индекса и ломали бы INSERT.
+CREATE INDEX IF NOT EXISTS idx_messages_history
+    ON messages (chat_id, user_id, created_at DESC, id DESC)
+    WHERE deleted_at IS NULL;
@@ -0,0 +1,9 @@
+-- Количество токенов сообщений
+-- token_count - токены текста сообщения (для user - локальный токенизатор,
+--               для assistant - completion_tokens из ответа API)
+-- prompt_tokens / completion_tokens - usage запроса к LLM, которым получен
+--               ответ ассистента (только для role = 'assistant')
+-- Для сообщений, сохраненных до миграции, значения остаются NULL
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS token_count INTEGER NULL;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER NULL;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS completion_tokens INTEGER NULL;
@@ -0,0 +1,12 @@
+-- Migration: Create llm_response_cache table
+-- Description: Shared cache of deterministic LLM responses (PostgresResponseCache)
+
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    cache_key CHAR(64) PRIMARY KEY,  -- SHA-256 of model, parameters and messages
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Index for size cap pruning (oldest entries first)
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_created ON llm_response_cache (created_at);
@@ -0,0 +1,267 @@
+-- Дневные агрегаты для дашборда (RealStatCollector)
+-- Statement-level триггеры на messages и users не изменяют агрегаты, а
+-- дописывают изменения в таблицы *_delta: обычный INSERT не блокирует строки,
+-- поэтому параллельная запись сообщений не выстраивается в очередь на строке
+-- агрегата текущего дня. stats_fold_deltas() переносит изменения в агрегаты;
+-- ее вызывают RealStatCollector перед чтением и периодически RollupFolder,
+-- поэтому статистика не сканирует messages целиком и всегда точна.
+-- Учитываются только неудаленные сообщения (deleted_at IS NULL): soft delete,
+-- восстановление, изменение строки и удаление пользователя (каскадом)
+-- вычитают старую версию строки и добавляют новую.
+
+DO $$
+BEGIN
+    IF to_regclass('message_daily_stats') IS NULL THEN
+        -- Сообщения за день по ролям
+        CREATE TABLE message_daily_stats (
+            day DATE NOT NULL,
+            role VARCHAR(20) NOT NULL,
+            message_count BIGINT NOT NULL DEFAULT 0,
+            -- Сообщения с character_count > 0 и их суммарная длина (средняя длина)
+            nonempty_count BIGINT NOT NULL DEFAULT 0,
+            character_sum BIGINT NOT NULL DEFAULT 0,
+            -- Сообщения с известным token_count и сумма токенов
+            token_rows BIGINT NOT NULL DEFAULT 0,
+            token_sum BIGINT NOT NULL DEFAULT 0,
+            prompt_tokens BIGINT NOT NULL DEFAULT 0,
+            completion_tokens BIGINT NOT NULL DEFAULT 0,
+            -- Время первого и последнего сообщения дня; при удалении сообщений
+            -- не пересчитываются (точность first/last даты после удаления - день)
+            first_message_at TIMESTAMP NULL,
+            last_message_at TIMESTAMP NULL,
+            PRIMARY KEY (day, role)
+        );
+
+        -- Активность пользователей: сообщения с role = 'user' за день
+        CREATE TABLE user_daily_activity (
+            day DATE NOT NULL,
+            user_id BIGINT NOT NULL,
+            message_count BIGINT NOT NULL,
+            PRIMARY KEY (day, user_id)
+        );
+
+        -- Пользователи (не боты) по языку интерфейса, NULL -> 'unknown'
+        CREATE TABLE user_language_stats (
+            lang VARCHAR(10) PRIMARY KEY,
+            user_count BIGINT NOT NULL DEFAULT 0,
+            premium_count BIGINT NOT NULL DEFAULT 0
+        );
+
+        -- Запись блокируется до конца транзакции миграции, чтобы строки,
+        -- вставленные между заполнением и созданием триггеров, не потерялись
+        LOCK TABLE users, messages IN SHARE ROW EXCLUSIVE MODE;
+
+        INSERT INTO message_daily_stats
+        SELECT
+            created_at::date, role, COUNT(*),
+            COUNT(*) FILTER (WHERE character_count > 0),
+            COALESCE(SUM(character_count) FILTER (WHERE character_count > 0), 0),
+            COUNT(token_count), COALESCE(SUM(token_count), 0),
+            COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0),
+            MIN(created_at), MAX(created_at)
+        FROM messages
+        WHERE deleted_at IS NULL
+        GROUP BY created_at::date, role;
+
+        INSERT INTO user_daily_activity
+        SELECT created_at::date, user_id, COUNT(*)
+        FROM messages
+        WHERE deleted_at IS NULL AND role = 'user'
+        GROUP BY created_at::date, user_id;
+
+        INSERT INTO user_language_stats
+        SELECT
+            COALESCE(language_code, 'unknown'), COUNT(*),
+            COUNT(*) FILTER (WHERE is_premium)
+        FROM users
+        WHERE is_bot = FALSE
+        GROUP BY COALESCE(language_code, 'unknown');
+    END IF;
+END $$;
+
+-- Изменения агрегатов, еще не перенесенные stats_fold_deltas(). Строки только
+-- дописываются (без ключа и индексов), поэтому параллельные транзакции не
+-- блокируют друг друга; old версии строк записываются с обратным знаком
+CREATE TABLE IF NOT EXISTS message_stats_delta (LIKE message_daily_stats INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS user_activity_delta (LIKE user_daily_activity INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS user_language_delta (LIKE user_language_stats INCLUDING DEFAULTS);
+
+CREATE OR REPLACE FUNCTION stats_rollup_messages() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE message_daily_stats, user_daily_activity, message_stats_delta,
+            user_activity_delta;
+        RETURN NULL;
+    END IF;
+
+    -- Старые версии строк (UPDATE, DELETE) вычитаются
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO message_stats_delta (
+            day, role, message_count, nonempty_count, character_sum,
+            token_rows, token_sum, prompt_tokens, completion_tokens
+        )
+        SELECT
+            created_at::date, role, -COUNT(*),
+            -COUNT(*) FILTER (WHERE character_count > 0),
+            -COALESCE(SUM(character_count) FILTER (WHERE character_count > 0), 0),
+            -COUNT(token_count), -COALESCE(SUM(token_count), 0),
+            -COALESCE(SUM(prompt_tokens), 0), -COALESCE(SUM(completion_tokens), 0)
+        FROM old_rows
+        WHERE deleted_at IS NULL
+        GROUP BY created_at::date, role;
+
+        INSERT INTO user_activity_delta
+        SELECT created_at::date, user_id, -COUNT(*)
+        FROM old_rows
+        WHERE deleted_at IS NULL AND role = 'user'
+        GROUP BY created_at::date, user_id;
+    END IF;
+
+    -- Новые версии строк (INSERT, UPDATE) добавляются
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO message_stats_delta
+        SELECT
+            created_at::date, role, COUNT(*),
+            COUNT(*) FILTER (WHERE character_count > 0),
+            COALESCE(SUM(character_count) FILTER (WHERE character_count > 0), 0),
+            COUNT(token_count), COALESCE(SUM(token_count), 0),
+            COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0),
+            MIN(created_at), MAX(created_at)
+        FROM new_rows
+        WHERE deleted_at IS NULL
+        GROUP BY created_at::date, role;
+
+        INSERT INTO user_activity_delta
+        SELECT created_at::date, user_id, COUNT(*)
+        FROM new_rows
+        WHERE deleted_at IS NULL AND role = 'user'
+        GROUP BY created_at::date, user_id;
+    END IF;
+
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION stats_rollup_users() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE user_language_stats, user_language_delta;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO user_language_delta
+        SELECT
+            COALESCE(language_code, 'unknown'), -COUNT(*),
+            -COUNT(*) FILTER (WHERE is_premium)
+        FROM old_rows
+        WHERE is_bot = FALSE
+        GROUP BY COALESCE(language_code, 'unknown');
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_language_delta
+        SELECT
+            COALESCE(language_code, 'unknown'), COUNT(*),
+            COUNT(*) FILTER (WHERE is_premium)
+        FROM new_rows
+        WHERE is_bot = FALSE
+        GROUP BY COALESCE(language_code, 'unknown');
+    END IF;
+
+    RETURN NULL;
+END $$;
+
+-- Перенос накопленных изменений в агрегаты. Свертки выполняются по одной
+-- (advisory lock до конца транзакции), и только они изменяют строки
+-- агрегатов. Изменения, зафиксированные после начала DELETE, ему не видны и
+-- остаются в *_delta до следующей свертки
+CREATE OR REPLACE FUNCTION stats_fold_deltas() RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    emptied_days DATE[];
+    emptied_users BIGINT[];
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('stats_fold_deltas'));
+
+    WITH moved AS (
+        DELETE FROM message_stats_delta RETURNING *
+    )
+    INSERT INTO message_daily_stats AS s
+    SELECT
+        day, role, SUM(message_count), SUM(nonempty_count), SUM(character_sum),
+        SUM(token_rows), SUM(token_sum), SUM(prompt_tokens), SUM(completion_tokens),
+        MIN(first_message_at), MAX(last_message_at)
+    FROM moved
+    GROUP BY day, role
+    ON CONFLICT (day, role) DO UPDATE SET
+        message_count = s.message_count + EXCLUDED.message_count,
+        nonempty_count = s.nonempty_count + EXCLUDED.nonempty_count,
+        character_sum = s.character_sum + EXCLUDED.character_sum,
+        token_rows = s.token_rows + EXCLUDED.token_rows,
+        token_sum = s.token_sum + EXCLUDED.token_sum,
+        prompt_tokens = s.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = s.completion_tokens + EXCLUDED.completion_tokens,
+        first_message_at = LEAST(s.first_message_at, EXCLUDED.first_message_at),
+        last_message_at = GREATEST(s.last_message_at, EXCLUDED.last_message_at);
+
+    WITH moved AS (
+        DELETE FROM user_activity_delta RETURNING *
+    ), folded AS (
+        INSERT INTO user_daily_activity AS a
+        SELECT day, user_id, SUM(message_count)
+        FROM moved
+        GROUP BY day, user_id
+        ON CONFLICT (day, user_id) DO UPDATE SET
+            message_count = a.message_count + EXCLUDED.message_count
+        RETURNING a.day, a.user_id, a.message_count
+    )
+    SELECT array_agg(day), array_agg(user_id) INTO emptied_days, emptied_users
+    FROM folded
+    WHERE message_count <= 0;
+
+    -- Дни без сообщений пользователя удаляются, чтобы таблица не росла.
+    -- Отдельным запросом: DELETE в том же запросе не видит строки из folded
+    DELETE FROM user_daily_activity a
+    USING unnest(emptied_days, emptied_users) AS e(day, user_id)
+    WHERE a.day = e.day AND a.user_id = e.user_id;
+
+    WITH moved AS (
+        DELETE FROM user_language_delta RETURNING *
+    )
+    INSERT INTO user_language_stats AS s
+    SELECT lang, SUM(user_count), SUM(premium_count)
+    FROM moved
+    GROUP BY lang
+    ON CONFLICT (lang) DO UPDATE SET
+        user_count = s.user_count + EXCLUDED.user_count,
+        premium_count = s.premium_count + EXCLUDED.premium_count;
+END $$;
+
+-- Transition tables доступны только в триггерах на одну операцию
+CREATE OR REPLACE TRIGGER trg_messages_rollup_insert
+    AFTER INSERT ON messages REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_messages();
+CREATE OR REPLACE TRIGGER trg_messages_rollup_update
+    AFTER UPDATE ON messages REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_messages();
+CREATE OR REPLACE TRIGGER trg_messages_rollup_delete
+    AFTER DELETE ON messages REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_messages();
+CREATE OR REPLACE TRIGGER trg_messages_rollup_truncate
+    AFTER TRUNCATE ON messages
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_messages();
+
+CREATE OR REPLACE TRIGGER trg_users_rollup_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_users();
+CREATE OR REPLACE TRIGGER trg_users_rollup_update
+    AFTER UPDATE ON users REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_users();
+CREATE OR REPLACE TRIGGER trg_users_rollup_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_users();
+CREATE OR REPLACE TRIGGER trg_users_rollup_truncate
+    AFTER TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_rollup_users();
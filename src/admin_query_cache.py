@@ -0,0 +1,145 @@
+"""Кеш SQL запросов и ответов admin режима веб-чата."""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Версия данных: значения, меняющиеся при любом изменении users/messages
+DataVersion = tuple[Any, ...]
+
+
+class AdminQueryCache:
+    """Кеш повторяющихся вопросов администратора.
+
+    Два уровня:
+    - нормализованный вопрос -> SQL: повтор вопроса не вызывает генерацию SQL;
+    - (SQL, версия данных) -> ответ и количество строк: пока данные не
+      изменились, SQL не выполняется и ответ не форматируется через LLM заново.
+
+    Обе таблицы ограничены max_entries записями (LRU). Ответ дополнительно
+    устаревает через answer_ttl секунд: SQL с NOW() дает другой результат
+    и без изменения данных.
+    """
+
+    def __init__(
+        self, max_entries: int = 256, sql_ttl: float = 3600.0, answer_ttl: float = 300.0
+    ) -> None:
+        """Инициализация кеша.
+
+        Args:
+            max_entries: Максимальное количество записей в каждой таблице
+            sql_ttl: Время жизни SQL запроса в секундах
+            answer_ttl: Время жизни ответа в секундах
+        """
+        self.max_entries = max_entries
+        self.sql_ttl = sql_ttl
+        self.answer_ttl = answer_ttl
+        self._sql: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._answers: OrderedDict[tuple[str, DataVersion], tuple[str, int, float]] = OrderedDict()
+        self.sql_hits = 0
+        self.sql_misses = 0
+        self.answer_hits = 0
+        self.answer_misses = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Нормализация вопроса: регистр, пробелы и завершающая пунктуация.
+
+        Args:
+            question: Вопрос администратора
+
+        Returns:
+            Нормализованный вопрос
+        """
+        return re.sub(r"\s+", " ", question).strip(" ?!.").lower()
+
+    def get_sql(self, question: str) -> str | None:
+        """Получение SQL, сгенерированного ранее для такого же вопроса.
+
+        Args:
+            question: Вопрос администратора
+
+        Returns:
+            SQL запрос или None
+        """
+        key = self.normalize_question(question)
+        entry = self._sql.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self._sql.pop(key, None)
+            self.sql_misses += 1
+            return None
+
+        self._sql.move_to_end(key)
+        self.sql_hits += 1
+        return entry[0]
+
+    def put_sql(self, question: str, sql_query: str) -> None:
+        """Сохранение SQL для вопроса (после успешного выполнения).
+
+        Args:
+            question: Вопрос администратора
+            sql_query: Сгенерированный SQL запрос
+        """
+        key = self.normalize_question(question)
+        self._sql[key] = (sql_query, time.monotonic() + self.sql_ttl)
+        self._sql.move_to_end(key)
+        self._trim(self._sql)
+
+    def get_answer(self, sql_query: str, data_version: DataVersion) -> tuple[str, int] | None:
+        """Получение ответа на SQL запрос для текущей версии данных.
+
+        Args:
+            sql_query: SQL запрос
+            data_version: Версия данных
+
+        Returns:
+            Ответ и количество строк результата или None
+        """
+        key = (sql_query, data_version)
+        entry = self._answers.get(key)
+        if entry is None or entry[2] <= time.monotonic():
+            self._answers.pop(key, None)
+            self.answer_misses += 1
+            return None
+
+        self._answers.move_to_end(key)
+        self.answer_hits += 1
+        return entry[0], entry[1]
+
+    def put_answer(
+        self, sql_query: str, data_version: DataVersion, answer: str, row_count: int
+    ) -> None:
+        """Сохранение ответа на SQL запрос для версии данных.
+
+        Args:
+            sql_query: SQL запрос
+            data_version: Версия данных, на которой выполнялся запрос
+            answer: Ответ LLM
+            row_count: Количество строк результата
+        """
+        key = (sql_query, data_version)
+        self._answers[key] = (answer, row_count, time.monotonic() + self.answer_ttl)
+        self._answers.move_to_end(key)
+        self._trim(self._answers)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики кеша.
+
+        Returns:
+            Словарь с попаданиями и промахами обеих таблиц
+        """
+        return {
+            "sql_hits": self.sql_hits,
+            "sql_misses": self.sql_misses,
+            "answer_hits": self.answer_hits,
+            "answer_misses": self.answer_misses,
+        }
+
+    def _trim(self, entries: OrderedDict[Any, Any]) -> None:
+        """Вытеснение самых давно использованных записей сверх max_entries."""
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
@@ -0,0 +1,180 @@
+"""Ограничение количества одновременных запросов к внешнему сервису."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+from typing import NoReturn
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    """Запрос не допущен: лимит пользователя, переполнение очереди или таймаут ожидания."""
+
+    def __init__(self, reason: str) -> None:
+        """Инициализация исключения.
+
+        Args:
+            reason: Причина отказа (user_limit, queue_full, queue_timeout)
+        """
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """Глобальный семафор с лимитом на пользователя и ограниченной очередью ожидания.
+
+    Одновременно выполняется не более max_concurrent запросов. Запросы сверх
+    этого ждут в очереди не дольше queue_timeout секунд; если в очереди уже
+    max_queue запросов, новый запрос отклоняется сразу. У одного пользователя
+    одновременно (в работе и в очереди) может быть не более per_user_limit
+    запросов.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        per_user_limit: int = 0,
+        max_queue: int = 100,
+        queue_timeout: float = 10.0,
+    ) -> None:
+        """Инициализация контроллера.
+
+        Args:
+            max_concurrent: Максимум одновременно выполняемых запросов
+            per_user_limit: Максимум запросов одного пользователя (0 = без лимита)
+            max_queue: Максимальная длина очереди ожидания
+            queue_timeout: Максимальное время ожидания в очереди в секундах
+        """
+        self.max_concurrent = max_concurrent
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._per_user: dict[Hashable, int] = {}
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected: dict[str, int] = {"user_limit": 0, "queue_full": 0, "queue_timeout": 0}
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        logger.info(
+            f"Admission controller initialized: max_concurrent={max_concurrent}, "
+            f"per_user_limit={per_user_limit}, max_queue={max_queue}, "
+            f"queue_timeout={queue_timeout}s"
+        )
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable | None = None) -> AsyncIterator[None]:
+        """Получение слота на время выполнения запроса.
+
+        Args:
+            key: Ключ пользователя для лимита per_user_limit (None = без лимита)
+
+        Yields:
+            None: Управление на время выполнения запроса
+
+        Raises:
+            AdmissionRejectedError: Если запрос не допущен
+        """
+        if key is not None and 0 < self.per_user_limit <= self._per_user.get(key, 0):
+            self._reject("user_limit")
+        if self._semaphore.locked() and self.queue_depth >= self.max_queue:
+            self._reject("queue_full")
+
+        if key is not None:
+            self._per_user[key] = self._per_user.get(key, 0) + 1
+        try:
+            await self._acquire()
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+        finally:
+            if key is not None:
+                remaining = self._per_user[key] - 1
+                if remaining:
+                    self._per_user[key] = remaining
+                else:
+                    del self._per_user[key]
+
+    async def try_acquire(self) -> bool:
+        """Получение слота без ожидания (для дополнительных запросов, например hedging).
+
+        Слот не выдается, если свободных мест нет или в очереди уже ждут
+        запросы: дополнительный запрос не обходит очередь. Слот освобождается
+        вызовом release().
+
+        Returns:
+            True, если слот получен
+        """
+        if self._semaphore.locked() or self.queue_depth > 0:
+            return False
+        # Семафор не занят: acquire завершается без ожидания
+        await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Освобождение слота, полученного через try_acquire()."""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict[str, float]:
+        """Метрики контроллера.
+
+        Returns:
+            Словарь с количеством запросов в работе и в очереди, допущенных и
+            отклоненных запросов и временем ожидания в очереди
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            **{f"rejected_{reason}": count for reason, count in self.rejected.items()},
+            "avg_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    async def _acquire(self) -> None:
+        """Ожидание свободного места в семафоре не дольше queue_timeout."""
+        started = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._reject("queue_timeout")
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - started
+        self.in_flight += 1
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(f"Request waited {waited:.2f}s in admission queue")
+
+    def _reject(self, reason: str) -> NoReturn:
+        """Учет отказа и выброс исключения.
+
+        Args:
+            reason: Причина отказа
+
+        Raises:
+            AdmissionRejectedError: Всегда
+        """
+        self.rejected[reason] += 1
+        logger.warning(
+            f"Request rejected ({reason}): in_flight={self.in_flight}, "
+            f"queue_depth={self.queue_depth}"
+        )
+        raise AdmissionRejectedError(reason)
@@ -1,15 +1,16 @@
 """FastAPI router для веб-чата."""
 
+import json
 import logging
-from typing import Annotated
+from collections.abc import AsyncIterator
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from src.chat_manager import ChatManager, ChatMode
-from src.config import Config
-from src.database import Database
-from src.llm_client import LLMClient
+from src.llm_client import LLMBusyError
 
 logger = logging.getLogger(__name__)
 
@@ -54,18 +55,22 @@ class ChatHistoryResponse(BaseModel):
 
 
 # Dependency injection для ChatManager
-def get_chat_manager() -> ChatManager:
-    """Создание экземпляра ChatManager.
+async def get_chat_manager(request: Request) -> ChatManager:
+    """Получение общего экземпляра ChatManager, созданного в lifespan приложения.
+
+    Args:
+        request: Текущий запрос
 
     Returns:
         ChatManager: Экземпляр менеджера чата
-    """
-    # Инициализируем зависимости
-    config = Config()
-    database = Database(config.database_url, config.database_timeout)
-    llm_client = LLMClient(config)
 
-    return ChatManager(database, llm_client)
+    Raises:
+        HTTPException: 503, если чат не настроен (нет конфигурации LLM)
+    """
+    chat_manager: ChatManager | None = request.app.state.chat_manager
+    if chat_manager is None:
+        raise HTTPException(status_code=503, detail="Chat is not configured")
+    return chat_manager
 
 
 @router.post("/message", response_model=ChatMessageResponse)
@@ -95,6 +100,12 @@ async def send_message(
             response=response, session_id=request.session_id, sql_query=sql_query
         )
 
+    except LLMBusyError as e:
+        logger.warning(f"LLM busy for session {request.session_id}: {e}")
+        raise HTTPException(
+            status_code=503, detail="Too many requests in progress, try again later"
+        ) from e
+
     except Exception as e:
         logger.error(f"Error processing message: {e}", exc_info=True)
         raise HTTPException(
@@ -102,6 +113,58 @@ async def send_message(
         ) from e
 
 
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """Форматирование события Server-Sent Events.
+
+    Args:
+        event: Тип события
+        data: Данные события (сериализуются в JSON)
+
+    Returns:
+        Событие в формате text/event-stream
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/message/stream")
+async def stream_message(
+    request: ChatMessageRequest,
+    chat_manager: Annotated[ChatManager, Depends(get_chat_manager)],
+) -> StreamingResponse:
+    """Отправка сообщения в чат с потоковым ответом (Server-Sent Events).
+
+    События: sql и rows (только admin режим), token (фрагмент ответа),
+    done (ответ сохранен), error (ошибка после начала потока).
+
+    Args:
+        request: Запрос с сообщением
+        chat_manager: Менеджер чата (dependency injection)
+
+    Returns:
+        StreamingResponse: Поток событий text/event-stream
+    """
+    logger.info(
+        f"New streaming message from session {request.session_id}, mode: {request.mode}"
+    )
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event, data in chat_manager.stream_message(
+                session_id=request.session_id, message=request.message, mode=request.mode
+            ):
+                yield format_sse(event, data)
+        except Exception as e:
+            # Статус ответа уже отправлен, сообщаем об ошибке событием
+            logger.error(f"Error streaming message: {e}", exc_info=True)
+            yield format_sse("error", {"detail": f"Error processing message: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history/{session_id}", response_model=ChatHistoryResponse)
 async def get_history(
     session_id: str,
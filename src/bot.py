@@ -1,12 +1,20 @@
 """Telegram бот - инициализация и регистрация обработчиков."""
 
+import asyncio
+import contextlib
+import hmac
 import logging
+import signal
+from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.filters import Command
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
 
 from .config import Config
 
@@ -15,6 +23,10 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Максимум одновременных соединений Telegram к webhook (ограничение Bot API)
+TELEGRAM_MAX_CONNECTIONS = 100
+
 
 class TelegramBot:
     """Класс для инициализации и управления Telegram ботом."""
@@ -31,8 +43,19 @@ class TelegramBot:
             default=DefaultBotProperties(parse_mode=ParseMode.HTML),
         )
         self.dp = Dispatcher()
+        self.shutdown_callbacks: list[Callable[[], Awaitable[None]]] = []
+        self._updates = asyncio.Semaphore(config.telegram_webhook_max_concurrent_updates)
+        self._update_tasks: set[asyncio.Task[None]] = set()
         logger.info("Telegram bot initialized")
 
+    def add_shutdown_callback(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Регистрация корутины, вызываемой при остановке бота.
+
+        Args:
+            callback: Корутина без аргументов (например, сброс буфера записи в БД)
+        """
+        self.shutdown_callbacks.append(callback)
+
     def register_handlers(self, message_handler: "MessageHandler") -> None:
         """Регистрация обработчиков сообщений.
 
@@ -50,10 +73,131 @@ class TelegramBot:
 
         logger.info("Handlers registered")
 
+    def create_webhook_app(self) -> web.Application:
+        """Создание HTTP приложения, принимающего обновления Telegram.
+
+        Returns:
+            aiohttp приложение с endpoint webhook и /health для балансировщика
+        """
+        app = web.Application()
+        app.router.add_post(self.config.telegram_webhook_path, self._handle_webhook)
+        app.router.add_get("/health", self._handle_health)
+        return app
+
     async def start(self) -> None:
-        """Запуск бота в режиме polling."""
-        logger.info("Bot starting...")
+        """Запуск бота в режиме polling или webhook (Config.telegram_mode)."""
+        logger.info(f"Bot starting in {self.config.telegram_mode} mode...")
         try:
-            await self.dp.start_polling(self.bot)
+            if self.config.telegram_mode == "webhook":
+                await self._run_webhook()
+            else:
+                await self.dp.start_polling(self.bot)
         finally:
+            for callback in self.shutdown_callbacks:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.error(f"Shutdown callback failed: {e}", exc_info=True)
             await self.bot.session.close()
+
+    async def _run_webhook(self) -> None:
+        """Работа в режиме webhook до SIGINT/SIGTERM или отмены задачи.
+
+        Webhook регистрируется при каждом старте (регистрация идемпотентна) и
+        не удаляется при остановке, чтобы Telegram не терял обновления во время
+        перезапуска. Кеши истории и профилей, очереди диалогов и отложенная
+        запись хранятся в памяти процесса, поэтому несколько реплик допустимы
+        только при маршрутизации всех обновлений чата в одну реплику (см.
+        docs/guides/04_INTEGRATIONS.md).
+        """
+        runner = web.AppRunner(self.create_webhook_app())
+        await runner.setup()
+        site = web.TCPSite(
+            runner, self.config.telegram_webhook_host, self.config.telegram_webhook_port
+        )
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, stop.set)
+
+        await self.dp.emit_startup(bot=self.bot)
+        try:
+            await site.start()
+            await self.bot.set_webhook(
+                self.config.telegram_webhook_url,
+                secret_token=self.config.telegram_webhook_secret,
+                max_connections=min(
+                    self.config.telegram_webhook_max_concurrent_updates, TELEGRAM_MAX_CONNECTIONS
+                ),
+            )
+            logger.info(
+                f"Webhook server listening on {self.config.telegram_webhook_host}:"
+                f"{self.config.telegram_webhook_port}{self.config.telegram_webhook_path}"
+            )
+            await stop.wait()
+            logger.info("Webhook server stopping...")
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                with contextlib.suppress(NotImplementedError):
+                    loop.remove_signal_handler(sig)
+            # Новые обновления не принимаются, начатые дорабатываются
+            await runner.cleanup()
+            if self._update_tasks:
+                logger.info(f"Waiting for {len(self._update_tasks)} update(s) to finish")
+                await asyncio.gather(*self._update_tasks, return_exceptions=True)
+            await self.dp.emit_shutdown(bot=self.bot)
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        """Прием обновления: проверка секрета и обработка в фоне.
+
+        Ответ отправляется сразу после постановки обновления в обработку, чтобы
+        Telegram не ждал ответа LLM. Если уже обрабатывается
+        telegram_webhook_max_concurrent_updates обновлений, ответ задерживается
+        до освобождения места: Telegram не отправляет новые обновления, пока
+        заняты все его соединения.
+
+        Args:
+            request: HTTP запрос Telegram
+
+        Returns:
+            200 при приеме обновления, 401 при неверном секрете, 400 при
+            некорректном теле запроса
+        """
+        secret = request.headers.get(SECRET_TOKEN_HEADER, "")
+        # compare_digest принимает только ASCII строки (иначе TypeError и 500);
+        # секрет Telegram состоит из A-Z, a-z, 0-9, "_" и "-"
+        if not secret.isascii() or not hmac.compare_digest(
+            secret, self.config.telegram_webhook_secret
+        ):
+            logger.warning(f"Webhook request rejected: invalid secret token from {request.remote}")
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"Webhook request rejected: invalid update: {e}")
+            return web.Response(status=400)
+
+        await self._updates.acquire()
+        task = asyncio.create_task(self._process_update(update))
+        self._update_tasks.add(task)
+        task.add_done_callback(self._update_tasks.discard)
+        return web.Response()
+
+    async def _handle_health(self, _request: web.Request) -> web.Response:
+        """Проверка живости реплики для балансировщика нагрузки."""
+        return web.json_response({"status": "healthy"})
+
+    async def _process_update(self, update: Update) -> None:
+        """Передача обновления в Dispatcher с освобождением места после обработки.
+
+        Args:
+            update: Обновление Telegram
+        """
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Failed to process update {update.update_id}: {e}", exc_info=True)
+        finally:
+            self._updates.release()
@@ -1,15 +1,45 @@
 """Менеджер веб-чата с поддержкой Normal и Admin режимов."""
 
 import logging
+from collections.abc import AsyncIterator
 from datetime import datetime
 from enum import Enum
 from typing import Any
 
+from .admin_query_cache import AdminQueryCache, DataVersion
 from .database import Database
 from .llm_client import LLMClient
 
 logger = logging.getLogger(__name__)
 
+# Событие потокового ответа: (тип события, данные)
+ChatEvent = tuple[str, dict[str, Any]]
+
+NORMAL_MODE_PROMPT = (
+    "Ты AI-ассистент для администратора Telegram бота. "
+    "Помогай администратору с вопросами по управлению ботом, "
+    "объясняй функциональность и давай полезные советы."
+)
+
+FORMAT_RESULTS_PROMPT = """Ты AI-ассистент для администратора.
+Пользователь задал вопрос о статистике бота, был выполнен SQL запрос.
+Сформируй понятный ответ на основе результатов.
+
+Требования:
+- Ответ должен быть коротким и по делу
+- Используй форматирование (списки, выделения)
+- Если результатов нет, скажи об этом
+- Добавь краткий вывод или инсайт если уместно"""
+
+# Версия данных для кеша ответов admin режима: меняется при новых сообщениях,
+# их удалении и изменении профилей пользователей
+DATA_VERSION_SQL = """
+    SELECT
+        (SELECT MAX(id) FROM messages) AS messages_id,
+        (SELECT MAX(deleted_at) FROM messages) AS messages_deleted_at,
+        (SELECT MAX(updated_at) FROM users) AS users_updated_at
+"""
+
 
 class ChatMode(str, Enum):
     """Режимы работы чата."""
@@ -21,15 +51,22 @@ class ChatMode(str, Enum):
 class ChatManager:
     """Менеджер веб-чата для администратора."""
 
-    def __init__(self, database: Database, llm_client: LLMClient):
+    def __init__(
+        self,
+        database: Database,
+        llm_client: LLMClient,
+        query_cache: AdminQueryCache | None = None,
+    ):
         """Инициализация менеджера чата.
 
         Args:
             database: Экземпляр Database для работы с БД
             llm_client: Клиент для работы с LLM
+            query_cache: Кеш SQL и ответов admin режима (None = выключен)
         """
         self.database = database
         self.llm_client = llm_client
+        self.query_cache = query_cache
         logger.info("ChatManager initialized")
 
     async def send_message(
@@ -65,6 +102,89 @@ class ChatManager:
 
         return response, sql_query
 
+    async def stream_message(
+        self, session_id: str, message: str, mode: ChatMode = ChatMode.NORMAL
+    ) -> AsyncIterator[ChatEvent]:
+        """Отправка сообщения в чат с потоковым получением ответа.
+
+        События:
+        - ("sql", {"sql_query"}) - сгенерированный SQL (admin режим)
+        - ("rows", {"row_count"}) - количество строк результата (admin режим)
+        - ("token", {"content"}) - очередной фрагмент ответа
+        - ("done", {"response", "sql_query"}) - ответ полностью получен и сохранен
+
+        Ответ ассистента сохраняется в историю только после завершения потока.
+
+        Args:
+            session_id: ID сессии пользователя
+            message: Сообщение от пользователя
+            mode: Режим работы чата (normal/admin)
+
+        Yields:
+            События потокового ответа
+        """
+        logger.info(f"Streaming message for session {session_id}, mode: {mode}")
+
+        # Сохраняем сообщение пользователя
+        await self._save_message(session_id, "user", message)
+
+        sql_query: str | None = None
+        data_version: DataVersion | None = None
+        row_count = 0
+        if mode == ChatMode.ADMIN:
+            # Шаг 1: Генерируем SQL запрос
+            sql_query = await self._generate_sql(message)
+            yield "sql", {"sql_query": sql_query}
+
+            # Данные не менялись с прошлого такого же запроса: ответ из кеша
+            data_version = await self._get_data_version()
+            cached = self._get_cached_answer(sql_query, data_version)
+            if cached is not None:
+                response, row_count = cached
+                yield "rows", {"row_count": row_count}
+                yield "token", {"content": response}
+                await self._save_message(session_id, "assistant", response, sql_query)
+                yield "done", {"response": response, "sql_query": sql_query}
+                return
+
+            # Шаг 2: Выполняем SQL запрос
+            try:
+                query_results = await self._execute_sql(sql_query)
+            except Exception as e:
+                logger.error(f"SQL execution error: {e}")
+                response = f"Ошибка выполнения SQL запроса: {str(e)}"
+                yield "token", {"content": response}
+                await self._save_message(session_id, "assistant", response, sql_query)
+                yield "done", {"response": response, "sql_query": sql_query}
+                return
+
+            row_count = len(query_results)
+            yield "rows", {"row_count": row_count}
+
+            # Шаг 3: Потоково формируем ответ через LLM
+            messages = self._format_results_messages(message, query_results, sql_query)
+            system_prompt = FORMAT_RESULTS_PROMPT
+        else:
+            messages = await self.get_history(session_id, limit=10)
+            system_prompt = NORMAL_MODE_PROMPT
+
+        parts: list[str] = []
+        async for chunk in self.llm_client.stream_response(
+            messages=messages, system_prompt=system_prompt
+        ):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", {"content": chunk.content}
+
+        response = "".join(parts)
+        if sql_query is not None:
+            self._remember_admin_answer(message, sql_query, data_version, response, row_count)
+
+        # Сохраняем ответ ассистента
+        await self._save_message(session_id, "assistant", response, sql_query)
+
+        yield "done", {"response": response, "sql_query": sql_query}
+
     async def _handle_normal_mode(
         self, history: list[dict[str, str]]
     ) -> str:
@@ -76,14 +196,8 @@ class ChatManager:
         Returns:
             Ответ от LLM
         """
-        system_prompt = (
-            "Ты AI-ассистент для администратора Telegram бота. "
-            "Помогай администратору с вопросами по управлению ботом, "
-            "объясняй функциональность и давай полезные советы."
-        )
-
         return await self.llm_client.get_response(
-            messages=history, system_prompt=system_prompt
+            messages=history, system_prompt=NORMAL_MODE_PROMPT
         )
 
     async def _handle_admin_mode(self, message: str) -> tuple[str, str]:
@@ -98,6 +212,12 @@ class ChatManager:
         # Шаг 1: Генерируем SQL запрос
         sql_query = await self._generate_sql(message)
 
+        # Данные не менялись с прошлого такого же запроса: ответ из кеша
+        data_version = await self._get_data_version()
+        cached = self._get_cached_answer(sql_query, data_version)
+        if cached is not None:
+            return cached[0], sql_query
+
         # Шаг 2: Выполняем SQL запрос
         try:
             query_results = await self._execute_sql(sql_query)
@@ -110,9 +230,71 @@ class ChatManager:
 
         # Шаг 3: Формируем ответ через LLM
         response = await self._format_results(message, query_results, sql_query)
+        self._remember_admin_answer(
+            message, sql_query, data_version, response, len(query_results)
+        )
 
         return response, sql_query
 
+    async def _get_data_version(self) -> DataVersion | None:
+        """Получение версии данных users/messages для кеша ответов.
+
+        Returns:
+            Версия данных или None, если кеш выключен
+        """
+        if self.query_cache is None:
+            return None
+
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(DATA_VERSION_SQL)
+            row = await cur.fetchone()
+        return tuple(row.values()) if row else ()
+
+    def _get_cached_answer(
+        self, sql_query: str, data_version: DataVersion | None
+    ) -> tuple[str, int] | None:
+        """Получение закешированного ответа на SQL запрос.
+
+        Args:
+            sql_query: SQL запрос
+            data_version: Текущая версия данных (None = кеш выключен)
+
+        Returns:
+            Ответ и количество строк результата или None
+        """
+        if self.query_cache is None or data_version is None:
+            return None
+
+        cached = self.query_cache.get_answer(sql_query, data_version)
+        if cached is not None:
+            logger.info(f"Admin answer served from cache for SQL: {sql_query}")
+        return cached
+
+    def _remember_admin_answer(
+        self,
+        question: str,
+        sql_query: str,
+        data_version: DataVersion | None,
+        response: str,
+        row_count: int,
+    ) -> None:
+        """Сохранение SQL и ответа admin режима в кеш.
+
+        Вызывается только после успешного выполнения SQL, поэтому ошибочный
+        запрос в кеш не попадает.
+
+        Args:
+            question: Вопрос администратора
+            sql_query: Выполненный SQL запрос
+            data_version: Версия данных, на которой выполнялся запрос
+            response: Ответ LLM
+            row_count: Количество строк результата
+        """
+        if self.query_cache is None or data_version is None:
+            return
+        self.query_cache.put_sql(question, sql_query)
+        self.query_cache.put_answer(sql_query, data_version, response, row_count)
+
     async def _generate_sql(self, question: str) -> str:
         """Генерация SQL запроса из вопроса на естественном языке.
 
@@ -122,6 +304,12 @@ class ChatManager:
         Returns:
             SQL запрос
         """
+        if self.query_cache is not None:
+            cached_sql = self.query_cache.get_sql(question)
+            if cached_sql is not None:
+                logger.info(f"SQL served from cache: {cached_sql}")
+                return cached_sql
+
         text2postgre_prompt = """Ты эксперт по PostgreSQL.
 Переведи вопрос пользователя в SQL запрос.
 
@@ -158,8 +346,10 @@ class ChatManager:
 
         messages = [{"role": "user", "content": f"Вопрос: {question}"}]
 
+        # Кеш ответов LLM не используется: ошибочный SQL из кеша возвращался бы
+        # повторно. Успешно выполненный SQL кеширует AdminQueryCache
         sql_query = await self.llm_client.get_response(
-            messages=messages, system_prompt=text2postgre_prompt
+            messages=messages, system_prompt=text2postgre_prompt, cache=False
         )
 
         # Очистка от markdown и лишних символов
@@ -184,20 +374,29 @@ class ChatManager:
 
         Returns:
             Результаты запроса
+
+        Raises:
+            ValueError: Запрос не начинается с SELECT
         """
         # Проверка безопасности: только SELECT запросы
         if not sql_query.strip().upper().startswith("SELECT"):
             raise ValueError("Only SELECT queries are allowed")
 
-        conn = self.database._get_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute(sql_query)
-                results = cur.fetchall()
-                logger.info(f"SQL returned {len(results)} rows")
-                return results
-        finally:
-            conn.close()
+        # Запрос выполняется в транзакции только для чтения, которая всегда
+        # откатывается: изменения данных и настроек сессии (SET, set_config) не
+        # остаются на соединении, возвращаемом в общий пул. prepare=True
+        # отправляет запрос как prepared statement, в который нельзя вставить
+        # несколько команд (например, "SELECT 1; COMMIT; DELETE ...")
+        async with self.database.connection() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute("SET TRANSACTION READ ONLY")
+                    await cur.execute(sql_query, prepare=True)
+                    results = await cur.fetchall()
+            finally:
+                await conn.rollback()
+        logger.info(f"SQL returned {len(results)} rows")
+        return results
 
     async def _format_results(
         self, question: str, results: list[dict[str, Any]], sql_query: str
@@ -212,19 +411,28 @@ class ChatManager:
         Returns:
             Человекочитаемый ответ
         """
-        format_prompt = """Ты AI-ассистент для администратора.
-Пользователь задал вопрос о статистике бота, был выполнен SQL запрос.
-Сформируй понятный ответ на основе результатов.
+        messages = self._format_results_messages(question, results, sql_query)
 
-Требования:
-- Ответ должен быть коротким и по делу
-- Используй форматирование (списки, выделения)
-- Если результатов нет, скажи об этом
-- Добавь краткий вывод или инсайт если уместно"""
+        return await self.llm_client.get_response(
+            messages=messages, system_prompt=FORMAT_RESULTS_PROMPT
+        )
 
+    def _format_results_messages(
+        self, question: str, results: list[dict[str, Any]], sql_query: str
+    ) -> list[dict[str, str]]:
+        """Сообщения для LLM с вопросом, SQL запросом и его результатами.
+
+        Args:
+            question: Оригинальный вопрос
+            results: Результаты SQL запроса
+            sql_query: Выполненный SQL запрос
+
+        Returns:
+            Сообщения в формате OpenAI API
+        """
         results_text = self._format_results_as_text(results)
 
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": f"""Вопрос: {question}
@@ -239,10 +447,6 @@ SQL запрос:
             }
         ]
 
-        return await self.llm_client.get_response(
-            messages=messages, system_prompt=format_prompt
-        )
-
     def _format_results_as_text(self, results: list[dict[str, Any]]) -> str:
         """Форматирование результатов SQL в текст.
 
@@ -283,31 +487,26 @@ SQL запрос:
         Returns:
             История в формате OpenAI API
         """
-        conn = self.database._get_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT role, content
-                    FROM chat_messages
-                    WHERE session_id = %s
-                    ORDER BY created_at DESC
-                    LIMIT %s
-                    """,
-                    (session_id, limit),
-                )
-                messages = cur.fetchall()
-
-                # Reverse to get chronological order
-                history = [
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in reversed(messages)
-                ]
-
-                logger.debug(f"Retrieved {len(history)} messages for session {session_id}")
-                return history
-        finally:
-            conn.close()
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT role, content
+                FROM chat_messages
+                WHERE session_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+                """,
+                (session_id, limit),
+            )
+            messages = await cur.fetchall()
+
+        # Reverse to get chronological order
+        history = [
+            {"role": msg["role"], "content": msg["content"]} for msg in reversed(messages)
+        ]
+
+        logger.debug(f"Retrieved {len(history)} messages for session {session_id}")
+        return history
 
     async def clear_history(self, session_id: str) -> None:
         """Очистка истории чата для сессии.
@@ -315,17 +514,14 @@ SQL запрос:
         Args:
             session_id: ID сессии
         """
-        conn = self.database._get_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "DELETE FROM chat_messages WHERE session_id = %s",
-                    (session_id,),
-                )
-                conn.commit()
-                logger.info(f"History cleared for session {session_id}")
-        finally:
-            conn.close()
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                "DELETE FROM chat_messages WHERE session_id = %s",
+                (session_id,),
+            )
+            await conn.commit()
+
+        logger.info(f"History cleared for session {session_id}")
 
     async def _save_message(
         self, session_id: str, role: str, content: str, sql_query: str | None = None
@@ -338,17 +534,13 @@ SQL запрос:
             content: Содержимое сообщения
             sql_query: SQL запрос (опционально, для admin режима)
         """
-        conn = self.database._get_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO chat_messages (session_id, role, content, sql_query, created_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
-                    (session_id, role, content, sql_query, datetime.now()),
-                )
-                conn.commit()
-        finally:
-            conn.close()
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO chat_messages (session_id, role, content, sql_query, created_at)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (session_id, role, content, sql_query, datetime.now()),
+            )
+            await conn.commit()
 
@@ -0,0 +1,98 @@
+"""Circuit breaker для запросов к внешнему сервису."""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Размыкатель цепи: быстрый отказ, пока внешний сервис недоступен.
+
+    В состоянии closed запросы проходят; после failure_threshold ошибок подряд
+    цепь размыкается (open) и запросы отклоняются без обращения к сервису.
+    Через recovery_timeout секунд цепь переходит в half_open и пропускает один
+    пробный запрос: успех замыкает цепь, ошибка снова размыкает ее.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float) -> None:
+        """Инициализация размыкателя.
+
+        Args:
+            name: Название защищаемого ресурса (для логов)
+            failure_threshold: Количество ошибок подряд для размыкания (0 = выключен)
+            recovery_timeout: Время в секундах до пробного запроса после размыкания
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние (closed, open, half_open)."""
+        if (
+            self._state == STATE_OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Проверка, можно ли выполнить запрос.
+
+        В состоянии half_open разрешается только один пробный запрос за раз.
+
+        Returns:
+            True, если запрос можно отправить
+        """
+        if self.failure_threshold <= 0:
+            return True
+
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            logger.info(f"Circuit breaker {self.name}: half-open, sending probe request")
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Учет успешного ответа сервиса: цепь замыкается."""
+        if self._state != STATE_CLOSED:
+            logger.info(f"Circuit breaker {self.name}: closed, service recovered")
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Учет ошибки сервиса: размыкание цепи при достижении порога."""
+        if self.failure_threshold <= 0:
+            return
+
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                logger.warning(
+                    f"Circuit breaker {self.name}: open after {self._failures} failure(s), "
+                    f"retry in {self.recovery_timeout}s"
+                )
+            self._state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Завершение запроса без результата (например, отмена): освобождает пробный слот."""
+        self._probe_in_flight = False
@@ -0,0 +1,65 @@
+"""Формирование контекста для LLM в пределах бюджета токенов."""
+
+import logging
+
+from .token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+class ContextBuilder:
+    """Отбор последних сообщений истории, помещающихся в бюджет токенов.
+
+    Работает между Conversation.get_history и LLMClient.get_response: история
+    просматривается от новых сообщений к старым, пока следующее сообщение
+    помещается в бюджет. Последнее сообщение (текущий запрос пользователя)
+    попадает в контекст всегда.
+    """
+
+    def __init__(self, token_counter: TokenCounter, token_budget: int) -> None:
+        """Инициализация построителя контекста.
+
+        Args:
+            token_counter: Счетчик токенов
+            token_budget: Бюджет токенов промпта (системный промпт + история)
+        """
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.dropped_messages = 0
+        logger.info(f"Context builder initialized with token budget: {token_budget}")
+
+    def build(
+        self, history: list[dict[str, str]], system_prompt: str | None = None
+    ) -> list[dict[str, str]]:
+        """Отбор последних сообщений истории в пределах бюджета.
+
+        Args:
+            history: История диалога в хронологическом порядке
+            system_prompt: Системный промпт, который будет отправлен вместе с историей
+
+        Returns:
+            Последние сообщения истории в хронологическом порядке
+        """
+        if not history:
+            return []
+
+        used = 0
+        if system_prompt:
+            used += self.token_counter.count_message({"role": "system", "content": system_prompt})
+
+        selected = 0
+        for message in reversed(history):
+            tokens = self.token_counter.count_message(message)
+            if selected and used + tokens > self.token_budget:
+                break
+            used += tokens
+            selected += 1
+
+        dropped = len(history) - selected
+        self.dropped_messages += dropped
+        if used > self.token_budget:
+            logger.warning(
+                f"Latest message alone exceeds token budget: {used} > {self.token_budget}"
+            )
+        logger.debug(f"Context built: {selected} message(s), ~{used} token(s), dropped {dropped}")
+        return history[-selected:]
@@ -1,8 +1,11 @@
 """Управление контекстом и историей диалогов."""
 
 import logging
+from typing import Any
 
 from .database import Database
+from .history_cache import HistoryCache
+from .token_counter import TokenCounter
 
 logger = logging.getLogger(__name__)
 
@@ -10,17 +13,38 @@ logger = logging.getLogger(__name__)
 class Conversation:
     """Класс для управления историей диалогов пользователей через базу данных."""
 
-    def __init__(self, database: Database) -> None:
+    def __init__(
+        self,
+        database: Database,
+        cache: HistoryCache | None = None,
+        token_counter: TokenCounter | None = None,
+    ) -> None:
         """Инициализация с подключением к базе данных.
 
         Args:
             database: Экземпляр Database для работы с БД
+            cache: Кеш окон истории (None = всегда читать из БД)
+            token_counter: Счетчик токенов для сообщений пользователя
+                (None = token_count не сохраняется)
         """
         self.db = database
-        logger.info("Conversation manager initialized with database backend")
+        self.cache = cache
+        self.token_counter = token_counter
+        logger.info(
+            "Conversation manager initialized with database backend"
+            + (" and history cache" if cache is not None else "")
+        )
 
     async def add_message(
-        self, chat_id: int, user_id: int, role: str, content: str
+        self,
+        chat_id: int,
+        user_id: int,
+        role: str,
+        content: str,
+        defer: bool = False,
+        token_count: int | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
     ) -> None:
         """Добавление сообщения в историю диалога.
 
@@ -29,8 +53,25 @@ class Conversation:
             user_id: ID пользователя
             role: Роль отправителя (user, assistant, system)
             content: Текст сообщения
+            defer: Записать сообщение через буфер write-behind (если он включен)
+            token_count: Количество токенов в тексте (None = посчитать локально)
+            prompt_tokens: Токены промпта запроса к LLM (для ответа ассистента)
+            completion_tokens: Токены ответа LLM (для ответа ассистента)
         """
-        await self.db.add_message(chat_id, user_id, role, content)
+        if token_count is None:
+            token_count = self._count_tokens(content)
+        await self.db.add_message(
+            chat_id,
+            user_id,
+            role,
+            content,
+            defer=defer,
+            token_count=token_count,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        if self.cache is not None:
+            self.cache.append((chat_id, user_id), role, content)
         logger.debug(f"Message added for chat_id={chat_id}, user_id={user_id}, role={role}")
 
     async def get_history(
@@ -46,10 +87,94 @@ class Conversation:
         Returns:
             Список сообщений в формате OpenAI API (только role и content)
         """
-        history = await self.db.get_history(chat_id, user_id, limit)
+        if self.cache is not None:
+            cached = self.cache.get((chat_id, user_id), limit)
+            if cached is not None:
+                logger.debug(f"History cache hit for chat_id={chat_id}, user_id={user_id}")
+                return cached
+
+        fetch_limit = self._fetch_limit(limit)
+        history = await self.db.get_history(chat_id, user_id, fetch_limit)
+        history = self._remember((chat_id, user_id), history, fetch_limit, limit)
         logger.debug(f"Retrieved {len(history)} messages for chat_id={chat_id}, user_id={user_id}")
         return history
 
+    async def ingest_user_turn(
+        self,
+        chat_id: int,
+        content: str,
+        user_profile: dict[str, Any],
+        limit: int | None = None,
+    ) -> list[dict[str, str]]:
+        """Сохранение пользователя и его сообщения с получением истории за один запрос.
+
+        Если окно диалога есть в кеше, история в БД не запрашивается.
+
+        Args:
+            chat_id: ID чата
+            content: Текст сообщения пользователя
+            user_profile: Поля пользователя в формате аргументов Database.upsert_user
+            limit: Максимальное количество сообщений истории (None = все)
+
+        Returns:
+            История диалога (включая новое сообщение) в формате OpenAI API
+        """
+        return await self.ingest_user_turns(chat_id, [content], user_profile, limit)
+
+    async def ingest_user_turns(
+        self,
+        chat_id: int,
+        contents: list[str],
+        user_profile: dict[str, Any],
+        limit: int | None = None,
+    ) -> list[dict[str, str]]:
+        """Сохранение серии сообщений пользователя с одной выборкой истории.
+
+        Все сообщения серии и выборка истории отправляются в БД одним пакетом;
+        если окно диалога есть в кеше, история в БД не запрашивается.
+
+        Args:
+            chat_id: ID чата
+            contents: Тексты сообщений пользователя по порядку
+            user_profile: Поля пользователя в формате аргументов Database.upsert_user
+            limit: Максимальное количество сообщений истории (None = все)
+
+        Returns:
+            История диалога (включая новые сообщения) в формате OpenAI API
+        """
+        key = (chat_id, user_profile["user_id"])
+        token_counts = [self._count_tokens(content) for content in contents]
+
+        # Для ответа нужны limit последних сообщений до новых (или вся история)
+        cached = self.cache.get(key, limit) if self.cache is not None else None
+        if self.cache is not None and cached is not None:
+            await self.db.ingest_user_turns(
+                chat_id=chat_id,
+                contents=contents,
+                fetch_history=False,
+                token_counts=token_counts,
+                **user_profile,
+            )
+            for content in contents:
+                self.cache.append(key, "user", content)
+            new_messages = [{"role": "user", "content": content} for content in contents]
+            return self._apply_limit([*cached, *new_messages], limit)
+
+        fetch_limit = self._fetch_limit(limit)
+        history = await self.db.ingest_user_turns(
+            chat_id=chat_id,
+            contents=contents,
+            history_limit=fetch_limit,
+            token_counts=token_counts,
+            **user_profile,
+        )
+        history = self._remember(key, history, fetch_limit, limit)
+        logger.debug(
+            f"User turn ingested for chat_id={chat_id}, user_id={user_profile['user_id']}, "
+            f"messages={len(contents)}, history={len(history)}"
+        )
+        return history
+
     async def clear_history(self, chat_id: int, user_id: int) -> None:
         """Очистка истории диалога пользователя (soft delete).
 
@@ -58,4 +183,70 @@ class Conversation:
             user_id: ID пользователя
         """
         await self.db.clear_history(chat_id, user_id)
+        if self.cache is not None:
+            self.cache.invalidate((chat_id, user_id))
         logger.info(f"History cleared for chat_id={chat_id}, user_id={user_id}")
+
+    def _count_tokens(self, content: str) -> int | None:
+        """Подсчет токенов сообщения локальным токенизатором.
+
+        Args:
+            content: Текст сообщения
+
+        Returns:
+            Количество токенов или None, если счетчик не задан
+        """
+        return self.token_counter.count(content) if self.token_counter is not None else None
+
+    def _fetch_limit(self, limit: int | None) -> int | None:
+        """Лимит выборки из БД, позволяющий заполнить окно кеша и определить, полная ли история.
+
+        Args:
+            limit: Запрошенный лимит
+
+        Returns:
+            Лимит для запроса к БД
+        """
+        if self.cache is None or limit is None or limit <= 0 or limit > self.cache.window:
+            return limit
+        # На одну строку больше окна: если строк меньше, история прочитана целиком
+        return self.cache.window + 1
+
+    def _remember(
+        self,
+        key: tuple[int, int],
+        history: list[dict[str, str]],
+        fetch_limit: int | None,
+        limit: int | None,
+    ) -> list[dict[str, str]]:
+        """Сохранение прочитанной из БД истории в кеш и применение лимита.
+
+        Args:
+            key: Ключ (chat_id, user_id)
+            history: Последние сообщения, прочитанные из БД с лимитом fetch_limit
+            fetch_limit: Лимит, с которым выполнялся запрос
+            limit: Запрошенный лимит
+
+        Returns:
+            История с примененным запрошенным лимитом
+        """
+        if self.cache is not None:
+            is_complete = fetch_limit is None or fetch_limit <= 0 or len(history) < fetch_limit
+            self.cache.put(key, history, complete=is_complete)
+
+        return self._apply_limit(history, limit)
+
+    @staticmethod
+    def _apply_limit(history: list[dict[str, str]], limit: int | None) -> list[dict[str, str]]:
+        """Применение лимита к истории (последние limit сообщений, как в Database).
+
+        Args:
+            history: История в хронологическом порядке
+            limit: Лимит (None = все)
+
+        Returns:
+            История с примененным лимитом
+        """
+        if limit is not None and 0 < limit < len(history):
+            return history[-limit:]
+        return history
@@ -1,42 +1,208 @@
 """Слой работы с базой данных."""
 
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-import psycopg
-from psycopg.rows import dict_row
+from psycopg import AsyncConnection, OperationalError
+from psycopg.rows import DictRow, dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from .user_profile_cache import UserProfileCache
+from .write_behind import MessageRow, UserRow, WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
+# SQL запросы, общие для отдельных методов и ingest_user_turn
+_INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (
+        chat_id, user_id, role, content, character_count,
+        token_count, prompt_tokens, completion_tokens
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+_UPSERT_USER_SQL = """
+    INSERT INTO users (
+        user_id, username, first_name, last_name,
+        language_code, is_premium, is_bot
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = EXCLUDED.username,
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        language_code = EXCLUDED.language_code,
+        is_premium = EXCLUDED.is_premium,
+        is_bot = EXCLUDED.is_bot,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (
+        users.username, users.first_name, users.last_name,
+        users.language_code, users.is_premium, users.is_bot
+    ) IS DISTINCT FROM (
+        EXCLUDED.username, EXCLUDED.first_name, EXCLUDED.last_name,
+        EXCLUDED.language_code, EXCLUDED.is_premium, EXCLUDED.is_bot
+    )
+"""
+
+_SELECT_HISTORY_SQL = """
+    SELECT role, content
+    FROM messages
+    WHERE chat_id = %s AND user_id = %s AND deleted_at IS NULL
+    ORDER BY created_at ASC, id ASC
+"""
+
+# Последние N сообщений читаются по индексу idx_messages_history в обратном
+# порядке и разворачиваются в Python (см. Database._rows_to_messages)
+_SELECT_HISTORY_LIMIT_SQL = """
+    SELECT role, content
+    FROM messages
+    WHERE chat_id = %s AND user_id = %s AND deleted_at IS NULL
+    ORDER BY created_at DESC, id DESC
+    LIMIT %s
+"""
+
 
 class Database:
-    """Класс для работы с PostgreSQL через psycopg3."""
+    """Класс для работы с PostgreSQL через psycopg3 и общий пул соединений."""
+
+    def __init__(
+        self,
+        connection_string: str,
+        timeout: int,
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_max_idle: float = 300.0,
+        write_behind_interval_ms: int = 0,
+        write_behind_max_batch: int = 100,
+        write_behind_max_pending: int = 10000,
+        write_behind_max_retries: int = 3,
+        user_profile_cache_ttl: float = 0.0,
+        user_profile_cache_max_entries: int = 10000,
+    ) -> None:
+        """Инициализация пула подключений к базе данных.
 
-    def __init__(self, connection_string: str, timeout: int) -> None:
-        """Инициализация подключения к базе данных.
+        Пул создается закрытым и открывается в open() или при первом запросе.
 
         Args:
             connection_string: URL подключения к PostgreSQL
-            timeout: Таймаут операций в секундах
+            timeout: Таймаут подключения и ожидания соединения из пула в секундах
+            pool_min_size: Минимальное количество соединений в пуле
+            pool_max_size: Максимальное количество соединений в пуле
+            pool_max_idle: Время простоя (сек), после которого лишние соединения закрываются
+            write_behind_interval_ms: Период пакетной записи отложенных строк
+                (0 = отложенная запись выключена)
+            write_behind_max_batch: Размер пакета, при котором запись запускается сразу
+            write_behind_max_pending: Количество отложенных строк, при котором
+                новые строки пишутся синхронно
+            write_behind_max_retries: Количество неудачных попыток записи строки,
+                после которого она удаляется из буфера
+            user_profile_cache_ttl: Время жизни отпечатка записанного профиля в секундах
+                (0 = кеш выключен, UPSERT пользователя на каждый вызов)
+            user_profile_cache_max_entries: Максимальное количество профилей в кеше
         """
         self.connection_string = connection_string
         self.timeout = timeout
-        logger.info("Database initialized")
+        self.pool: AsyncConnectionPool[AsyncConnection[DictRow]] = AsyncConnectionPool(
+            connection_string,
+            connection_class=AsyncConnection[DictRow],
+            kwargs={"row_factory": dict_row, "connect_timeout": timeout},
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            max_idle=pool_max_idle,
+            timeout=timeout,
+            name="systech-aidd",
+            open=False,
+        )
+        self._open_lock = asyncio.Lock()
+        self._is_open = False
+        self.write_behind: WriteBehindQueue | None = None
+        if write_behind_interval_ms > 0:
+            self.write_behind = WriteBehindQueue(
+                self._write_batch,
+                write_behind_interval_ms,
+                write_behind_max_batch,
+                max_pending=write_behind_max_pending,
+                max_retries=write_behind_max_retries,
+                # Ошибки соединения и таймаут пула: БД недоступна, строки ждут
+                transient_errors=(OperationalError,),
+                on_user_dropped=self._forget_profile,
+            )
+        self.user_profiles: UserProfileCache | None = None
+        if user_profile_cache_ttl > 0:
+            self.user_profiles = UserProfileCache(
+                user_profile_cache_ttl, user_profile_cache_max_entries
+            )
+        logger.info(
+            f"Database initialized with connection pool "
+            f"(min_size={pool_min_size}, max_size={pool_max_size})"
+        )
+
+    async def open(self) -> None:
+        """Открытие пула и ожидание минимального количества соединений."""
+        async with self._open_lock:
+            if self._is_open:
+                return
+            await self.pool.open(wait=True, timeout=self.timeout)
+            self._is_open = True
+        logger.info("Database connection pool opened")
+
+    async def close(self) -> None:
+        """Запись отложенных строк и закрытие пула соединений."""
+        if self.write_behind is not None:
+            await self.write_behind.stop()
+
+        async with self._open_lock:
+            if not self._is_open:
+                return
+            stats = self.get_pool_stats()
+            await self.pool.close()
+            self._is_open = False
+        logger.info(f"Database connection pool closed, stats: {stats}")
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncConnection[DictRow]]:
+        """Получение соединения из общего пула.
+
+        При выходе из контекста соединение возвращается в пул, транзакция
+        фиксируется (или откатывается при исключении).
+
+        Yields:
+            Асинхронное подключение к PostgreSQL
+        """
+        if not self._is_open:
+            await self.open()
+        async with self.pool.connection() as conn:
+            yield conn
 
-    def _get_connection(self) -> psycopg.Connection[dict[str, Any]]:
-        """Получение подключения к базе данных.
+    def get_pool_stats(self) -> dict[str, int]:
+        """Метрики пула соединений.
+
+        Включает размер пула, количество свободных соединений и метрики
+        ожидания (requests_waiting, requests_wait_ms, requests_queued).
 
         Returns:
-            Подключение к PostgreSQL
+            Словарь с метриками psycopg_pool
         """
-        return psycopg.connect(
-            self.connection_string,
-            row_factory=dict_row,
-            connect_timeout=self.timeout,
-        )
+        return self.pool.get_stats()
+
+    async def flush(self) -> None:
+        """Немедленная запись всех отложенных строк (если write-behind включен)."""
+        if self.write_behind is not None:
+            await self.write_behind.flush()
 
     async def add_message(
-        self, chat_id: int, user_id: int, role: str, content: str
+        self,
+        chat_id: int,
+        user_id: int,
+        role: str,
+        content: str,
+        defer: bool = False,
+        token_count: int | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
     ) -> None:
         """Добавление сообщения в базу данных.
 
@@ -45,18 +211,35 @@ class Database:
             user_id: ID пользователя
             role: Роль отправителя (user, assistant, system)
             content: Текст сообщения
+            defer: Поставить запись в буфер write-behind вместо немедленного INSERT
+                (игнорируется, если write-behind выключен или буфер заполнен)
+            token_count: Количество токенов в тексте сообщения
+            prompt_tokens: Токены промпта запроса к LLM (для ответа ассистента)
+            completion_tokens: Токены ответа LLM (для ответа ассистента)
         """
-        character_count = len(content)
+        row = (
+            chat_id,
+            user_id,
+            role,
+            content,
+            len(content),
+            token_count,
+            prompt_tokens,
+            completion_tokens,
+        )
 
-        with self._get_connection() as conn, conn.cursor() as cur:
-            cur.execute(
-                """
-                    INSERT INTO messages (chat_id, user_id, role, content, character_count)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
-                (chat_id, user_id, role, content, character_count),
+        if defer and self.write_behind is not None and not self.write_behind.is_full:
+            self.write_behind.add_message(row)
+            logger.debug(
+                f"Message deferred for chat_id={chat_id}, user_id={user_id}, role={role}"
             )
-            conn.commit()
+            return
+
+        await self._ensure_written(chat_id, user_id)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(_INSERT_MESSAGE_SQL, row)
+            await conn.commit()
 
         logger.debug(
             f"Message added for chat_id={chat_id}, user_id={user_id}, role={role}"
@@ -75,33 +258,15 @@ class Database:
         Returns:
             Список сообщений в формате OpenAI API (только role и content)
         """
-        with self._get_connection() as conn, conn.cursor() as cur:
-            if limit is not None and limit > 0:
-                cur.execute(
-                    """
-                        SELECT role, content
-                        FROM messages
-                        WHERE chat_id = %s AND user_id = %s AND deleted_at IS NULL
-                        ORDER BY created_at ASC
-                        LIMIT %s
-                        """,
-                    (chat_id, user_id, limit),
-                )
-            else:
-                cur.execute(
-                    """
-                        SELECT role, content
-                        FROM messages
-                        WHERE chat_id = %s AND user_id = %s AND deleted_at IS NULL
-                        ORDER BY created_at ASC
-                        """,
-                    (chat_id, user_id),
-                )
-
-            rows = cur.fetchall()
+        await self._ensure_written(chat_id, user_id)
+        query, params = self._history_query(chat_id, user_id, limit)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(query, params)
+            rows = await cur.fetchall()
 
         # Возвращаем только role и content (без других полей)
-        result = [{"role": row["role"], "content": row["content"]} for row in rows]
+        result = self._rows_to_messages(rows, newest_first=self._is_limited(limit))
 
         logger.debug(
             f"Retrieved {len(result)} messages for chat_id={chat_id}, user_id={user_id}"
@@ -115,8 +280,10 @@ class Database:
             chat_id: ID чата
             user_id: ID пользователя
         """
-        with self._get_connection() as conn, conn.cursor() as cur:
-            cur.execute(
+        await self._ensure_written(chat_id, user_id)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
                 """
                     UPDATE messages
                     SET deleted_at = CURRENT_TIMESTAMP
@@ -125,7 +292,7 @@ class Database:
                 (chat_id, user_id),
             )
             affected_rows = cur.rowcount
-            conn.commit()
+            await conn.commit()
 
         logger.info(
             f"Soft deleted {affected_rows} messages for chat_id={chat_id}, user_id={user_id}"
@@ -140,9 +307,13 @@ class Database:
         language_code: str | None,
         is_premium: bool,
         is_bot: bool,
+        defer: bool = False,
     ) -> None:
         """Создание или обновление информации о пользователе (UPSERT).
 
+        Если профиль не изменился с последней записи (см. UserProfileCache),
+        UPSERT не выполняется.
+
         Args:
             user_id: ID пользователя Telegram
             username: @username пользователя
@@ -151,30 +322,167 @@ class Database:
             language_code: Код языка интерфейса
             is_premium: Наличие Telegram Premium
             is_bot: Является ли пользователь ботом
+            defer: Поставить запись в буфер write-behind вместо немедленного UPSERT
+                (игнорируется, если write-behind выключен или буфер заполнен)
         """
-        with self._get_connection() as conn, conn.cursor() as cur:
-            cur.execute(
-                """
-                    INSERT INTO users (
-                        user_id, username, first_name, last_name,
-                        language_code, is_premium, is_bot
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (user_id) DO UPDATE SET
-                        username = EXCLUDED.username,
-                        first_name = EXCLUDED.first_name,
-                        last_name = EXCLUDED.last_name,
-                        language_code = EXCLUDED.language_code,
-                        is_premium = EXCLUDED.is_premium,
-                        is_bot = EXCLUDED.is_bot,
-                        updated_at = CURRENT_TIMESTAMP
-                    """,
-                (user_id, username, first_name, last_name, language_code, is_premium, is_bot),
-            )
-            conn.commit()
+        row = (user_id, username, first_name, last_name, language_code, is_premium, is_bot)
+
+        if self.user_profiles is not None and self.user_profiles.is_fresh(row):
+            logger.debug(f"User upsert skipped, profile unchanged: user_id={user_id}")
+            return
+
+        if defer and self.write_behind is not None and not self.write_behind.is_full:
+            # Буфер повторяет неудачную запись, поэтому профиль считается записанным
+            # (если строка будет удалена из буфера, отпечаток сбросит _forget_profile)
+            self.write_behind.upsert_user(row)
+            self._remember_profile(row)
+            logger.debug(f"User upsert deferred: user_id={user_id}")
+            return
+
+        # Отложенная старая версия профиля не должна перезаписать новую
+        await self._ensure_written(user_id=user_id)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(_UPSERT_USER_SQL, row)
+            await conn.commit()
+        self._remember_profile(row)
 
         logger.debug(f"User upserted: user_id={user_id}, username={username}")
 
+    async def ingest_user_turn(
+        self,
+        chat_id: int,
+        user_id: int,
+        content: str,
+        username: str | None,
+        first_name: str,
+        last_name: str | None,
+        language_code: str | None,
+        is_premium: bool,
+        is_bot: bool,
+        history_limit: int | None = None,
+        fetch_history: bool = True,
+        token_count: int | None = None,
+    ) -> list[dict[str, str]]:
+        """Прием сообщения пользователя за один сетевой round trip.
+
+        UPSERT пользователя, INSERT сообщения, выборка истории и COMMIT
+        отправляются одним пакетом в pipeline mode psycopg и выполняются
+        в одной транзакции. UPSERT пропускается, если профиль не изменился
+        с последней записи (см. UserProfileCache).
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя Telegram
+            content: Текст сообщения пользователя
+            username: @username пользователя
+            first_name: Имя пользователя
+            last_name: Фамилия пользователя
+            language_code: Код языка интерфейса
+            is_premium: Наличие Telegram Premium
+            is_bot: Является ли пользователь ботом
+            history_limit: Максимальное количество сообщений истории (None = все)
+            fetch_history: Выполнять ли выборку истории (False, если она уже есть в кеше)
+            token_count: Количество токенов в тексте сообщения
+
+        Returns:
+            История диалога (включая новое сообщение) в формате OpenAI API
+            или пустой список, если fetch_history=False
+        """
+        return await self.ingest_user_turns(
+            chat_id,
+            user_id,
+            [content],
+            username,
+            first_name,
+            last_name,
+            language_code,
+            is_premium,
+            is_bot,
+            history_limit=history_limit,
+            fetch_history=fetch_history,
+            token_counts=[token_count],
+        )
+
+    async def ingest_user_turns(
+        self,
+        chat_id: int,
+        user_id: int,
+        contents: list[str],
+        username: str | None,
+        first_name: str,
+        last_name: str | None,
+        language_code: str | None,
+        is_premium: bool,
+        is_bot: bool,
+        history_limit: int | None = None,
+        fetch_history: bool = True,
+        token_counts: list[int | None] | None = None,
+    ) -> list[dict[str, str]]:
+        """Прием серии сообщений пользователя за один сетевой round trip.
+
+        Как ingest_user_turn, но INSERT выполняется для каждого сообщения
+        серии (по порядку), а история читается один раз после всех вставок.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя Telegram
+            contents: Тексты сообщений пользователя по порядку
+            username: @username пользователя
+            first_name: Имя пользователя
+            last_name: Фамилия пользователя
+            language_code: Код языка интерфейса
+            is_premium: Наличие Telegram Premium
+            is_bot: Является ли пользователь ботом
+            history_limit: Максимальное количество сообщений истории (None = все)
+            fetch_history: Выполнять ли выборку истории (False, если она уже есть в кеше)
+            token_counts: Количество токенов в текстах сообщений (None = неизвестно)
+
+        Returns:
+            История диалога (включая новые сообщения) в формате OpenAI API
+            или пустой список, если fetch_history=False
+        """
+        await self._ensure_written(chat_id, user_id)
+        query, params = self._history_query(chat_id, user_id, history_limit)
+        user_row = (user_id, username, first_name, last_name, language_code, is_premium, is_bot)
+        upsert = self.user_profiles is None or not self.user_profiles.is_fresh(user_row)
+        if token_counts is None:
+            token_counts = [None] * len(contents)
+
+        try:
+            async with (
+                self.connection() as conn,
+                conn.pipeline(),
+                conn.cursor() as cur,
+            ):
+                if upsert:
+                    await cur.execute(_UPSERT_USER_SQL, user_row)
+                for content, token_count in zip(contents, token_counts, strict=True):
+                    await cur.execute(
+                        _INSERT_MESSAGE_SQL,
+                        (chat_id, user_id, "user", content, len(content), token_count, None, None),
+                    )
+                if fetch_history:
+                    await cur.execute(query, params)
+                await conn.commit()
+                rows = await cur.fetchall() if fetch_history else []
+        except Exception:
+            # Например, строку users удалили в обход процесса: следующий вызов
+            # выполнит UPSERT
+            if self.user_profiles is not None:
+                self.user_profiles.invalidate(user_id)
+            raise
+        if upsert:
+            self._remember_profile(user_row)
+
+        result = self._rows_to_messages(rows, newest_first=self._is_limited(history_limit))
+
+        logger.debug(
+            f"User turn ingested for chat_id={chat_id}, user_id={user_id}, "
+            f"messages={len(contents)}, history={len(result)}"
+        )
+        return result
+
     async def get_user(self, user_id: int) -> dict[str, Any] | None:
         """Получение информации о пользователе.
 
@@ -184,8 +492,10 @@ class Database:
         Returns:
             Словарь с информацией о пользователе или None, если не найден
         """
-        with self._get_connection() as conn, conn.cursor() as cur:
-            cur.execute(
+        await self._ensure_written(user_id=user_id)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
                 """
                     SELECT user_id, username, first_name, last_name,
                            language_code, is_premium, is_bot,
@@ -195,7 +505,7 @@ class Database:
                     """,
                 (user_id,),
             )
-            result = cur.fetchone()
+            result = await cur.fetchone()
 
         logger.debug(f"User retrieved: user_id={user_id}, found={result is not None}")
         return result
@@ -207,27 +517,40 @@ class Database:
             user_id: ID пользователя Telegram
 
         Returns:
-            Словарь со статистикой (количество сообщений, символов и т.д.)
+            Словарь со статистикой (количество сообщений, символов и т.д.).
+            Токены (total_tokens, prompt_tokens, completion_tokens) считаются
+            по всему диалогу, включая ответы ассистента
         """
-        with self._get_connection() as conn, conn.cursor() as cur:
-            cur.execute(
+        await self._ensure_written(user_id=user_id)
+
+        async with self.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
                 """
                     SELECT
-                        COUNT(*) as message_count,
-                        SUM(character_count) as total_characters,
-                        MIN(created_at) as first_message_at,
-                        MAX(created_at) as last_message_at
+                        COUNT(*) FILTER (WHERE role = 'user') as message_count,
+                        SUM(character_count) FILTER (WHERE role = 'user') as total_characters,
+                        MIN(created_at) FILTER (WHERE role = 'user') as first_message_at,
+                        MAX(created_at) FILTER (WHERE role = 'user') as last_message_at,
+                        SUM(token_count) as total_tokens,
+                        SUM(prompt_tokens) as prompt_tokens,
+                        SUM(completion_tokens) as completion_tokens
                     FROM messages
-                    WHERE user_id = %s AND role = 'user' AND deleted_at IS NULL
+                    WHERE user_id = %s AND deleted_at IS NULL
                     """,
                 (user_id,),
             )
-            result = cur.fetchone()
+            result = await cur.fetchone()
 
         # Преобразуем None в 0 для числовых полей
         if result:
-            result["message_count"] = result["message_count"] or 0
-            result["total_characters"] = result["total_characters"] or 0
+            for field in (
+                "message_count",
+                "total_characters",
+                "total_tokens",
+                "prompt_tokens",
+                "completion_tokens",
+            ):
+                result[field] = result[field] or 0
 
         logger.debug(
             f"User stats retrieved: user_id={user_id}, "
@@ -238,6 +561,93 @@ class Database:
             "total_characters": 0,
             "first_message_at": None,
             "last_message_at": None,
+            "total_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
         }
 
+    @staticmethod
+    def _history_query(
+        chat_id: int, user_id: int, limit: int | None
+    ) -> tuple[str, tuple[int, ...]]:
+        """Формирование запроса истории диалога.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+            limit: Максимальное количество сообщений (None = все)
+
+        Returns:
+            Текст запроса и параметры
+        """
+        if limit is not None and limit > 0:
+            return _SELECT_HISTORY_LIMIT_SQL, (chat_id, user_id, limit)
+        return _SELECT_HISTORY_SQL, (chat_id, user_id)
+
+    @staticmethod
+    def _is_limited(limit: int | None) -> bool:
+        """Проверка, используется ли запрос последних N сообщений.
+
+        Args:
+            limit: Максимальное количество сообщений (None = все)
+
+        Returns:
+            True, если история читается с LIMIT (от новых к старым)
+        """
+        return limit is not None and limit > 0
+
+    @staticmethod
+    def _rows_to_messages(rows: list[DictRow], newest_first: bool = False) -> list[dict[str, str]]:
+        """Преобразование строк истории в формат OpenAI API.
+
+        Args:
+            rows: Строки с полями role и content
+            newest_first: Строки отсортированы от новых к старым и их нужно развернуть
+
+        Returns:
+            Список сообщений в хронологическом порядке (только role и content)
+        """
+        ordered = reversed(rows) if newest_first else rows
+        return [{"role": row["role"], "content": row["content"]} for row in ordered]
+
+    async def _ensure_written(self, chat_id: int | None = None, user_id: int | None = None) -> None:
+        """Запись отложенных строк перед чтением (read-your-writes).
 
+        Args:
+            chat_id: ID чата, для которого выполняется чтение
+            user_id: ID пользователя, для которого выполняется чтение
+        """
+        if self.write_behind is not None and self.write_behind.has_pending(chat_id, user_id):
+            await self.write_behind.flush()
+
+    def _remember_profile(self, row: UserRow) -> None:
+        """Сохранение отпечатка записанного профиля (если кеш профилей включен).
+
+        Args:
+            row: Строка users
+        """
+        if self.user_profiles is not None:
+            self.user_profiles.remember(row)
+
+    def _forget_profile(self, user_id: int) -> None:
+        """Удаление отпечатка профиля, который не удалось записать.
+
+        Args:
+            user_id: ID пользователя
+        """
+        if self.user_profiles is not None:
+            self.user_profiles.invalidate(user_id)
+
+    async def _write_batch(self, users: list[UserRow], messages: list[MessageRow]) -> None:
+        """Пакетная запись строк из буфера write-behind в одной транзакции.
+
+        Args:
+            users: Строки для UPSERT в users
+            messages: Строки для INSERT в messages
+        """
+        async with self.connection() as conn, conn.cursor() as cur:
+            if users:
+                await cur.executemany(_UPSERT_USER_SQL, users)
+            if messages:
+                await cur.executemany(_INSERT_MESSAGE_SQL, messages)
+            await conn.commit()
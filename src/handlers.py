@@ -1,34 +1,61 @@
 """Обработчики Telegram сообщений и команд."""
 
 import logging
+import time
+from typing import Any
 
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from openai import APIError, APITimeoutError
 
 from .config import Config
+from .context_builder import ContextBuilder
 from .conversation import Conversation
 from .database import Database
-from .llm_client import LLMClient, LLMError
+from .keyed_serializer import KeyedSerializer
+from .llm_client import CircuitOpenError, LLMBusyError, LLMClient, LLMError
+from .llm_response import LLMResponse
+from .message_coalescer import MessageCoalescer
 
 logger = logging.getLogger(__name__)
 
+# Максимальная длина текста сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Текст сообщения-заглушки до прихода первых токенов
+STREAM_PLACEHOLDER_TEXT = "✍️ Пишу ответ..."
+
+
+def user_profile(user: types.User) -> dict[str, Any]:
+    """Поля пользователя Telegram в формате аргументов Database.upsert_user.
+
+    Args:
+        user: Объект пользователя из Telegram
+
+    Returns:
+        Словарь с полями пользователя
+    """
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "language_code": user.language_code,
+        "is_premium": user.is_premium or False,
+        "is_bot": user.is_bot,
+    }
+
 
 async def save_user_info(database: Database, user: types.User) -> None:
     """Сохранение/обновление информации о пользователе в БД.
 
+    Запись идет через буфер write-behind (если он включен), чтобы не задерживать ответ.
+
     Args:
         database: Экземпляр Database для работы с БД
         user: Объект пользователя из Telegram
     """
-    await database.upsert_user(
-        user_id=user.id,
-        username=user.username,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        language_code=user.language_code,
-        is_premium=user.is_premium or False,
-        is_bot=user.is_bot,
-    )
+    await database.upsert_user(**user_profile(user), defer=True)
     logger.debug(f"User info saved: user_id={user.id}, username={user.username}")
 
 
@@ -36,7 +63,13 @@ class MessageHandler:
     """Класс для обработки сообщений и команд бота."""
 
     def __init__(
-        self, config: Config, llm_client: LLMClient, conversation: Conversation, database: Database
+        self,
+        config: Config,
+        llm_client: LLMClient,
+        conversation: Conversation,
+        database: Database,
+        context_builder: ContextBuilder | None = None,
+        serializer: KeyedSerializer | None = None,
     ):
         """Инициализация обработчика.
 
@@ -45,11 +78,27 @@ class MessageHandler:
             llm_client: Клиент для работы с LLM
             conversation: Хранилище истории диалогов
             database: Слой работы с базой данных
+            context_builder: Отбор истории по бюджету токенов (None = последние
+                max_history_length сообщений)
+            serializer: Очередь обработки по (chat_id, user_id) (None = своя очередь
+                обработчика)
         """
         self.config = config
         self.llm_client = llm_client
         self.conversation = conversation
         self.database = database
+        self.context_builder = context_builder
+        # С бюджетом токенов история не обрезается по max_history_length:
+        # короткие реплики занимают мало токенов, и их помещается больше
+        self.history_limit = (
+            config.context_max_messages
+            if context_builder is not None
+            else config.max_history_length
+        )
+        self.serializer = serializer if serializer is not None else KeyedSerializer()
+        self.coalescer: MessageCoalescer[types.Message] | None = None
+        if config.chat_coalesce_window_ms > 0:
+            self.coalescer = MessageCoalescer(config.chat_coalesce_window_ms / 1000)
         logger.info("MessageHandler initialized")
 
     async def start_command(self, message: types.Message) -> None:
@@ -95,15 +144,23 @@ class MessageHandler:
         if not message.from_user:
             return
 
+        user_id = message.from_user.id
+        chat_id = message.chat.id
+        key = (chat_id, user_id)
+        # Серия сообщений, пришедших до /reset, еще ждет окна объединения:
+        # она обрабатывается здесь, до очистки, а не после нее
+        burst = self.coalescer.take(key) if self.coalescer is not None else None
+
         # Сохраняем информацию о пользователе
         await save_user_info(self.database, message.from_user)
 
-        user_id = message.from_user.id
-        chat_id = message.chat.id
         logger.info(f"Command /reset from user {user_id} in chat {chat_id}")
 
-        # Очищаем историю диалога
-        await self.conversation.clear_history(chat_id, user_id)
+        # Очищаем историю диалога (после ответа на уже полученные сообщения)
+        async with self.serializer.hold(key):
+            if burst:
+                await self._answer_message(burst)
+            await self.conversation.clear_history(chat_id, user_id)
 
         reset_text = "🔄 <b>История диалога очищена!</b>\n\nМожете начать новый разговор."
 
@@ -198,6 +255,7 @@ class MessageHandler:
             f"📊 <b>Статистика:</b>\n"
             f"💬 Сообщений отправлено: {stats['message_count']}\n"
             f"📝 Всего символов: {stats['total_characters']:,}\n"
+            f"🔢 Токенов в диалогах: {stats['total_tokens']:,}\n"
         )
 
         # Добавляем информацию о первом сообщении, если есть
@@ -211,14 +269,41 @@ class MessageHandler:
     async def handle_message(self, message: types.Message) -> None:
         """Обработчик текстовых сообщений.
 
+        Сообщения одного диалога обрабатываются по очереди: следующее сообщение
+        сохраняется и отправляется в LLM после ответа на предыдущее, с ним в
+        истории. Сообщения разных диалогов обрабатываются параллельно.
+
+        Если включено окно объединения (chat_coalesce_window_ms), серия
+        сообщений с короткими паузами (длинный код, разбитый Telegram)
+        сохраняется отдельными сообщениями, но получает один ответ.
+
         Args:
             message: Сообщение от пользователя
         """
         if not message.from_user or not message.text:
             return
 
-        # Сохраняем информацию о пользователе
-        await save_user_info(self.database, message.from_user)
+        key = (message.chat.id, message.from_user.id)
+        messages = [message]
+        if self.coalescer is not None:
+            burst = await self.coalescer.collect(key, message)
+            if burst is None:
+                # Сообщение войдет в серию более позднего сообщения
+                return
+            messages = burst
+
+        async with self.serializer.hold(key):
+            await self._answer_message(messages)
+
+    async def _answer_message(self, messages: list[types.Message]) -> None:
+        """Сохранение сообщений, запрос к LLM и отправка ответа на последнее.
+
+        Args:
+            messages: Текстовые сообщения пользователя одного диалога по порядку
+        """
+        message = messages[-1]
+        if not message.from_user or not message.text:
+            return
 
         user_id = message.from_user.id
         chat_id = message.chat.id
@@ -227,31 +312,52 @@ class MessageHandler:
         logger.info(
             f"Message from user {user_id} (@{message.from_user.username or 'no_username'}) "
             f"in chat {chat_id}, length: {len(user_message)}"
+            + (f", coalesced: {len(messages)} messages" if len(messages) > 1 else "")
         )
 
-        # Сохраняем сообщение пользователя в историю
-        await self.conversation.add_message(chat_id, user_id, "user", user_message)
-
-        # Получаем историю диалога с учетом лимита
-        history = await self.conversation.get_history(
-            chat_id, user_id, limit=self.config.max_history_length
+        # Сохраняем пользователя и все его сообщения серии, получаем историю с
+        # учетом лимита (один round trip к БД, история читается один раз)
+        history = await self.conversation.ingest_user_turns(
+            chat_id,
+            [fragment.text or "" for fragment in messages],
+            user_profile(message.from_user),
+            limit=self.history_limit,
         )
 
+        # Оставляем только последние сообщения, помещающиеся в бюджет токенов
+        if self.context_builder is not None:
+            history = self.context_builder.build(history, self.config.system_prompt)
+
         # Отправляем "typing..." индикатор
-        if message.bot:
+        if message.bot and not self.config.llm_streaming:
             await message.bot.send_chat_action(chat_id, "typing")
 
         try:
-            # Получаем ответ от LLM
-            llm_response = await self.llm_client.get_response(
-                messages=history, system_prompt=self.config.system_prompt
+            # Получаем ответ от LLM (в потоковом режиме он уже показан пользователю)
+            if self.config.llm_streaming:
+                completion = await self._stream_answer(message, history, user_id)
+            else:
+                completion = await self.llm_client.get_completion(
+                    messages=history, system_prompt=self.config.system_prompt, user_key=user_id
+                )
+            llm_response = completion.content
+
+            # Сохраняем ответ ассистента в историю вместе с расходом токенов
+            # (без ожидания commit, если включен write-behind)
+            await self.conversation.add_message(
+                chat_id,
+                user_id,
+                "assistant",
+                llm_response,
+                defer=True,
+                token_count=completion.completion_tokens,
+                prompt_tokens=completion.prompt_tokens,
+                completion_tokens=completion.completion_tokens,
             )
 
-            # Сохраняем ответ ассистента в историю
-            await self.conversation.add_message(chat_id, user_id, "assistant", llm_response)
-
             # Отправляем ответ пользователю
-            await message.answer(llm_response)
+            if not self.config.llm_streaming:
+                await message.answer(llm_response)
 
             logger.info(f"Response sent to user {user_id}, length: {len(llm_response)}")
 
@@ -269,6 +375,16 @@ class MessageHandler:
             )
             await message.answer(error_text)
 
+        except LLMBusyError as e:
+            logger.warning(f"LLM busy for user {user_id}: {e}")
+            error_text = "⏳ Сейчас много запросов, попробуйте еще раз через несколько секунд."
+            await message.answer(error_text)
+
+        except CircuitOpenError as e:
+            logger.warning(f"LLM unavailable for user {user_id}: {e}")
+            error_text = "⏳ Сервис LLM временно недоступен.\nПопробуйте через минуту."
+            await message.answer(error_text)
+
         except LLMError as e:
             logger.error(f"LLM error for user {user_id}: {e}", exc_info=True)
             error_text = (
@@ -287,3 +403,130 @@ class MessageHandler:
                 "Попробуйте еще раз или используйте /reset для сброса диалога."
             )
             await message.answer(error_text)
+
+    async def _stream_answer(
+        self, message: types.Message, history: list[dict[str, str]], user_id: int
+    ) -> LLMResponse:
+        """Потоковая генерация ответа с прогрессивным редактированием сообщения.
+
+        Сразу отправляется сообщение-заглушка, которое затем редактируется по мере
+        генерации не чаще одного раза в llm_stream_edit_interval секунд. Первый
+        фрагмент показывается сразу, поэтому задержка для пользователя равна
+        времени до первого токена. При ошибке заглушка удаляется.
+
+        Args:
+            message: Сообщение пользователя
+            history: История диалога для LLM
+            user_id: ID пользователя (ключ лимита одновременных запросов к LLM)
+
+        Returns:
+            Полный текст ответа и usage
+        """
+        placeholder = await message.answer(STREAM_PLACEHOLDER_TEXT, parse_mode=None)
+
+        parts: list[str] = []
+        prompt_tokens: int | None = None
+        completion_tokens: int | None = None
+        shown = ""
+        next_edit_at = 0.0
+
+        try:
+            async for chunk in self.llm_client.stream_response(
+                messages=history, system_prompt=self.config.system_prompt, user_key=user_id
+            ):
+                if chunk.prompt_tokens is not None or chunk.completion_tokens is not None:
+                    prompt_tokens = chunk.prompt_tokens
+                    completion_tokens = chunk.completion_tokens
+                if not chunk.content:
+                    continue
+
+                parts.append(chunk.content)
+                now = time.monotonic()
+                if now < next_edit_at:
+                    continue
+
+                preview = self._preview_text("".join(parts))
+                if preview != shown:
+                    retry_after = await self._edit_preview(placeholder, preview)
+                    shown = preview
+                    next_edit_at = now + max(self.config.llm_stream_edit_interval, retry_after)
+        except Exception:
+            try:
+                await placeholder.delete()
+            except Exception as e:
+                logger.debug(f"Failed to delete stream placeholder: {e}")
+            raise
+
+        answer = "".join(parts)
+        await self._finish_stream(message, placeholder, answer)
+        return LLMResponse(answer, prompt_tokens, completion_tokens)
+
+    @staticmethod
+    def _preview_text(text: str) -> str:
+        """Текст промежуточного сообщения с учетом лимита длины Telegram.
+
+        Args:
+            text: Сгенерированный на данный момент текст
+
+        Returns:
+            Текст для редактирования сообщения
+        """
+        if len(text) <= TELEGRAM_MESSAGE_LIMIT:
+            return text
+        return text[: TELEGRAM_MESSAGE_LIMIT - 1] + "…"
+
+    @staticmethod
+    async def _edit_preview(placeholder: types.Message, text: str) -> float:
+        """Редактирование промежуточного сообщения.
+
+        Промежуточный текст отправляется без разметки: незакрытые HTML-теги
+        в середине генерации ломают парсинг Telegram.
+
+        Args:
+            placeholder: Редактируемое сообщение
+            text: Новый текст
+
+        Returns:
+            Пауза до следующего редактирования, запрошенная Telegram (0, если нет)
+        """
+        try:
+            await placeholder.edit_text(text, parse_mode=None)
+        except TelegramRetryAfter as e:
+            logger.warning(f"Telegram edit rate limited, retry after {e.retry_after}s")
+            return float(e.retry_after)
+        except TelegramBadRequest as e:
+            # Например, "message is not modified"
+            logger.debug(f"Stream preview edit skipped: {e}")
+        return 0.0
+
+    @staticmethod
+    async def _finish_stream(
+        message: types.Message, placeholder: types.Message, answer: str
+    ) -> None:
+        """Финальное редактирование сообщения полным ответом.
+
+        Ответ длиннее лимита Telegram дописывается отдельными сообщениями.
+        Если разметка ответа не проходит парсинг Telegram, он отправляется
+        без разметки.
+
+        Args:
+            message: Сообщение пользователя
+            placeholder: Сообщение с промежуточным текстом
+            answer: Полный текст ответа
+        """
+        chunks = [
+            answer[i : i + TELEGRAM_MESSAGE_LIMIT]
+            for i in range(0, len(answer), TELEGRAM_MESSAGE_LIMIT)
+        ]
+        try:
+            await placeholder.edit_text(chunks[0])
+        except TelegramBadRequest as e:
+            logger.debug(f"Final stream edit failed with markup, retrying as plain text: {e}")
+            try:
+                await placeholder.edit_text(chunks[0], parse_mode=None)
+            except TelegramBadRequest as plain_error:
+                # Текст уже показан последним промежуточным редактированием
+                logger.debug(f"Final stream edit skipped: {plain_error}")
+
+        for chunk in chunks[1:]:
+            await message.answer(chunk, parse_mode=None)
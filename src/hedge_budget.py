@@ -0,0 +1,68 @@
+"""Бюджет hedged-запросов к внешнему сервису."""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeBudget:
+    """Ограничение доли дополнительных (hedged) запросов.
+
+    Каждый запрос пополняет бюджет на ratio токена (не больше max_tokens),
+    каждый hedged-запрос расходует один токен. В долгую дополнительных
+    запросов не больше ratio от общего числа, а запас max_tokens сглаживает
+    всплески медленных ответов.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float = 10.0) -> None:
+        """Инициализация бюджета.
+
+        Args:
+            ratio: Допустимая доля дополнительных запросов (0.05 = 5%)
+            max_tokens: Максимальный запас токенов
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self.denied = 0
+        logger.info(f"Hedge budget initialized: ratio={ratio}, max_tokens={max_tokens}")
+
+    def record_request(self) -> None:
+        """Учет основного запроса: пополнение бюджета."""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """Попытка потратить токен на hedged-запрос.
+
+        Returns:
+            True, если бюджет позволяет отправить дополнительный запрос
+        """
+        if self._tokens < 1.0:
+            self.denied += 1
+            return False
+        self._tokens -= 1.0
+        self.fired += 1
+        return True
+
+    def record_win(self) -> None:
+        """Учет hedged-запроса, ответившего раньше основного."""
+        self.won += 1
+
+    def stats(self) -> dict[str, float]:
+        """Метрики бюджета.
+
+        Returns:
+            Словарь с количеством запросов, отправленных и выигравших hedged-запросов,
+            отказов из-за бюджета и фактической долей дополнительных запросов
+        """
+        return {
+            "requests": self.requests,
+            "fired": self.fired,
+            "won": self.won,
+            "denied": self.denied,
+            "hedge_rate": self.fired / self.requests if self.requests else 0.0,
+        }
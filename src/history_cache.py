@@ -0,0 +1,167 @@
+"""In-process кеш окон истории диалогов с LRU-вытеснением и TTL."""
+
+import logging
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+HistoryKey = tuple[int, int]
+
+
+class _Entry:
+    """Окно последних сообщений одного диалога."""
+
+    __slots__ = ("messages", "complete", "chars", "expires_at")
+
+    def __init__(self, window: int, ttl: float) -> None:
+        self.messages: deque[dict[str, str]] = deque(maxlen=window)
+        self.complete = True
+        self.chars = 0
+        self.expires_at = time.monotonic() + ttl
+
+
+class HistoryCache:
+    """Кеш последних сообщений по ключу (chat_id, user_id).
+
+    Каждая запись - кольцевой буфер из window последних сообщений. Флаг complete
+    означает, что в буфере лежит вся неудаленная история диалога; после
+    переполнения буфера он сбрасывается, но запись продолжает отвечать на запросы
+    последних N сообщений, если N не больше размера буфера. Записи вытесняются
+    по LRU при превышении max_entries или суммарного объема max_chars и
+    устаревают через ttl секунд.
+    """
+
+    def __init__(self, window: int, max_entries: int, max_chars: int, ttl: float) -> None:
+        """Инициализация кеша.
+
+        Args:
+            window: Размер окна (сообщений на диалог)
+            max_entries: Максимальное количество диалогов в кеше
+            max_chars: Максимальный суммарный объем текста сообщений в кеше
+            ttl: Время жизни записи в секундах
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self._entries: OrderedDict[HistoryKey, _Entry] = OrderedDict()
+        self._total_chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: HistoryKey, limit: int | None = None) -> list[dict[str, str]] | None:
+        """Получение истории из кеша.
+
+        Args:
+            key: Ключ (chat_id, user_id)
+            limit: Максимальное количество последних сообщений (None = все)
+
+        Returns:
+            Копия истории или None, если кеш не может ответить на запрос
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+
+        if limit is not None and limit <= 0:
+            limit = None
+
+        if entry is None or not (
+            entry.complete or (limit is not None and limit <= len(entry.messages))
+        ):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        messages = list(entry.messages)
+        return messages[-limit:] if limit is not None else messages
+
+    def put(self, key: HistoryKey, messages: list[dict[str, str]], complete: bool = True) -> None:
+        """Сохранение истории диалога, прочитанной из БД.
+
+        В кеш попадают только последние window сообщений.
+
+        Args:
+            key: Ключ (chat_id, user_id)
+            messages: Последние сообщения диалога в хронологическом порядке
+            complete: messages содержит всю неудаленную историю диалога
+        """
+        self._remove(key)
+
+        entry = _Entry(self.window, self.ttl)
+        entry.complete = complete and len(messages) <= self.window
+        for message in messages[-self.window :]:
+            entry.messages.append(dict(message))
+            entry.chars += len(message["content"])
+
+        self._entries[key] = entry
+        self._total_chars += entry.chars
+        self._enforce_limits()
+
+    def append(self, key: HistoryKey, role: str, content: str) -> None:
+        """Добавление нового сообщения в закешированное окно.
+
+        Если диалога нет в кеше, ничего не происходит (он будет прочитан из БД).
+
+        Args:
+            key: Ключ (chat_id, user_id)
+            role: Роль отправителя
+            content: Текст сообщения
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+
+        if len(entry.messages) == self.window:
+            dropped = entry.messages[0]
+            entry.chars -= len(dropped["content"])
+            self._total_chars -= len(dropped["content"])
+            entry.complete = False
+
+        entry.messages.append({"role": role, "content": content})
+        entry.chars += len(content)
+        self._total_chars += len(content)
+        self._entries.move_to_end(key)
+        self._enforce_limits()
+
+    def invalidate(self, key: HistoryKey) -> None:
+        """Удаление диалога из кеша.
+
+        Args:
+            key: Ключ (chat_id, user_id)
+        """
+        self._remove(key)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики кеша.
+
+        Returns:
+            Словарь с количеством попаданий, промахов, вытеснений и размером кеша
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "chars": self._total_chars,
+        }
+
+    def _remove(self, key: HistoryKey) -> None:
+        """Удаление записи с учетом суммарного объема."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_chars -= entry.chars
+
+    def _enforce_limits(self) -> None:
+        """Вытеснение самых давно использованных записей при превышении лимитов."""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_chars > self.max_chars
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._total_chars -= entry.chars
+            self.evictions += 1
+            logger.debug(f"History cache evicted chat_id={key[0]}, user_id={key[1]}")
@@ -0,0 +1,104 @@
+"""Последовательная обработка запросов с одинаковым ключом."""
+
+import logging
+import time
+from asyncio import Lock
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _KeyState:
+    """Блокировка ключа и количество задач, которые ее держат или ждут."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.users = 0
+
+
+class KeyedSerializer:
+    """Блокировка на ключ: задачи с одним ключом выполняются по очереди, с разными - параллельно.
+
+    Очередь по ключу FIFO (asyncio.Lock пропускает ожидающих в порядке
+    прихода). Блокировка ключа удаляется, как только ее никто не держит и не
+    ждет, поэтому количество хранимых ключей ограничено количеством
+    одновременно обрабатываемых диалогов.
+    """
+
+    def __init__(self, slow_wait: float = 5.0) -> None:
+        """Инициализация сериализатора.
+
+        Args:
+            slow_wait: Ожидание в секундах, после которого оно пишется в лог
+        """
+        self.slow_wait = slow_wait
+        self._keys: dict[Hashable, _KeyState] = {}
+        self.max_active_keys = 0
+        self.acquired = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def active_keys(self) -> int:
+        """Количество ключей, по которым сейчас есть задачи."""
+        return len(self._keys)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        """Выполнение блока после завершения предыдущих задач с тем же ключом.
+
+        Args:
+            key: Ключ очереди (например, (chat_id, user_id))
+
+        Yields:
+            None: Управление на время выполнения задачи
+        """
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _KeyState()
+            self.max_active_keys = max(self.max_active_keys, len(self._keys))
+        state.users += 1
+        try:
+            if state.lock.locked():
+                self.contended += 1
+            started = time.monotonic()
+            async with state.lock:
+                self._record_wait(key, time.monotonic() - started)
+                yield
+        finally:
+            state.users -= 1
+            if not state.users:
+                del self._keys[key]
+
+    def stats(self) -> dict[str, float]:
+        """Метрики сериализатора.
+
+        Returns:
+            Словарь с количеством активных ключей, выполненных и ожидавших
+            очереди задач и временем ожидания
+        """
+        return {
+            "active_keys": self.active_keys,
+            "max_active_keys": self.max_active_keys,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "avg_wait_ms": self.total_wait / self.acquired * 1000 if self.acquired else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def _record_wait(self, key: Hashable, waited: float) -> None:
+        """Учет времени ожидания очереди ключа.
+
+        Args:
+            key: Ключ очереди
+            waited: Время ожидания в секундах
+        """
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited >= self.slow_wait:
+            logger.info(f"Task for key {key} waited {waited:.2f}s for previous tasks")
@@ -1,14 +1,36 @@
 """Клиент для работы с LLM через OpenRouter API."""
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Any
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Any, TypeVar
 
-from openai import APIError, APITimeoutError, AsyncOpenAI
+import httpx
+from openai import APIConnectionError, APIError, APIStatusError, APITimeoutError, AsyncOpenAI
 
+from .admission_controller import AdmissionController, AdmissionRejectedError
+from .circuit_breaker import STATE_OPEN, CircuitBreaker
 from .config import Config
+from .hedge_budget import HedgeBudget
+from .llm_http_client import create_llm_http_client
+from .llm_response import LLMResponse
+from .model_router import ModelRouter
+from .response_cache.backend import ResponseCacheBackend
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Коды ответа, при которых запрос повторяется и засчитывается circuit breaker
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+
 
 class LLMError(Exception):
     """Базовое исключение для ошибок LLM."""
@@ -16,30 +38,124 @@ class LLMError(Exception):
     pass
 
 
+class CircuitOpenError(LLMError):
+    """Запрос отклонен без обращения к API: circuit breaker модели разомкнут."""
+
+    pass
+
+
+class LLMBusyError(LLMError):
+    """Запрос отклонен без обращения к API: превышен лимит одновременных запросов."""
+
+    pass
+
+
 class LLMClient:
     """Класс для взаимодействия с LLM через OpenRouter."""
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        response_cache: ResponseCacheBackend | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         """Инициализация клиента LLM.
 
         Args:
             config: Конфигурация приложения
+            response_cache: Хранилище кеша ответов (None = кеш выключен)
+            http_client: Общий HTTP клиент (None = создать по конфигурации;
+                переданный клиент закрывает его владелец)
         """
         self.config = config
+        self.response_cache = response_cache
+        self._owns_http_client = http_client is None
+        self.http_client = (
+            http_client if http_client is not None else create_llm_http_client(config)
+        )
+        # Повторы выполняет _call_with_retry, встроенные повторы SDK отключены
         self.client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=config.openrouter_base_url,
             api_key=config.openrouter_api_key,
+            max_retries=0,
+            http_client=self.http_client,
+        )
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.router = ModelRouter(
+            [config.openrouter_model, *config.openrouter_fallback_models],
+            explore_rate=config.llm_router_explore_rate,
+        )
+        self.retries = 0
+        self.hedge_budget = (
+            HedgeBudget(config.llm_hedge_budget) if config.llm_hedge_budget > 0 else None
+        )
+        self.admission: AdmissionController | None = None
+        if config.llm_max_concurrent > 0:
+            self.admission = AdmissionController(
+                config.llm_max_concurrent,
+                per_user_limit=config.llm_per_user_concurrency,
+                max_queue=config.llm_queue_max_size,
+                queue_timeout=config.llm_queue_timeout,
+            )
+        logger.info(
+            f"LLM client initialized with model: {config.openrouter_model}"
+            + (
+                f", fallback: {', '.join(config.openrouter_fallback_models)}"
+                if config.openrouter_fallback_models
+                else ""
+            )
+        )
+
+    async def close(self) -> None:
+        """Закрытие HTTP клиента и его пула соединений (если клиент создан здесь)."""
+        if self._owns_http_client:
+            await self.client.close()
+        logger.info("LLM client closed")
+
+    async def warm_up(self) -> None:
+        """Открытие соединений с API до первого запроса.
+
+        TLS и HTTP/2 handshake выполняются при старте, а не во время ответа
+        первому пользователю. Ошибка прогрева не мешает запуску: соединение
+        будет открыто при первом запросе.
+        """
+        connections = self.config.llm_http_warmup_connections
+        if connections <= 0:
+            return
+
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(self.http_client.head(str(self.client.base_url)) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.warning(f"LLM connection warm-up failed: {errors[0]!r}")
+            return
+
+        http_versions = {
+            result.http_version for result in results if isinstance(result, httpx.Response)
+        }
+        logger.info(
+            f"LLM connections warmed up in {(time.monotonic() - started) * 1000:.0f}ms "
+            f"({', '.join(sorted(http_versions))})"
         )
-        logger.info(f"LLM client initialized with model: {config.openrouter_model}")
 
     async def get_response(
-        self, messages: list[dict[str, str]], system_prompt: str | None = None
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: str | None = None,
+        user_key: Hashable | None = None,
+        cache: bool | None = None,
     ) -> str:
         """Получение ответа от LLM.
 
         Args:
             messages: История сообщений в формате OpenAI API
             system_prompt: Системный промпт (опционально)
+            user_key: Ключ пользователя для лимита одновременных запросов
+            cache: Использовать кеш ответов (None = только при temperature=0,
+                False = обойти кеш)
 
         Returns:
             Ответ от LLM
@@ -49,30 +165,62 @@ class LLMClient:
             APIError: Если произошла ошибка API
             LLMError: Другие ошибки LLM (пустой ответ, неожиданные ошибки)
         """
-        # Формируем полный список сообщений
-        full_messages: list[dict[str, Any]] = []
+        response = await self.get_completion(messages, system_prompt, user_key, cache)
+        return response.content
 
-        # Добавляем системный промпт, если указан
-        if system_prompt:
-            full_messages.append({"role": "system", "content": system_prompt})
+    async def get_completion(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: str | None = None,
+        user_key: Hashable | None = None,
+        cache: bool | None = None,
+    ) -> LLMResponse:
+        """Получение ответа от LLM вместе с расходом токенов.
 
-        # Добавляем историю сообщений
-        full_messages.extend(messages)
+        Ответ из кеша возвращается без usage: токены на него не расходовались.
+        Ответ кешируется под ключом модели, которая его вернула; поиск идет по
+        ключу модели, лидирующей в маршрутизации (ModelRouter.leader).
 
-        logger.info(
-            f"Sending request to LLM: {len(full_messages)} messages, "
-            f"model: {self.config.openrouter_model}"
-        )
+        Args:
+            messages: История сообщений в формате OpenAI API
+            system_prompt: Системный промпт (опционально)
+            user_key: Ключ пользователя для лимита одновременных запросов
+            cache: Использовать кеш ответов (None = только при temperature=0,
+                False = обойти кеш)
+
+        Returns:
+            Текст ответа и usage (prompt_tokens, completion_tokens)
+
+        Raises:
+            Timeout: Если запрос превысил таймаут
+            APIError: Если произошла ошибка API
+            LLMError: Другие ошибки LLM (пустой ответ, неожиданные ошибки)
+        """
+        full_messages = self._build_messages(messages, system_prompt)
+
+        # Ключ включает модель: ответ одной модели не выдается за ответ другой
+        use_cache = self._should_cache(cache)
+        if self.response_cache is not None and use_cache:
+            leader = self.router.leader(self._is_available)
+            cached = await self.response_cache.get(self._cache_key(leader, full_messages))
+            if cached is not None:
+                logger.info(f"LLM response served from cache, length: {len(cached)} chars")
+                return LLMResponse(cached)
+
+        logger.info(f"Sending request to LLM: {len(full_messages)} messages")
 
         try:
-            # Отправляем запрос к LLM
-            response = await self.client.chat.completions.create(
-                model=self.config.openrouter_model,
-                messages=full_messages,  # type: ignore[arg-type]
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                timeout=self.config.timeout,
-            )
+            # Отправляем запрос к LLM (с переходом на резервные модели и hedging)
+            async with self._admission_slot(user_key):
+                model, response = await self._call_hedged(
+                    lambda model: self.client.chat.completions.create(
+                        model=model,
+                        messages=full_messages,  # type: ignore[arg-type]
+                        temperature=self.config.temperature,
+                        max_tokens=self.config.max_tokens,
+                        timeout=self._model_timeout(model),
+                    ),
+                )
 
             # Извлекаем текст ответа
             answer = response.choices[0].message.content
@@ -81,10 +229,23 @@ class LLMClient:
                 logger.warning("LLM returned empty response")
                 raise LLMError("Empty response from LLM")
 
-            logger.info(f"LLM response received, length: {len(answer)} chars")
-            return answer
+            usage = response.usage
+            prompt_tokens = usage.prompt_tokens if usage else None
+            completion_tokens = usage.completion_tokens if usage else None
 
-        except (APITimeoutError, APIError):
+            logger.info(
+                f"LLM response received from {model}, length: {len(answer)} chars, "
+                f"tokens: {prompt_tokens} prompt / {completion_tokens} completion"
+            )
+            if self.response_cache is not None and use_cache:
+                await self.response_cache.set(
+                    self._cache_key(model, full_messages),
+                    answer,
+                    self.config.llm_response_cache_ttl,
+                )
+            return LLMResponse(answer, prompt_tokens, completion_tokens)
+
+        except (APITimeoutError, APIError, LLMError):
             # Пробрасываем специфичные ошибки как есть
             raise
 
@@ -93,6 +254,96 @@ class LLMClient:
             logger.error(f"Unexpected error in LLM request: {e}", exc_info=True)
             raise LLMError(f"Unexpected error: {e}") from e
 
+    async def stream_response(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: str | None = None,
+        user_key: Hashable | None = None,
+    ) -> AsyncIterator[LLMResponse]:
+        """Потоковое получение ответа от LLM (stream=True).
+
+        Генератор отдает фрагменты текста по мере генерации. Последним приходит
+        фрагмент с пустым content и заполненным usage (если провайдер его вернул).
+        Слот лимита одновременных запросов занят до конца потока.
+
+        Args:
+            messages: История сообщений в формате OpenAI API
+            system_prompt: Системный промпт (опционально)
+            user_key: Ключ пользователя для лимита одновременных запросов
+
+        Yields:
+            Фрагменты ответа (content - приращение текста)
+
+        Raises:
+            Timeout: Если запрос превысил таймаут
+            APIError: Если произошла ошибка API
+            LLMError: Другие ошибки LLM (пустой ответ, неожиданные ошибки)
+        """
+        async with self._admission_slot(user_key):
+            async for chunk in self._stream_completion(messages, system_prompt):
+                yield chunk
+
+    async def _stream_completion(
+        self, messages: list[dict[str, str]], system_prompt: str | None
+    ) -> AsyncIterator[LLMResponse]:
+        """Выполнение потокового запроса (см. stream_response).
+
+        Args:
+            messages: История сообщений в формате OpenAI API
+            system_prompt: Системный промпт (опционально)
+
+        Yields:
+            Фрагменты ответа (content - приращение текста)
+        """
+        full_messages = self._build_messages(messages, system_prompt)
+
+        logger.info(f"Sending streaming request to LLM: {len(full_messages)} messages")
+
+        try:
+            # Повторы и переход на резервную модель возможны только при открытии
+            # потока: после первых токенов ответ уже показывается пользователю
+            model, stream = await self._call_with_fallback(
+                lambda model: self.client.chat.completions.create(  # type: ignore[call-overload]
+                    model=model,
+                    messages=full_messages,
+                    temperature=self.config.temperature,
+                    max_tokens=self.config.max_tokens,
+                    timeout=self._model_timeout(model),
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+            )
+        except (APITimeoutError, APIError, LLMError):
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in LLM streaming request: {e}", exc_info=True)
+            raise LLMError(f"Unexpected error: {e}") from e
+
+        received = 0
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    received += len(delta)
+                    yield LLMResponse(delta)
+                if chunk.usage:
+                    yield LLMResponse("", chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+        except (APITimeoutError, APIError) as e:
+            if self._is_upstream_failure(e):
+                self._get_breaker(model).record_failure()
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in LLM stream: {e}", exc_info=True)
+            raise LLMError(f"Unexpected error: {e}") from e
+        finally:
+            await stream.close()
+
+        if not received:
+            logger.warning("LLM returned empty streaming response")
+            raise LLMError("Empty response from LLM")
+
+        logger.info(f"LLM streaming response received from {model}, length: {received} chars")
+
     async def test_connection(self) -> bool:
         """Тестирование подключения к LLM API.
 
@@ -107,3 +358,445 @@ class LLMClient:
         except Exception as e:
             logger.error(f"LLM connection test failed: {e}")
             return False
+
+    @asynccontextmanager
+    async def _admission_slot(self, user_key: Hashable | None) -> AsyncIterator[None]:
+        """Слот лимита одновременных запросов к LLM (если лимит включен).
+
+        Args:
+            user_key: Ключ пользователя для лимита на пользователя
+
+        Yields:
+            None: Управление на время выполнения запроса
+
+        Raises:
+            LLMBusyError: Если запрос не допущен контроллером
+        """
+        if self.admission is None:
+            yield
+            return
+
+        try:
+            async with self.admission.slot(user_key):
+                yield
+        except AdmissionRejectedError as e:
+            raise LLMBusyError(f"Too many concurrent LLM requests ({e.reason})") from e
+
+    async def _call_hedged(self, request: Callable[[str], Awaitable[T]]) -> tuple[str, T]:
+        """Запрос с hedging: при долгом ожидании второй запрос к следующей модели.
+
+        Если основной запрос (с переходом по цепочке моделей) не завершился за
+        перцентиль llm_hedge_percentile латентности первой модели и бюджет
+        позволяет, отправляется дополнительный запрос к первой модели, которую
+        основной запрос еще не пробовал (или к той же, если модель одна).
+        Основной запрос после этого не переходит на эту модель, поэтому нагрузка
+        на нее не дублируется. Дополнительный запрос занимает собственный слот
+        лимита одновременных запросов и не отправляется, если свободного слота
+        нет. Возвращается первый успешный ответ, оставшийся запрос отменяется.
+        Без бюджета hedging выключен.
+
+        Args:
+            request: Функция, выполняющая одну попытку запроса к указанной модели
+
+        Returns:
+            Модель, которая ответила, и результат запроса
+
+        Raises:
+            CircuitOpenError: Если circuit breaker всех моделей разомкнут
+            APITimeoutError: Если запрос превысил таймаут
+            APIError: Если ошибка API не исправилась повторами и переходом
+        """
+        if self.hedge_budget is None:
+            return await self._call_with_fallback(request)
+
+        self.hedge_budget.record_request()
+        models = self.router.order(self._is_available)
+        delay = self.router.percentile(models[0], self.config.llm_hedge_percentile)
+        if delay is None:
+            delay = self.config.llm_hedge_default_delay
+
+        attempted: list[str] = []
+        skip: set[str] = set()
+        primary = asyncio.create_task(self._call_with_fallback(request, attempted, skip, models))
+        tasks = [primary]
+        has_slot = False
+        try:
+            await asyncio.wait(tasks, timeout=delay)
+            if primary.done():
+                return await primary
+
+            if len(models) == 1:
+                hedge_model: str | None = models[0]
+            else:
+                hedge_model = next((model for model in models if model not in attempted), None)
+            if hedge_model is None:
+                # Основной запрос уже на последней модели цепочки
+                return await primary
+            has_slot = await self._try_admission_slot()
+            if not has_slot or not self.hedge_budget.try_acquire():
+                return await primary
+
+            if len(models) > 1:
+                skip.add(hedge_model)
+            logger.info(f"No LLM response after {delay:.2f}s, hedging request to {hedge_model}")
+            hedge = asyncio.create_task(self._call_model(hedge_model, request))
+            tasks.append(hedge)
+
+            pending: set[asyncio.Task[tuple[str, T]]] = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_budget.record_win()
+                            logger.info(f"Hedged request to {hedge_model} won")
+                        return task.result()
+
+            # Оба запроса завершились ошибкой: пробрасывается ошибка основного
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if has_slot and self.admission is not None:
+                self.admission.release()
+
+    async def _try_admission_slot(self) -> bool:
+        """Слот лимита одновременных запросов без ожидания (для hedged-запроса).
+
+        Returns:
+            True, если слот получен или лимит выключен
+        """
+        if self.admission is None:
+            return True
+        return await self.admission.try_acquire()
+
+    def get_model_stats(self) -> dict[str, dict[str, Any]]:
+        """Метрики моделей: запросы, латентность и состояние circuit breaker.
+
+        Returns:
+            Словарь model -> successes, failures, p50_ms, p95_ms, circuit
+        """
+        stats: dict[str, dict[str, Any]] = {}
+        for model, model_stats in self.router.stats().items():
+            stats[model] = {**model_stats, "circuit": self._get_breaker(model).state}
+        return stats
+
+    async def _call_with_fallback(
+        self,
+        request: Callable[[str], Awaitable[T]],
+        attempted: list[str] | None = None,
+        skip: set[str] | None = None,
+        models: list[str] | None = None,
+    ) -> tuple[str, T]:
+        """Запрос к моделям в порядке маршрутизации с переходом к следующей при сбое.
+
+        К следующей модели запрос переходит при таймауте, 429, ошибке, не
+        исправленной повторами, и разомкнутом circuit breaker. Ошибки самого
+        запроса (400, 401 и т.п.) пробрасываются сразу.
+
+        Args:
+            request: Функция, выполняющая одну попытку запроса к указанной модели
+            attempted: Список, в который добавляются модели по мере запросов к ним
+            skip: Модели, которые нужно пропустить (проверяется перед каждой
+                моделью, поэтому может дополняться во время выполнения)
+            models: Порядок моделей, уже выбранный маршрутизатором (None = выбрать)
+
+        Returns:
+            Модель, которая ответила, и результат запроса
+
+        Raises:
+            CircuitOpenError: Если circuit breaker всех моделей разомкнут
+            APITimeoutError: Если последняя модель не ответила за таймаут
+            APIError: Если ошибка API не исправилась повторами и переходом
+        """
+        skip = skip if skip is not None else set()
+        if models is None:
+            models = self.router.order(self._is_available)
+        last_error: Exception | None = None
+        for index, model in enumerate(models):
+            if model in skip:
+                continue
+            if attempted is not None:
+                attempted.append(model)
+            remaining = [other for other in models[index + 1 :] if other not in skip]
+            try:
+                return await self._call_model(model, request, retry_rate_limit=not remaining)
+            except (CircuitOpenError, APIError) as e:
+                if not isinstance(e, CircuitOpenError) and not self._is_upstream_failure(e):
+                    raise
+                last_error = e
+                if remaining:
+                    logger.warning(f"Model {model} failed: {e}, trying {remaining[0]}")
+
+        assert last_error is not None
+        raise last_error
+
+    async def _call_model(
+        self, model: str, request: Callable[[str], Awaitable[T]], retry_rate_limit: bool = True
+    ) -> tuple[str, T]:
+        """Запрос к одной модели с учетом латентности и сбоев в маршрутизаторе.
+
+        Args:
+            model: Модель
+            request: Функция, выполняющая одну попытку запроса к указанной модели
+            retry_rate_limit: Повторять ли 429 (см. _call_with_retry)
+
+        Returns:
+            Модель и результат запроса
+        """
+        started = time.monotonic()
+        try:
+            result = await self._call_with_retry(
+                model, partial(request, model), retry_rate_limit=retry_rate_limit
+            )
+        except (CircuitOpenError, APIError) as e:
+            if isinstance(e, CircuitOpenError) or self._is_upstream_failure(e):
+                self.router.record_failure(model)
+            raise
+
+        self.router.record_success(model, time.monotonic() - started)
+        return model, result
+
+    def _is_available(self, model: str) -> bool:
+        """Признак доступности модели для маршрутизации (circuit breaker не разомкнут).
+
+        Args:
+            model: Модель
+
+        Returns:
+            True, если запрос к модели не будет отклонен сразу
+        """
+        return self._get_breaker(model).state != STATE_OPEN
+
+    def _model_timeout(self, model: str) -> httpx.Timeout:
+        """Таймаут запроса к модели.
+
+        Args:
+            model: Модель
+
+        Returns:
+            Таймаут ответа из openrouter_model_timeouts или общий timeout и
+            отдельный таймаут установки соединения llm_http_connect_timeout
+        """
+        return httpx.Timeout(
+            self.config.openrouter_model_timeouts.get(model, self.config.timeout),
+            connect=self.config.llm_http_connect_timeout,
+        )
+
+    async def _call_with_retry(
+        self, model: str, request: Callable[[], Awaitable[T]], retry_rate_limit: bool = True
+    ) -> T:
+        """Выполнение запроса к модели с повторами и circuit breaker.
+
+        Повторяются ошибки соединения и ответы 408/409/429/5xx: задержка растет
+        экспоненциально с полным jitter, а Retry-After сервера соблюдается.
+        Таймауты не повторяются (каждая попытка ждет таймаут модели), но, как и
+        повторяемые ошибки, засчитываются circuit breaker модели.
+
+        Args:
+            model: Модель, к которой относится запрос (ключ circuit breaker)
+            request: Функция, выполняющая одну попытку запроса
+            retry_rate_limit: Повторять ли 429 (False, если есть резервная модель)
+
+        Returns:
+            Результат запроса
+
+        Raises:
+            CircuitOpenError: Если circuit breaker модели разомкнут
+            APITimeoutError: Если запрос превысил таймаут
+            APIError: Если ошибка API не исправилась повторами
+        """
+        breaker = self._get_breaker(model)
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                logger.warning(f"LLM request to {model} rejected: circuit breaker is open")
+                raise CircuitOpenError(f"Model {model} is temporarily unavailable")
+
+            try:
+                result = await request()
+            except APIError as e:
+                if not self._is_upstream_failure(e):
+                    # Сервис ответил (например, 400/401): это ошибка запроса, а не сбой
+                    breaker.record_success()
+                    raise
+
+                breaker.record_failure()
+                delay = self._retry_delay(e, attempt)
+                if (
+                    isinstance(e, APITimeoutError)
+                    or (not retry_rate_limit and self._is_rate_limited(e))
+                    or attempt >= self.config.llm_max_retries
+                    or delay is None
+                ):
+                    raise
+
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"LLM request to {model} failed: {e}, "
+                    f"retry {attempt}/{self.config.llm_max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            return result
+
+    def _should_cache(self, cache: bool | None) -> bool:
+        """Решение, использовать ли кеш ответов для запроса.
+
+        Args:
+            cache: Параметр cache вызова
+
+        Returns:
+            True, если кеш включен и ответ можно переиспользовать
+        """
+        if self.response_cache is None or cache is False:
+            return False
+        # При temperature > 0 ответ недетерминирован: кешируется только по явному запросу
+        return cache is True or self.config.temperature == 0
+
+    def _cache_key(self, model: str, full_messages: list[dict[str, Any]]) -> str:
+        """Ключ кеша: хеш модели, параметров генерации и сообщений (с системным промптом).
+
+        Args:
+            model: Модель, ответ которой кешируется
+            full_messages: Сообщения запроса, включая системный промпт
+
+        Returns:
+            SHA-256 в шестнадцатеричном виде
+        """
+        payload = json.dumps(
+            [
+                model,
+                self.config.temperature,
+                self.config.max_tokens,
+                full_messages,
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get_breaker(self, model: str) -> CircuitBreaker:
+        """Получение circuit breaker модели (создается при первом запросе).
+
+        Args:
+            model: Модель
+
+        Returns:
+            Circuit breaker модели
+        """
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                model,
+                self.config.llm_circuit_failure_threshold,
+                self.config.llm_circuit_recovery_timeout,
+            )
+            self._breakers[model] = breaker
+        return breaker
+
+    @staticmethod
+    def _is_upstream_failure(error: Exception) -> bool:
+        """Признак сбоя на стороне API (таймаут, соединение, 408/409/429/5xx).
+
+        Args:
+            error: Исключение запроса
+
+        Returns:
+            True, если ошибка говорит о недоступности или перегрузке API
+        """
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+        return False
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        """Признак ответа 429 Too Many Requests.
+
+        Args:
+            error: Исключение запроса
+
+        Returns:
+            True, если API ограничил частоту запросов
+        """
+        return isinstance(error, APIStatusError) and error.status_code == 429
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Задержка перед повтором: Retry-After сервера или backoff с полным jitter.
+
+        Args:
+            error: Исключение запроса
+            attempt: Номер выполненного повтора (0 = первая попытка)
+
+        Returns:
+            Задержка в секундах или None, если Retry-After больше llm_retry_max_delay
+        """
+        max_delay = self.config.llm_retry_max_delay
+        backoff = random.uniform(0, min(max_delay, self.config.llm_retry_base_delay * 2**attempt))
+
+        retry_after = self._retry_after(error)
+        if retry_after is None:
+            return backoff
+        if retry_after > max_delay:
+            return None
+        return max(retry_after, backoff)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float | None:
+        """Значение заголовка Retry-After (retry-after-ms) ответа в секундах.
+
+        Args:
+            error: Исключение запроса
+
+        Returns:
+            Задержка в секундах или None, если заголовка нет
+        """
+        if not isinstance(error, APIStatusError):
+            return None
+
+        headers = error.response.headers
+        try:
+            retry_after_ms = headers.get("retry-after-ms")
+            if retry_after_ms is not None:
+                return max(float(retry_after_ms) / 1000, 0.0)
+
+            retry_after = headers.get("retry-after")
+            if retry_after is None:
+                return None
+            if retry_after.strip().isdigit():
+                return float(retry_after)
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _build_messages(
+        messages: list[dict[str, str]], system_prompt: str | None
+    ) -> list[dict[str, Any]]:
+        """Формирование полного списка сообщений для запроса.
+
+        Args:
+            messages: История сообщений в формате OpenAI API
+            system_prompt: Системный промпт (опционально)
+
+        Returns:
+            Список сообщений с системным промптом в начале
+        """
+        full_messages: list[dict[str, Any]] = []
+
+        # Добавляем системный промпт, если указан
+        if system_prompt:
+            full_messages.append({"role": "system", "content": system_prompt})
+
+        # Добавляем историю сообщений
+        full_messages.extend(messages)
+        return full_messages
@@ -0,0 +1,46 @@
+"""HTTP клиент для запросов к OpenRouter."""
+
+import logging
+import ssl
+
+import httpx
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def create_llm_http_client(
+    config: Config, verify: ssl.SSLContext | bool = True
+) -> httpx.AsyncClient:
+    """Создание HTTP клиента для OpenAI SDK с настройками из конфигурации.
+
+    Клиент создается один раз на процесс: соединения в пуле keep-alive
+    переиспользуются, TLS handshake выполняется только при открытии нового
+    соединения, а по HTTP/2 параллельные запросы мультиплексируются в одном
+    соединении без блокировки друг друга.
+
+    Args:
+        config: Конфигурация приложения
+        verify: Проверка TLS сертификата сервера (контекст SSL для своего CA)
+
+    Returns:
+        Экземпляр httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=config.llm_http_max_connections,
+        max_keepalive_connections=config.llm_http_max_keepalive_connections,
+        keepalive_expiry=config.llm_http_keepalive_expiry,
+    )
+    logger.info(
+        f"LLM HTTP client: http2={config.llm_http2}, "
+        f"max_connections={config.llm_http_max_connections}, "
+        f"connect_timeout={config.llm_http_connect_timeout}s"
+    )
+    return httpx.AsyncClient(
+        http2=config.llm_http2,
+        limits=limits,
+        timeout=httpx.Timeout(config.timeout, connect=config.llm_http_connect_timeout),
+        verify=verify,
+        follow_redirects=True,
+    )
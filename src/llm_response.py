@@ -0,0 +1,15 @@
+"""Ответ LLM вместе с расходом токенов."""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LLMResponse:
+    """Текст ответа LLM и usage из ответа API.
+
+    Поля usage равны None, если провайдер не вернул расход токенов.
+    """
+
+    content: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
@@ -7,11 +7,16 @@ from dotenv import load_dotenv
 
 from .bot import TelegramBot
 from .config import Config
+from .context_builder import ContextBuilder
 from .conversation import Conversation
 from .database import Database
 from .handlers import MessageHandler
+from .history_cache import HistoryCache
 from .llm_client import LLMClient
 from .migrations import run_migrations
+from .response_cache.factory import create_response_cache
+from .stats.rollup_folder import RollupFolder
+from .token_counter import TokenCounter
 
 # Настройка логирования
 logging.basicConfig(
@@ -35,27 +40,87 @@ async def main() -> None:
         logger.error(f"Failed to load configuration: {e}")
         return
 
+    # Создаем общий пул соединений с базой данных
+    database = Database(
+        config.database_url,
+        config.database_timeout,
+        pool_min_size=config.database_pool_min_size,
+        pool_max_size=config.database_pool_max_size,
+        pool_max_idle=config.database_pool_max_idle,
+        write_behind_interval_ms=config.database_write_behind_interval_ms,
+        write_behind_max_batch=config.database_write_behind_max_batch,
+        write_behind_max_pending=config.database_write_behind_max_pending,
+        write_behind_max_retries=config.database_write_behind_max_retries,
+        user_profile_cache_ttl=config.database_user_profile_cache_ttl,
+        user_profile_cache_max_entries=config.database_user_profile_cache_max_entries,
+    )
+
     # Запускаем миграции базы данных
     try:
         logger.info("Running database migrations...")
-        run_migrations(config.database_url)
+        await database.open()
+        await run_migrations(database)
     except Exception as e:
         logger.error(f"Failed to run migrations: {e}")
+        await database.close()
         return
 
-    # Создаем компоненты приложения
-    database = Database(config.database_url, config.database_timeout)
-    conversation = Conversation(database)
-    llm_client = LLMClient(config)
+    # Создаем компоненты приложения. С бюджетом токенов история читается окном
+    # context_max_messages, иначе - max_history_length (см. MessageHandler)
+    history_window = (
+        config.context_max_messages
+        if config.context_token_budget > 0
+        else config.max_history_length
+    )
+    history_cache = None
+    if config.history_cache_max_entries > 0:
+        history_cache = HistoryCache(
+            window=history_window,
+            max_entries=config.history_cache_max_entries,
+            max_chars=config.history_cache_max_chars,
+            ttl=config.history_cache_ttl,
+        )
+    token_counter = TokenCounter(config.context_tokenizer_encoding)
+    conversation = Conversation(database, history_cache, token_counter)
+    context_builder = None
+    if config.context_token_budget > 0:
+        context_builder = ContextBuilder(token_counter, config.context_token_budget)
+    llm_client = LLMClient(config, create_response_cache(config, database))
     bot = TelegramBot(config)
-    message_handler = MessageHandler(config, llm_client, conversation, database)
+    message_handler = MessageHandler(
+        config, llm_client, conversation, database, context_builder
+    )
 
     # Регистрируем обработчики
     bot.register_handlers(message_handler)
 
-    # Запускаем бота
-    logger.info("Starting bot polling...")
-    await bot.start()
+    # При остановке бота записываем отложенные ответы и профили
+    bot.add_shutdown_callback(database.flush)
+
+    async def log_runtime_stats() -> None:
+        """Запись метрик компонентов бота в лог при остановке."""
+        logger.info(f"Chat serializer stats: {message_handler.serializer.stats()}")
+        if history_cache is not None:
+            logger.info(f"History cache stats: {history_cache.stats()}")
+        if database.user_profiles is not None:
+            logger.info(f"User profile cache stats: {database.user_profiles.stats()}")
+
+    bot.add_shutdown_callback(log_runtime_stats)
+
+    # Открываем соединение с LLM до первого сообщения
+    await llm_client.warm_up()
+
+    # Фоновая свертка изменений в агрегаты статистики дашборда
+    rollup_folder = RollupFolder(database, config.database_stats_fold_interval)
+    rollup_folder.start()
+
+    # Запускаем бота (режим polling/webhook пишет в лог TelegramBot.start)
+    try:
+        await bot.start()
+    finally:
+        await rollup_folder.stop()
+        await llm_client.close()
+        await database.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+"""Объединение сообщений, пришедших подряд, в один ответ."""
+
+import asyncio
+import logging
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MessageCoalescer(Generic[T]):
+    """Окно объединения: серия сообщений с паузами короче window - одна группа.
+
+    Каждое сообщение ждет window секунд. Если за это время по тому же ключу
+    пришло следующее, ожидание продлевается уже для него, а текущее сообщение
+    передается в его группу. Группу получает последнее сообщение серии.
+    """
+
+    def __init__(self, window: float) -> None:
+        """Инициализация окна объединения.
+
+        Args:
+            window: Пауза в секундах, после которой серия считается завершенной
+        """
+        self.window = window
+        self._bursts: dict[Hashable, list[T]] = {}
+        self.groups = 0
+        self.merged = 0
+        logger.info(f"Message coalescer initialized: window={window * 1000:.0f}ms")
+
+    @property
+    def pending_keys(self) -> int:
+        """Количество ключей с незавершенной серией."""
+        return len(self._bursts)
+
+    async def collect(self, key: Hashable, item: T) -> list[T] | None:
+        """Добавление сообщения в серию и ожидание ее завершения.
+
+        Args:
+            key: Ключ серии (например, (chat_id, user_id))
+            item: Сообщение
+
+        Returns:
+            Все сообщения серии по порядку, если item - последнее, иначе None
+            (серию обработает более позднее сообщение)
+        """
+        burst = self._bursts.setdefault(key, [])
+        burst.append(item)
+        size = len(burst)
+        try:
+            await asyncio.sleep(self.window)
+        except asyncio.CancelledError:
+            # Отмена последнего сообщения не должна оставлять серию без обработчика
+            if self._bursts.get(key) is burst and len(burst) == size:
+                del self._bursts[key]
+            raise
+
+        # Серию забрал take() или продолжило более позднее сообщение
+        if self._bursts.get(key) is not burst or len(burst) != size:
+            return None
+
+        del self._bursts[key]
+        self.groups += 1
+        self.merged += size - 1
+        if size > 1:
+            logger.info(f"Coalesced {size} messages for key {key} into one turn")
+        return burst
+
+    def take(self, key: Hashable) -> list[T] | None:
+        """Досрочное завершение серии: сообщения передаются вызывающему.
+
+        Ожидающие сообщения серии после окна вернут None, поэтому серия
+        обрабатывается один раз - тем, кто ее забрал (например, командой,
+        которая должна выполниться после уже полученных сообщений).
+
+        Args:
+            key: Ключ серии
+
+        Returns:
+            Сообщения незавершенной серии по порядку или None, если серии нет
+        """
+        burst = self._bursts.pop(key, None)
+        if burst is not None:
+            self.groups += 1
+            self.merged += len(burst) - 1
+        return burst
+
+    def stats(self) -> dict[str, int]:
+        """Метрики окна объединения.
+
+        Returns:
+            Словарь с количеством групп, объединенных сообщений (сэкономленных
+            запросов) и ключей с незавершенной серией
+        """
+        return {
+            "groups": self.groups,
+            "merged": self.merged,
+            "pending_keys": self.pending_keys,
+        }
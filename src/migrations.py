@@ -1,18 +1,22 @@
 """Запуск миграций базы данных."""
 
+import asyncio
 import logging
 from pathlib import Path
 
-import psycopg
+from .database import Database
 
 logger = logging.getLogger(__name__)
 
 
-def run_migrations(database_url: str) -> None:
+async def run_migrations(database: Database) -> None:
     """Выполнение SQL миграций.
 
+    Соединение берется из общего пула Database, каждая миграция
+    выполняется в отдельной транзакции.
+
     Args:
-        database_url: URL подключения к PostgreSQL
+        database: Экземпляр Database с пулом соединений
     """
     migrations_dir = Path("migrations")
 
@@ -29,7 +33,7 @@ def run_migrations(database_url: str) -> None:
 
     logger.info(f"Found {len(migration_files)} migration file(s)")
 
-    with psycopg.connect(database_url) as conn:
+    async with database.connection() as conn:
         for migration_file in migration_files:
             logger.info(f"Running migration: {migration_file.name}")
 
@@ -37,22 +41,22 @@ def run_migrations(database_url: str) -> None:
                 with migration_file.open("r", encoding="utf-8") as f:
                     sql = f.read()
 
-                with conn.cursor() as cur:
-                    cur.execute(sql)
+                async with conn.cursor() as cur:
+                    await cur.execute(sql)
 
-                conn.commit()
+                await conn.commit()
                 logger.info(f"Migration {migration_file.name} completed successfully")
 
             except Exception as e:
                 logger.error(f"Migration {migration_file.name} failed: {e}")
-                conn.rollback()
+                await conn.rollback()
                 raise
 
     logger.info("All migrations completed successfully")
 
 
-if __name__ == "__main__":
-    # Для запуска через python -m src.migrations
+async def _main() -> None:
+    """Запуск миграций с пулом, созданным из конфигурации."""
     from dotenv import load_dotenv
 
     from .config import Config
@@ -60,11 +64,18 @@ if __name__ == "__main__":
     load_dotenv()
     config = Config()
 
+    database = Database(config.database_url, config.database_timeout)
+    try:
+        await run_migrations(database)
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    # Для запуска через python -m src.migrations
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
 
-    run_migrations(config.database_url)
-
-
+    asyncio.run(_main())
@@ -0,0 +1,163 @@
+"""Выбор модели LLM по скользящей латентности."""
+
+import logging
+import random
+from collections import deque
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelStats:
+    """Скользящее окно латентности и счетчики одной модели."""
+
+    __slots__ = ("latencies", "successes", "failures", "explored")
+
+    def __init__(self, window: int) -> None:
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.explored = 0
+
+
+class ModelRouter:
+    """Порядок обхода моделей: сначала самые быстрые по p50 за последние window запросов.
+
+    Модели, по которым меньше min_samples замеров, идут после измеренных в
+    порядке из конфигурации (основная модель - первой). Модели, которые
+    is_available считает недоступными (разомкнут circuit breaker), ставятся
+    в конец списка.
+
+    С вероятностью explore_rate первой ставится случайная доступная модель не
+    из лидеров: иначе окно латентности отставшей модели (например, основной
+    после временного замедления) перестает обновляться и она больше не
+    получает запросы.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        window: int = 100,
+        min_samples: int = 5,
+        explore_rate: float = 0.05,
+        rng: random.Random | None = None,
+    ) -> None:
+        """Инициализация маршрутизатора.
+
+        Args:
+            models: Модели в порядке предпочтения
+            window: Размер окна латентности (последних успешных запросов)
+            min_samples: Минимум замеров для сравнения модели по латентности
+            explore_rate: Доля запросов, которые уходят не лидирующей модели
+            rng: Генератор случайных чисел (для тестов)
+        """
+        self.models = list(dict.fromkeys(models))
+        self.min_samples = min_samples
+        self.explore_rate = explore_rate
+        self._rng = rng or random.Random()
+        self._stats = {model: _ModelStats(window) for model in self.models}
+        logger.info(f"Model router initialized with models: {', '.join(self.models)}")
+
+    def order(self, is_available: Callable[[str], bool] | None = None) -> list[str]:
+        """Порядок, в котором следует пробовать модели (с исследованием).
+
+        Args:
+            is_available: Проверка доступности модели (None = все доступны)
+
+        Returns:
+            Список моделей
+        """
+        ranked = self._rank(is_available)
+        candidates = [model for model in ranked[1:] if is_available is None or is_available(model)]
+        if not candidates or self._rng.random() >= self.explore_rate:
+            return ranked
+        explored = self._rng.choice(candidates)
+        self._stats[explored].explored += 1
+        return [explored, *(model for model in ranked if model != explored)]
+
+    def leader(self, is_available: Callable[[str], bool] | None = None) -> str:
+        """Модель, которая получает запрос, если не выпало исследование.
+
+        Args:
+            is_available: Проверка доступности модели (None = все доступны)
+
+        Returns:
+            Модель
+        """
+        return self._rank(is_available)[0]
+
+    def _rank(self, is_available: Callable[[str], bool] | None) -> list[str]:
+        """Модели по доступности и латентности, без исследования.
+
+        Args:
+            is_available: Проверка доступности модели (None = все доступны)
+
+        Returns:
+            Список моделей
+        """
+
+        def sort_key(model: str) -> tuple[int, int, float, float]:
+            available = is_available is None or is_available(model)
+            p50 = self.percentile(model, 50)
+            p95 = self.percentile(model, 95)
+            if p50 is None or p95 is None:
+                return (0 if available else 2, 1, 0.0, float(self.models.index(model)))
+            return (0 if available else 2, 0, p50, p95)
+
+        return sorted(self.models, key=sort_key)
+
+    def record_success(self, model: str, latency: float) -> None:
+        """Учет успешного запроса.
+
+        Args:
+            model: Модель
+            latency: Время выполнения запроса в секундах
+        """
+        stats = self._stats[model]
+        stats.successes += 1
+        stats.latencies.append(latency)
+
+    def record_failure(self, model: str) -> None:
+        """Учет запроса, после которого пришлось перейти к другой модели.
+
+        Args:
+            model: Модель
+        """
+        self._stats[model].failures += 1
+
+    def percentile(self, model: str, q: float) -> float | None:
+        """Перцентиль латентности модели за окно.
+
+        Args:
+            model: Модель
+            q: Перцентиль (0-100)
+
+        Returns:
+            Латентность в секундах или None, если замеров меньше min_samples
+        """
+        latencies = self._stats[model].latencies
+        if len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def stats(self) -> dict[str, dict[str, float | int | None]]:
+        """Метрики по моделям.
+
+        Returns:
+            Словарь model -> успешные и неуспешные запросы, запросы исследования,
+            p50 и p95 в миллисекундах
+        """
+        result: dict[str, dict[str, float | int | None]] = {}
+        for model, stats in self._stats.items():
+            p50 = self.percentile(model, 50)
+            p95 = self.percentile(model, 95)
+            result[model] = {
+                "successes": stats.successes,
+                "failures": stats.failures,
+                "explored": stats.explored,
+                "p50_ms": p50 * 1000 if p50 is not None else None,
+                "p95_ms": p95 * 1000 if p95 is not None else None,
+            }
+        return result
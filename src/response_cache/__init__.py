@@ -0,0 +1 @@
+"""Кеш ответов LLM для детерминированных запросов."""
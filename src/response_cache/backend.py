@@ -0,0 +1,99 @@
+"""Абстрактный интерфейс хранилища кеша ответов LLM."""
+
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheBackend(ABC):
+    """Абстрактный базовый класс хранилища кеша ответов LLM.
+
+    Ключ - хеш параметров запроса (см. LLMClient._cache_key), значение - текст
+    ответа. Базовый класс ведет метрики попаданий и не дает ошибкам хранилища
+    сорвать запрос к LLM: ошибка чтения считается промахом, ошибка записи
+    только логируется.
+    """
+
+    def __init__(self) -> None:
+        """Инициализация метрик."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> str | None:
+        """Получение ответа из кеша.
+
+        Args:
+            key: Ключ запроса
+
+        Returns:
+            Текст ответа или None при промахе
+        """
+        try:
+            content = await self._load(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache read failed: {e}")
+            content = None
+
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+
+    async def set(self, key: str, content: str, ttl: float) -> None:
+        """Сохранение ответа в кеш.
+
+        Args:
+            key: Ключ запроса
+            content: Текст ответа
+            ttl: Время жизни записи в секундах
+        """
+        try:
+            await self._store(key, content, ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache write failed: {e}")
+            return
+        self.stores += 1
+
+    def stats(self) -> dict[str, float]:
+        """Метрики кеша.
+
+        Returns:
+            Словарь с количеством попаданий, промахов, записей, ошибок и долей попаданий
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @abstractmethod
+    async def _load(self, key: str) -> str | None:
+        """Чтение неустаревшей записи из хранилища.
+
+        Args:
+            key: Ключ запроса
+
+        Returns:
+            Текст ответа или None, если записи нет или она устарела
+        """
+        pass
+
+    @abstractmethod
+    async def _store(self, key: str, content: str, ttl: float) -> None:
+        """Запись в хранилище с соблюдением лимита размера.
+
+        Args:
+            key: Ключ запроса
+            content: Текст ответа
+            ttl: Время жизни записи в секундах
+        """
+        pass
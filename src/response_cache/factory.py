@@ -0,0 +1,30 @@
+"""Создание хранилища кеша ответов LLM по конфигурации."""
+
+from src.config import Config
+from src.database import Database
+from src.response_cache.backend import ResponseCacheBackend
+from src.response_cache.memory_backend import MemoryResponseCache
+from src.response_cache.postgres_backend import PostgresResponseCache
+
+
+def create_response_cache(config: Config, database: Database) -> ResponseCacheBackend | None:
+    """Создание хранилища кеша ответов LLM.
+
+    Args:
+        config: Конфигурация приложения (llm_response_cache_backend)
+        database: Экземпляр Database для хранилища postgres
+
+    Returns:
+        Хранилище кеша или None, если кеш выключен
+
+    Raises:
+        ValueError: Если указано неизвестное хранилище
+    """
+    backend = config.llm_response_cache_backend
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryResponseCache(config.llm_response_cache_max_entries)
+    if backend == "postgres":
+        return PostgresResponseCache(database, config.llm_response_cache_max_entries)
+    raise ValueError(f"Unknown response cache backend: {backend}")
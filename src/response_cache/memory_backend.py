@@ -0,0 +1,43 @@
+"""In-process хранилище кеша ответов LLM с LRU-вытеснением и TTL."""
+
+import time
+from collections import OrderedDict
+
+from src.response_cache.backend import ResponseCacheBackend
+
+
+class MemoryResponseCache(ResponseCacheBackend):
+    """Кеш ответов в памяти процесса (хранилище по умолчанию)."""
+
+    def __init__(self, max_entries: int) -> None:
+        """Инициализация хранилища.
+
+        Args:
+            max_entries: Максимальное количество записей (вытесняются по LRU)
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.evictions = 0
+
+    async def _load(self, key: str) -> str | None:
+        """Чтение записи с проверкой срока жизни."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        content, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return content
+
+    async def _store(self, key: str, content: str, ttl: float) -> None:
+        """Запись с вытеснением самых давно использованных записей."""
+        self._entries[key] = (content, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
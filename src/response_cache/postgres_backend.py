@@ -0,0 +1,76 @@
+"""Хранилище кеша ответов LLM в PostgreSQL, общее для нескольких процессов."""
+
+import logging
+
+from src.database import Database
+from src.response_cache.backend import ResponseCacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Размер кеша поддерживается раз в PRUNE_INTERVAL записей, а не на каждую
+PRUNE_INTERVAL = 100
+
+
+class PostgresResponseCache(ResponseCacheBackend):
+    """Кеш ответов в таблице llm_response_cache (миграция 006).
+
+    Позволяет боту и API (и нескольким их экземплярам) переиспользовать ответы
+    друг друга. При превышении max_entries удаляются самые старые записи.
+    """
+
+    def __init__(self, database: Database, max_entries: int) -> None:
+        """Инициализация хранилища.
+
+        Args:
+            database: Экземпляр Database с пулом соединений
+            max_entries: Максимальное количество записей в таблице
+        """
+        super().__init__()
+        self.database = database
+        self.max_entries = max_entries
+        self._stores_since_prune = 0
+
+    async def _load(self, key: str) -> str | None:
+        """Чтение неустаревшей записи из таблицы."""
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT content FROM llm_response_cache
+                WHERE cache_key = %s AND expires_at > NOW()
+                """,
+                (key,),
+            )
+            row = await cur.fetchone()
+        return row["content"] if row else None
+
+    async def _store(self, key: str, content: str, ttl: float) -> None:
+        """Запись (или обновление) ответа и периодическое удаление лишних записей."""
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO llm_response_cache (cache_key, content, expires_at)
+                VALUES (%s, %s, NOW() + make_interval(secs => %s))
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    content = EXCLUDED.content,
+                    created_at = NOW(),
+                    expires_at = EXCLUDED.expires_at
+                """,
+                (key, content, ttl),
+            )
+
+            self._stores_since_prune += 1
+            if self._stores_since_prune >= PRUNE_INTERVAL:
+                self._stores_since_prune = 0
+                await cur.execute("DELETE FROM llm_response_cache WHERE expires_at <= NOW()")
+                await cur.execute(
+                    """
+                    DELETE FROM llm_response_cache
+                    WHERE cache_key IN (
+                        SELECT cache_key FROM llm_response_cache
+                        ORDER BY created_at DESC
+                        OFFSET %s
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+                logger.debug(f"Response cache pruned, {cur.rowcount} entries over the size cap")
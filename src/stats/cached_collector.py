@@ -0,0 +1,135 @@
+"""Кеширующая обертка над сборщиком статистики."""
+
+import asyncio
+import logging
+import time
+
+from src.stats.collector import StatCollector
+from src.stats.models import DashboardStats
+
+logger = logging.getLogger(__name__)
+
+
+class CachedStatCollector(StatCollector):
+    """StatCollector, который кеширует статистику другого сборщика на ttl секунд.
+
+    - Свежее значение (моложе ttl) возвращается без обращения к сборщику.
+    - Single-flight: одновременные запросы без значения в кеше ждут одно
+      общее вычисление.
+    - Stale-while-revalidate: устаревшее значение возвращается сразу, а
+      обновление запускается в фоне (одно на все запросы). Если фоновое
+      обновление не удалось, продолжает отдаваться последнее значение.
+
+    Возраст значения сообщается в metadata.cache_age_seconds.
+    """
+
+    def __init__(self, collector: StatCollector, ttl: float) -> None:
+        """Инициализация обертки.
+
+        Args:
+            collector: Сборщик, вычисляющий статистику
+            ttl: Время в секундах, в течение которого значение считается свежим
+        """
+        self.collector = collector
+        self.ttl = ttl
+        self._value: DashboardStats | None = None
+        self._computed_at = 0.0
+        self._refresh: asyncio.Task[DashboardStats] | None = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        logger.info(f"CachedStatCollector initialized: ttl={ttl}s")
+
+    async def get_dashboard_stats(self) -> DashboardStats:
+        """Получение статистики из кеша или от сборщика.
+
+        Returns:
+            DashboardStats: Статистика с возрастом значения в metadata
+
+        Raises:
+            Exception: Ошибка сборщика, если в кеше еще нет значения
+        """
+        if self._value is None:
+            self.misses += 1
+            # shield: отмена одного запроса (клиент отключился) не отменяет
+            # вычисление, которого ждут остальные
+            await asyncio.shield(self._start_refresh())
+        elif time.monotonic() - self._computed_at >= self.ttl:
+            self.stale_hits += 1
+            self._start_refresh()
+        else:
+            self.hits += 1
+
+        assert self._value is not None
+        return self._with_age(self._value)
+
+    async def close(self) -> None:
+        """Отмена фонового обновления (при остановке приложения)."""
+        if self._refresh is not None and not self._refresh.done():
+            self._refresh.cancel()
+            await asyncio.gather(self._refresh, return_exceptions=True)
+
+    def stats(self) -> dict[str, float]:
+        """Метрики кеша.
+
+        Returns:
+            Словарь с попаданиями (свежими и устаревшими), промахами,
+            неудачными фоновыми обновлениями и возрастом значения
+        """
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_failures": self.refresh_failures,
+            "age_seconds": self._age() if self._value is not None else 0.0,
+        }
+
+    def _start_refresh(self) -> asyncio.Task[DashboardStats]:
+        """Запуск обновления, если оно еще не выполняется.
+
+        Returns:
+            Задача обновления, общая для всех ожидающих запросов
+        """
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._compute())
+            self._refresh.add_done_callback(self._on_refresh_done)
+        return self._refresh
+
+    async def _compute(self) -> DashboardStats:
+        """Вычисление статистики и сохранение ее в кеш.
+
+        Returns:
+            DashboardStats: Свежая статистика
+        """
+        started = time.monotonic()
+        value = await self.collector.get_dashboard_stats()
+        self._value = value
+        self._computed_at = time.monotonic()
+        logger.debug(f"Dashboard stats refreshed in {self._computed_at - started:.2f}s")
+        return value
+
+    def _on_refresh_done(self, task: asyncio.Task[DashboardStats]) -> None:
+        """Учет ошибки обновления (исключение извлекается, чтобы не было предупреждения)."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.refresh_failures += 1
+            logger.error(f"Dashboard stats refresh failed: {error}", exc_info=error)
+
+    def _age(self) -> float:
+        """Возраст значения в кеше в секундах."""
+        return time.monotonic() - self._computed_at
+
+    def _with_age(self, value: DashboardStats) -> DashboardStats:
+        """Копия статистики с возрастом значения в metadata.
+
+        Args:
+            value: Статистика из кеша
+
+        Returns:
+            DashboardStats: Статистика с заполненным metadata.cache_age_seconds
+        """
+        metadata = value.metadata.model_copy(update={"cache_age_seconds": self._age()})
+        return value.model_copy(update={"metadata": metadata})
@@ -52,6 +52,10 @@ class MockStatCollector(StatCollector):
         # Генерация данных о сообщениях
         avg_length = round(random.uniform(80, 200), 1)
         user_to_assistant_ratio = round(random.uniform(0.95, 1.05), 2)
+        avg_tokens = round(avg_length / random.uniform(3.0, 4.0), 1)
+        total_tokens = int(total_messages * avg_tokens)
+        completion_tokens = total_tokens // 2
+        prompt_tokens = int(completion_tokens * random.uniform(4, 8))
 
         # Временные метки
         months_ago = random.randint(3, 6)
@@ -85,6 +89,10 @@ class MockStatCollector(StatCollector):
                 first_message_date=first_message_date,
                 last_message_date=last_message_date,
                 user_to_assistant_ratio=user_to_assistant_ratio,
+                avg_tokens=avg_tokens,
+                total_tokens=total_tokens,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
             ),
             metadata=MetadataStats(
                 generated_at=generated_at,
@@ -42,6 +42,10 @@ class MessageStats(BaseModel):
     user_to_assistant_ratio: float = Field(
         ..., description="Соотношение сообщений пользователь/ассистент", ge=0
     )
+    avg_tokens: float = Field(..., description="Среднее количество токенов в сообщении", ge=0)
+    total_tokens: int = Field(..., description="Суммарное количество токенов в сообщениях", ge=0)
+    prompt_tokens: int = Field(..., description="Токены промптов в запросах к LLM", ge=0)
+    completion_tokens: int = Field(..., description="Токены ответов LLM", ge=0)
 
 
 class MetadataStats(BaseModel):
@@ -49,6 +53,9 @@ class MetadataStats(BaseModel):
 
     generated_at: datetime = Field(..., description="Время генерации статистики")
     is_mock: bool = Field(..., description="Флаг Mock данных")
+    cache_age_seconds: float = Field(
+        0.0, description="Возраст значения в кеше в секундах (0 = вычислено для запроса)", ge=0
+    )
 
 
 class DashboardStats(BaseModel):
@@ -1,11 +1,10 @@
 """Реальная реализация сборщика статистики из PostgreSQL."""
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any
 
-import psycopg
-
 from src.database import Database
 from src.stats.collector import StatCollector
 from src.stats.models import (
@@ -15,12 +14,70 @@ from src.stats.models import (
     OverviewStats,
     UserStats,
 )
+from src.stats.rollup_folder import RollupFolder
 
 logger = logging.getLogger(__name__)
 
+# Агрегаты по сообщениям из дневных агрегатов (миграция 007), которые после
+# свертки изменений всегда включают текущий день. Окна 7 и 30 дней -
+# календарные дни, включая сегодняшний. Активные пользователи - пользователи
+# (не боты) с неудаленными сообщениями role = 'user' в окне
+_MESSAGE_AGGREGATES_SQL = """
+    WITH totals AS (
+        SELECT
+            COALESCE(SUM(message_count), 0)::bigint AS total_messages,
+            COALESCE(SUM(message_count) FILTER (WHERE day > CURRENT_DATE - 7), 0)::bigint
+                AS messages_7d,
+            COALESCE(SUM(message_count) FILTER (WHERE day > CURRENT_DATE - 30), 0)::bigint
+                AS messages_30d,
+            SUM(character_sum) / NULLIF(SUM(nonempty_count), 0) AS avg_length,
+            MIN(first_message_at) FILTER (WHERE message_count > 0) AS first_date,
+            MAX(last_message_at) FILTER (WHERE message_count > 0) AS last_date,
+            COALESCE(SUM(message_count) FILTER (WHERE role = 'user'), 0)::bigint
+                AS user_count,
+            COALESCE(SUM(message_count) FILTER (WHERE role = 'assistant'), 0)::bigint
+                AS assistant_count,
+            SUM(token_sum) / NULLIF(SUM(token_rows), 0) AS avg_tokens,
+            COALESCE(SUM(token_sum), 0)::bigint AS total_tokens,
+            COALESCE(SUM(prompt_tokens), 0)::bigint AS prompt_tokens,
+            COALESCE(SUM(completion_tokens), 0)::bigint AS completion_tokens
+        FROM message_daily_stats
+    ), active AS (
+        SELECT
+            COUNT(DISTINCT a.user_id) FILTER (WHERE a.day > CURRENT_DATE - 7)
+                AS active_users_7d,
+            COUNT(DISTINCT a.user_id) AS active_users_30d
+        FROM user_daily_activity a
+        JOIN users u ON u.user_id = a.user_id
+        WHERE a.day > CURRENT_DATE - 30 AND u.is_bot = FALSE
+    )
+    SELECT * FROM totals, active
+"""
+
+# Пользователи (не боты) по языкам из агрегата user_language_stats
+_USER_AGGREGATES_SQL = """
+    SELECT
+        lang,
+        user_count AS count,
+        premium_count,
+        user_count - premium_count AS regular_count
+    FROM user_language_stats
+    WHERE user_count > 0
+    ORDER BY count DESC
+"""
+
 
 class RealStatCollector(StatCollector):
-    """Реальная реализация StatCollector с данными из PostgreSQL."""
+    """Реальная реализация StatCollector с данными из PostgreSQL.
+
+    Статистика читается только из дневных агрегатов (миграция 007), поэтому
+    время запроса зависит от количества дней и активных пользователей, а не от
+    объема messages. Триггеры на messages и users дописывают изменения в
+    таблицы *_delta; перед чтением они переносятся в агрегаты
+    (stats_fold_deltas), поэтому статистика точна и без фоновой свертки.
+    Агрегаты сообщений и пользователей читаются параллельно на двух
+    соединениях пула.
+    """
 
     def __init__(self, database: Database) -> None:
         """Инициализация сборщика статистики.
@@ -29,6 +86,7 @@ class RealStatCollector(StatCollector):
             database: Экземпляр Database для работы с PostgreSQL
         """
         self.database = database
+        self.folder = RollupFolder(database)
         logger.info("RealStatCollector initialized")
 
     async def get_dashboard_stats(self) -> DashboardStats:
@@ -37,157 +95,72 @@ class RealStatCollector(StatCollector):
         Returns:
             DashboardStats: Статистика для дашборда из PostgreSQL
         """
-        conn = self.database._get_connection()
-        try:
-            with conn.cursor() as cur:
-                # Общая статистика пользователей
-                overview_stats = self._get_overview_stats(cur)
-
-                # Статистика пользователей
-                user_stats = self._get_user_stats(cur)
-
-                # Статистика сообщений
-                message_stats = self._get_message_stats(cur)
-
-                # Метаданные
-                metadata = MetadataStats(
-                    generated_at=datetime.now(),
-                    is_mock=False,
-                )
-
-                return DashboardStats(
-                    overview=overview_stats,
-                    users=user_stats,
-                    messages=message_stats,
-                    metadata=metadata,
-                )
-        finally:
-            conn.close()
-
-    def _get_overview_stats(self, cur: psycopg.Cursor[dict[str, Any]]) -> OverviewStats:
-        """Получение общей статистики.
-
-        Args:
-            cur: Курсор базы данных
+        await self.folder.fold()
 
-        Returns:
-            OverviewStats: Общая статистика
-        """
-        # Общее количество пользователей
-        cur.execute("SELECT COUNT(*) as count FROM users WHERE is_bot = FALSE")
-        row = cur.fetchone()
-        total_users = row["count"] if row else 0
-
-        # Активные пользователи за 7 дней (хотя бы одно сообщение)
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        cur.execute(
-            """
-            SELECT COUNT(DISTINCT m.user_id) as count
-            FROM messages m
-            JOIN users u ON m.user_id = u.user_id
-            WHERE m.created_at >= %s
-            AND m.deleted_at IS NULL
-            AND u.is_bot = FALSE
-            AND m.role = 'user'
-            """,
-            (seven_days_ago,),
-        )
-        row = cur.fetchone()
-        active_users_7d = row["count"] if row else 0
-
-        # Активные пользователи за 30 дней
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        cur.execute(
-            """
-            SELECT COUNT(DISTINCT m.user_id) as count
-            FROM messages m
-            JOIN users u ON m.user_id = u.user_id
-            WHERE m.created_at >= %s
-            AND m.deleted_at IS NULL
-            AND u.is_bot = FALSE
-            AND m.role = 'user'
-            """,
-            (thirty_days_ago,),
-        )
-        row = cur.fetchone()
-        active_users_30d = row["count"] if row else 0
-
-        # Общее количество сообщений (не удаленных)
-        cur.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM messages
-            WHERE deleted_at IS NULL
-            """
+        message_row, language_rows = await asyncio.gather(
+            self._fetch_message_aggregates(),
+            self._fetch_user_aggregates(),
         )
-        row = cur.fetchone()
-        total_messages = row["count"] if row else 0
-
-        # Сообщения за 7 дней
-        cur.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM messages
-            WHERE created_at >= %s
-            AND deleted_at IS NULL
-            """,
-            (seven_days_ago,),
+
+        user_stats = self._build_user_stats(language_rows)
+        overview_stats = OverviewStats(
+            total_users=sum(row["count"] for row in language_rows),
+            active_users_7d=message_row["active_users_7d"],
+            active_users_30d=message_row["active_users_30d"],
+            total_messages=message_row["total_messages"],
+            messages_7d=message_row["messages_7d"],
+            messages_30d=message_row["messages_30d"],
         )
-        row = cur.fetchone()
-        messages_7d = row["count"] if row else 0
-
-        # Сообщения за 30 дней
-        cur.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM messages
-            WHERE created_at >= %s
-            AND deleted_at IS NULL
-            """,
-            (thirty_days_ago,),
+        message_stats = self._build_message_stats(message_row)
+
+        # Метаданные
+        metadata = MetadataStats(
+            generated_at=datetime.now(),
+            is_mock=False,
         )
-        row = cur.fetchone()
-        messages_30d = row["count"] if row else 0
-
-        return OverviewStats(
-            total_users=total_users,
-            active_users_7d=active_users_7d,
-            active_users_30d=active_users_30d,
-            total_messages=total_messages,
-            messages_7d=messages_7d,
-            messages_30d=messages_30d,
+
+        return DashboardStats(
+            overview=overview_stats,
+            users=user_stats,
+            messages=message_stats,
+            metadata=metadata,
         )
 
-    def _get_user_stats(self, cur: psycopg.Cursor[dict[str, Any]]) -> UserStats:
-        """Получение статистики пользователей.
+    async def _fetch_message_aggregates(self) -> dict[str, Any]:
+        """Агрегаты по сообщениям и активным пользователям.
+
+        Returns:
+            Строка с агрегатами (см. _MESSAGE_AGGREGATES_SQL)
+        """
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(_MESSAGE_AGGREGATES_SQL)
+            row = await cur.fetchone()
+        # Агрегат без GROUP BY всегда возвращает ровно одну строку
+        assert row is not None
+        return row
+
+    async def _fetch_user_aggregates(self) -> list[dict[str, Any]]:
+        """Агрегаты по пользователям (не ботам) по языкам.
+
+        Returns:
+            Строки по языкам с общим количеством, Premium и обычными пользователями
+        """
+        async with self.database.connection() as conn, conn.cursor() as cur:
+            await cur.execute(_USER_AGGREGATES_SQL)
+            return await cur.fetchall()
+
+    @staticmethod
+    def _build_user_stats(language_rows: list[dict[str, Any]]) -> UserStats:
+        """Статистика пользователей из агрегатов по языкам.
 
         Args:
-            cur: Курсор базы данных
+            language_rows: Результат _fetch_user_aggregates
 
         Returns:
             UserStats: Статистика пользователей
         """
-        # Количество Premium пользователей
-        cur.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM users
-            WHERE is_premium = TRUE AND is_bot = FALSE
-            """
-        )
-        row = cur.fetchone()
-        premium_count = row["count"] if row else 0
-
-        # Количество обычных пользователей
-        cur.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM users
-            WHERE is_premium = FALSE AND is_bot = FALSE
-            """
-        )
-        row = cur.fetchone()
-        regular_count = row["count"] if row else 0
+        premium_count = sum(row["premium_count"] for row in language_rows)
+        regular_count = sum(row["regular_count"] for row in language_rows)
 
         # Процент Premium
         total_users = premium_count + regular_count
@@ -195,20 +168,6 @@ class RealStatCollector(StatCollector):
             round((premium_count / total_users) * 100, 2) if total_users > 0 else 0.0
         )
 
-        # Распределение по языкам
-        cur.execute(
-            """
-            SELECT
-                COALESCE(language_code, 'unknown') as lang,
-                COUNT(*) as count
-            FROM users
-            WHERE is_bot = FALSE
-            GROUP BY language_code
-            ORDER BY count DESC
-            """
-        )
-        language_rows = cur.fetchall()
-
         # Формируем словарь языков
         by_language: dict[str, int] = {}
         for row in language_rows:
@@ -233,77 +192,37 @@ class RealStatCollector(StatCollector):
             by_language=by_language,
         )
 
-    def _get_message_stats(self, cur: psycopg.Cursor[dict[str, Any]]) -> MessageStats:
-        """Получение статистики сообщений.
+    @staticmethod
+    def _build_message_stats(row: dict[str, Any]) -> MessageStats:
+        """Статистика сообщений из агрегатов по messages.
 
         Args:
-            cur: Курсор базы данных
+            row: Результат _fetch_message_aggregates
 
         Returns:
             MessageStats: Статистика сообщений
         """
-        # Средняя длина сообщений
-        cur.execute(
-            """
-            SELECT AVG(character_count) as avg_length
-            FROM messages
-            WHERE deleted_at IS NULL
-            AND character_count > 0
-            """
-        )
-        result = cur.fetchone()
-        avg_length = (
-            round(float(result["avg_length"]), 1) if result and result["avg_length"] else 0.0
-        )
-
-        # Дата первого сообщения
-        cur.execute(
-            """
-            SELECT MIN(created_at) as first_date
-            FROM messages
-            WHERE deleted_at IS NULL
-            """
-        )
-        result = cur.fetchone()
-        first_message_date = (
-            result["first_date"] if result and result["first_date"] else datetime.now()
-        )
-
-        # Дата последнего сообщения
-        cur.execute(
-            """
-            SELECT MAX(created_at) as last_date
-            FROM messages
-            WHERE deleted_at IS NULL
-            """
-        )
-        result = cur.fetchone()
-        last_message_date = (
-            result["last_date"] if result and result["last_date"] else datetime.now()
-        )
+        avg_length = round(float(row["avg_length"]), 1) if row["avg_length"] else 0.0
+        first_message_date = row["first_date"] or datetime.now()
+        last_message_date = row["last_date"] or datetime.now()
 
         # Соотношение user/assistant сообщений
-        cur.execute(
-            """
-            SELECT
-                SUM(CASE WHEN role = 'user' THEN 1 ELSE 0 END) as user_count,
-                SUM(CASE WHEN role = 'assistant' THEN 1 ELSE 0 END) as assistant_count
-            FROM messages
-            WHERE deleted_at IS NULL
-            AND role IN ('user', 'assistant')
-            """
-        )
-        result = cur.fetchone()
-        user_count = result["user_count"] if result and result["user_count"] else 0
-        assistant_count = result["assistant_count"] if result and result["assistant_count"] else 0
-
+        user_count = row["user_count"]
+        assistant_count = row["assistant_count"]
         user_to_assistant_ratio = (
             round(user_count / assistant_count, 2) if assistant_count > 0 else 0.0
         )
 
+        # Токены (сообщения, сохраненные до появления подсчета, не учитываются)
+        avg_tokens = round(float(row["avg_tokens"]), 1) if row["avg_tokens"] else 0.0
+
         return MessageStats(
             avg_length=avg_length,
             first_message_date=first_message_date,
             last_message_date=last_message_date,
             user_to_assistant_ratio=user_to_assistant_ratio,
+            avg_tokens=avg_tokens,
+            total_tokens=row["total_tokens"],
+            prompt_tokens=row["prompt_tokens"],
+            completion_tokens=row["completion_tokens"],
         )
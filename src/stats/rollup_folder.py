@@ -0,0 +1,64 @@
+"""Периодическая свертка изменений в дневные агрегаты статистики."""
+
+import asyncio
+import contextlib
+import logging
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Перенос изменений, накопленных триггерами, в дневные агрегаты (миграция 007)
+_FOLD_DELTAS_SQL = "SELECT stats_fold_deltas()"
+
+
+class RollupFolder:
+    """Свертка таблиц *_delta в дневные агрегаты статистики.
+
+    Триггеры на messages и users только дописывают изменения в *_delta, и
+    строки агрегатов изменяет лишь свертка. RealStatCollector сворачивает
+    изменения перед каждым чтением; фоновая свертка раз в interval секунд
+    ограничивает размер *_delta, если дашборд долго не открывают.
+    """
+
+    def __init__(self, database: Database, interval: float = 0.0) -> None:
+        """Инициализация свертки.
+
+        Args:
+            database: Экземпляр Database с пулом соединений
+            interval: Интервал фоновой свертки в секундах (0 = только по вызову fold)
+        """
+        self.database = database
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+        self.folds = 0
+
+    async def fold(self) -> None:
+        """Перенос накопленных изменений в агрегаты одной транзакцией."""
+        async with self.database.connection() as conn:
+            await conn.execute(_FOLD_DELTAS_SQL)
+        self.folds += 1
+
+    def start(self) -> None:
+        """Запуск фоновой свертки (если interval > 0)."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Rollup folder started: every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Остановка фоновой свертки."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            logger.info(f"Rollup folder stopped: {self.folds} fold(s)")
+
+    async def _run(self) -> None:
+        """Фоновый цикл: свертка раз в interval секунд."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.fold()
+            except Exception as e:
+                logger.error(f"Rollup fold failed: {e}", exc_info=True)
@@ -0,0 +1,112 @@
+"""Подсчет токенов сообщений локальным токенизатором с мемоизацией."""
+
+import logging
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Служебные токены, которые добавляет chat-формат к каждому сообщению
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Символов на токен для оценки без токенизатора (с запасом для кириллицы и кода)
+FALLBACK_CHARS_PER_TOKEN = 3
+
+
+class TokenCounter:
+    """Счетчик токенов на базе tiktoken с LRU-кешем результатов.
+
+    tiktoken - опциональная зависимость (extra tokenizer). Если пакет не
+    установлен или словарь кодировки недоступен, используется консервативная
+    оценка по количеству символов.
+    """
+
+    def __init__(self, encoding_name: str | None = "o200k_base", cache_size: int = 10_000) -> None:
+        """Инициализация счетчика.
+
+        Args:
+            encoding_name: Кодировка tiktoken (None = только оценка по символам)
+            cache_size: Максимальное количество закешированных результатов
+        """
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[int, int], int] = OrderedDict()
+        self._encoding = self._load_encoding(encoding_name) if encoding_name else None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def is_exact(self) -> bool:
+        """Используется ли настоящий токенизатор (а не оценка по символам)."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Количество токенов в тексте.
+
+        Результат кешируется по длине и хешу текста, поэтому повторный подсчет
+        одного и того же сообщения из истории не вызывает токенизатор.
+
+        Args:
+            text: Текст
+
+        Returns:
+            Количество токенов
+        """
+        key = (len(text), hash(text))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        if self._encoding is not None:
+            tokens = len(self._encoding.encode(text, disallowed_special=()))
+        else:
+            tokens = -(-len(text) // FALLBACK_CHARS_PER_TOKEN)
+
+        self._cache[key] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: dict[str, str]) -> int:
+        """Количество токенов сообщения в формате OpenAI API с учетом служебных.
+
+        Args:
+            message: Сообщение с полями role и content
+
+        Returns:
+            Количество токенов
+        """
+        return self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    @staticmethod
+    def _load_encoding(encoding_name: str) -> Any:
+        """Загрузка кодировки tiktoken.
+
+        Args:
+            encoding_name: Название кодировки
+
+        Returns:
+            Объект кодировки или None, если токенизатор недоступен
+        """
+        try:
+            import tiktoken
+        except ImportError:
+            logger.warning(
+                "tiktoken is not installed, token counts are estimated by characters "
+                "(install the 'tokenizer' extra for exact counts)"
+            )
+            return None
+
+        try:
+            encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(
+                f"Failed to load tiktoken encoding {encoding_name}: {e}, "
+                "token counts are estimated by characters"
+            )
+            return None
+
+        logger.info(f"Token counter initialized with tiktoken encoding: {encoding_name}")
+        return encoding
@@ -0,0 +1,94 @@
+"""In-process кеш отпечатков профилей пользователей, уже записанных в БД."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileCache:
+    """Отпечатки профилей по user_id для пропуска лишних UPSERT в users.
+
+    Отпечаток - хеш полей (username, first_name, last_name, language_code,
+    is_premium, is_bot). Пока профиль пользователя совпадает с записанным и
+    запись не старше ttl секунд, UPSERT не нужен. Записи вытесняются по LRU
+    при превышении max_entries. Кеш не знает об изменениях users в обход
+    процесса (например, удалении пользователя): ttl ограничивает время, в
+    течение которого такое изменение может остаться незамеченным.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000) -> None:
+        """Инициализация кеша.
+
+        Args:
+            ttl: Время жизни отпечатка в секундах
+            max_entries: Максимальное количество пользователей в кеше
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[int, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(row: tuple[Any, ...]) -> int:
+        """Отпечаток профиля.
+
+        Args:
+            row: Строка users (user_id, username, first_name, last_name,
+                language_code, is_premium, is_bot)
+
+        Returns:
+            Хеш полей профиля без user_id
+        """
+        return hash(row[1:])
+
+    def is_fresh(self, row: tuple[Any, ...]) -> bool:
+        """Проверка, что такой профиль уже записан и отпечаток не устарел.
+
+        Args:
+            row: Строка users (первый элемент - user_id)
+
+        Returns:
+            True, если UPSERT можно пропустить
+        """
+        user_id = row[0]
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic() or entry[0] != self.fingerprint(row):
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return False
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return True
+
+    def remember(self, row: tuple[Any, ...]) -> None:
+        """Сохранение отпечатка после записи профиля.
+
+        Args:
+            row: Строка users (первый элемент - user_id)
+        """
+        user_id = row[0]
+        self._entries[user_id] = (self.fingerprint(row), time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Удаление отпечатка (запись профиля не удалась или строка изменена).
+
+        Args:
+            user_id: ID пользователя
+        """
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики кеша.
+
+        Returns:
+            Словарь с количеством записей, попаданий (пропущенных UPSERT) и промахов
+        """
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,296 @@
+"""Буфер отложенной записи (write-behind) для некритичных INSERT/UPSERT."""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Строка messages: (chat_id, user_id, role, content, character_count,
+#                  token_count, prompt_tokens, completion_tokens)
+MessageRow = tuple[int, int, str, str, int, int | None, int | None, int | None]
+
+# Строка users: (user_id, username, first_name, last_name, language_code, is_premium, is_bot)
+UserRow = tuple[Any, ...]
+
+BatchWriter = Callable[[list[UserRow], list[MessageRow]], Awaitable[None]]
+
+
+class WriteBehindQueue:
+    """Буфер, который пакетно сбрасывает записи в БД раз в N мс или по M строк.
+
+    Профили пользователей схлопываются по user_id (пишется последняя версия),
+    сообщения сохраняют порядок добавления. Пакет пишется одним вызовом writer:
+    сначала пользователи, затем сообщения (из-за внешнего ключа messages.user_id).
+
+    Если пакет не записался, строки пишутся по одной, чтобы одна некорректная
+    строка не блокировала остальные. Строка, не записавшаяся max_retries раз,
+    удаляется из буфера с логом уровня ERROR. Ошибки из transient_errors
+    (недоступность БД) не считаются попытками: строки возвращаются в буфер
+    целиком. Буфер не ограничивает себя сам: вызывающий код проверяет is_full
+    и при заполнении пишет строку синхронно.
+    """
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        flush_interval_ms: int,
+        max_batch: int,
+        max_pending: int = 10000,
+        max_retries: int = 3,
+        transient_errors: tuple[type[Exception], ...] = (),
+        on_user_dropped: Callable[[int], None] | None = None,
+    ) -> None:
+        """Инициализация буфера.
+
+        Args:
+            writer: Корутина, записывающая пакет пользователей и сообщений
+            flush_interval_ms: Максимальная задержка записи в миллисекундах
+            max_batch: Количество строк, при котором запись запускается сразу
+            max_pending: Количество строк, при котором буфер считается заполненным
+            max_retries: Количество неудачных попыток записи строки, после
+                которого она удаляется из буфера
+            transient_errors: Временные ошибки writer, после которых строки
+                возвращаются в буфер без учета попыток
+            on_user_dropped: Вызывается с user_id удаленного из буфера профиля
+        """
+        self.writer = writer
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.transient_errors = transient_errors
+        self.on_user_dropped = on_user_dropped
+        # Строки хранятся вместе с количеством неудачных попыток записи
+        self._users: dict[int, tuple[UserRow, int]] = {}
+        self._messages: list[tuple[MessageRow, int]] = []
+        self._pending_keys: dict[tuple[int, int], int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+
+    @property
+    def pending_count(self) -> int:
+        """Количество строк, ожидающих записи."""
+        return len(self._users) + len(self._messages)
+
+    @property
+    def is_full(self) -> bool:
+        """Буфер заполнен: новые строки нужно записывать синхронно."""
+        return self.pending_count >= self.max_pending
+
+    def add_message(self, row: MessageRow) -> None:
+        """Постановка сообщения в очередь записи.
+
+        Args:
+            row: Строка для таблицы messages
+        """
+        self._append_message(row, 0)
+        self._schedule()
+
+    def upsert_user(self, row: UserRow) -> None:
+        """Постановка профиля пользователя в очередь записи.
+
+        Args:
+            row: Строка для таблицы users (первый элемент - user_id)
+        """
+        self._users[row[0]] = (row, 0)
+        self._schedule()
+
+    def has_pending(self, chat_id: int | None = None, user_id: int | None = None) -> bool:
+        """Проверка наличия незаписанных строк для чата и/или пользователя.
+
+        Args:
+            chat_id: ID чата (None = любой)
+            user_id: ID пользователя (None = любой)
+
+        Returns:
+            True, если есть строки, которые еще не записаны в БД
+            (во время выполняющейся записи - всегда True)
+        """
+        if self._flush_lock.locked():
+            return True
+        if user_id is not None and user_id in self._users:
+            return True
+        if chat_id is not None and user_id is not None:
+            return (chat_id, user_id) in self._pending_keys
+        if user_id is not None:
+            return any(key[1] == user_id for key in self._pending_keys)
+        return self.pending_count > 0
+
+    async def flush(self) -> None:
+        """Немедленная запись всех накопленных строк.
+
+        Raises:
+            Exception: Последняя ошибка writer, если часть строк вернулась в
+                буфер и будет записана следующей попыткой
+        """
+        async with self._flush_lock:
+            if not self.pending_count:
+                return
+
+            users = list(self._users.values())
+            messages = self._messages
+            self._users = {}
+            self._messages = []
+            self._pending_keys = {}
+
+            try:
+                await self.writer([row for row, _ in users], [row for row, _ in messages])
+            except self.transient_errors:
+                self.failed_flushes += 1
+                self._requeue(users, messages)
+                raise
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.warning(f"Write-behind batch failed, writing rows one by one: {e}")
+                await self._flush_rows(users, messages)
+                return
+
+            self._count_written(len(users) + len(messages))
+            logger.debug(
+                f"Write-behind flushed {len(users)} user(s) and {len(messages)} message(s)"
+            )
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи и запись оставшихся строк.
+
+        Строки, которые не удалось записать последней попыткой, теряются
+        (количество пишется в лог), чтобы остановка не прерывалась ошибкой.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Write-behind lost {self.pending_count} unwritten row(s) on stop: {e}")
+        logger.info(
+            f"Write-behind stopped: {self.flushed_batches} batch(es), "
+            f"{self.flushed_rows} row(s), {self.failed_flushes} failed flush(es), "
+            f"{self.dropped_rows} dropped row(s)"
+        )
+
+    async def _flush_rows(
+        self, users: list[tuple[UserRow, int]], messages: list[tuple[MessageRow, int]]
+    ) -> None:
+        """Запись строк по одной после неудачной записи пакета.
+
+        Вызывается под _flush_lock. Не записавшиеся строки возвращаются в буфер
+        с увеличенным счетчиком попыток или удаляются после max_retries попыток.
+
+        Args:
+            users: Профили пользователей с количеством неудачных попыток
+            messages: Сообщения с количеством неудачных попыток
+
+        Raises:
+            Exception: Последняя ошибка writer, если часть строк вернулась в буфер
+        """
+        failed_users: list[tuple[UserRow, int]] = []
+        failed_messages: list[tuple[MessageRow, int]] = []
+        last_error: Exception | None = None
+        written = 0
+
+        rows = [(user, True) for user in users] + [(message, False) for message in messages]
+        for index, ((row, attempts), is_user) in enumerate(rows):
+            try:
+                if is_user:
+                    await self.writer([row], [])
+                else:
+                    await self.writer([], [row])
+            except self.transient_errors as e:
+                # БД недоступна: остальные строки возвращаются без учета попыток
+                last_error = e
+                for (rest, rest_attempts), rest_is_user in rows[index:]:
+                    target = failed_users if rest_is_user else failed_messages
+                    target.append((rest, rest_attempts))
+                break
+            except Exception as e:
+                last_error = e
+                if attempts + 1 >= self.max_retries:
+                    self.dropped_rows += 1
+                    logger.error(
+                        f"Write-behind dropped row after {attempts + 1} failed attempt(s): "
+                        f"{row!r}: {e}"
+                    )
+                    if is_user and self.on_user_dropped is not None:
+                        self.on_user_dropped(row[0])
+                elif is_user:
+                    failed_users.append((row, attempts + 1))
+                else:
+                    failed_messages.append((row, attempts + 1))
+            else:
+                written += 1
+
+        self._count_written(written)
+        if failed_users or failed_messages:
+            self._requeue(failed_users, failed_messages)
+            assert last_error is not None
+            raise last_error
+
+    def _requeue(
+        self, users: list[tuple[UserRow, int]], messages: list[tuple[MessageRow, int]]
+    ) -> None:
+        """Возврат строк в начало буфера с сохранением порядка.
+
+        Профиль, обновленный во время записи, не перезаписывается старой версией.
+
+        Args:
+            users: Профили пользователей с количеством неудачных попыток
+            messages: Сообщения с количеством неудачных попыток
+        """
+        for user in users:
+            self._users.setdefault(user[0][0], user)
+        added = self._messages
+        self._messages = []
+        self._pending_keys = {}
+        for row, attempts in [*messages, *added]:
+            self._append_message(row, attempts)
+
+    def _append_message(self, row: MessageRow, attempts: int) -> None:
+        """Добавление сообщения в конец буфера с учетом ключа (chat_id, user_id).
+
+        Args:
+            row: Строка для таблицы messages
+            attempts: Количество неудачных попыток записи
+        """
+        self._messages.append((row, attempts))
+        key = (row[0], row[1])
+        self._pending_keys[key] = self._pending_keys.get(key, 0) + 1
+
+    def _count_written(self, rows: int) -> None:
+        """Учет записанных строк в метриках.
+
+        Args:
+            rows: Количество записанных строк
+        """
+        if rows:
+            self.flushed_batches += 1
+            self.flushed_rows += rows
+
+    def _schedule(self) -> None:
+        """Запуск фоновой задачи и досрочная запись при заполнении пакета."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.pending_count >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        """Фоновый цикл: запись раз в flush_interval или при заполнении пакета."""
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}", exc_info=True)
@@ -0,0 +1,133 @@
+"""Тесты кеша SQL и ответов admin режима веб-чата."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src import admin_query_cache
+from src.admin_query_cache import AdminQueryCache
+from src.chat_manager import ChatManager, ChatMode
+from src.config import Config
+from src.database import Database
+from src.llm_client import LLMClient
+from src.llm_response import LLMResponse
+from src.response_cache.memory_backend import MemoryResponseCache
+
+
+def test_normalize_question() -> None:
+    """Тест что регистр, пробелы и завершающая пунктуация не влияют на ключ."""
+    assert AdminQueryCache.normalize_question(
+        "  Сколько   пользователей? "
+    ) == AdminQueryCache.normalize_question("сколько пользователей")
+
+
+def test_sql_and_answer_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест устаревания SQL и ответов по TTL."""
+    now = 1000.0
+    monkeypatch.setattr(admin_query_cache.time, "monotonic", lambda: now)
+    cache = AdminQueryCache(sql_ttl=60, answer_ttl=10)
+
+    cache.put_sql("Q", "SELECT 1")
+    cache.put_answer("SELECT 1", (1,), "One", 1)
+    assert cache.get_sql("q?") == "SELECT 1"
+    assert cache.get_answer("SELECT 1", (1,)) == ("One", 1)
+    assert cache.get_answer("SELECT 1", (2,)) is None
+
+    now += 10
+    assert cache.get_answer("SELECT 1", (1,)) is None
+    assert cache.get_sql("Q") == "SELECT 1"
+    assert cache.stats() == {"sql_hits": 2, "sql_misses": 0, "answer_hits": 1, "answer_misses": 2}
+
+
+def test_lru_limit() -> None:
+    """Тест вытеснения самых давно использованных вопросов."""
+    cache = AdminQueryCache(max_entries=2)
+    cache.put_sql("a", "SELECT 1")
+    cache.put_sql("b", "SELECT 2")
+    cache.get_sql("a")
+    cache.put_sql("c", "SELECT 3")
+
+    assert cache.get_sql("b") is None
+    assert cache.get_sql("a") == "SELECT 1"
+
+
+@pytest.mark.asyncio
+async def test_repeated_admin_question_skips_llm_calls(database: Database) -> None:
+    """Тест что повтор вопроса не вызывает LLM, пока данные не изменились."""
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(
+        side_effect=["SELECT COUNT(*) AS cnt FROM users", "Пользователей: 0"]
+    )
+    chat_manager = ChatManager(database, llm_client, AdminQueryCache())
+
+    first = await chat_manager.send_message("s1", "Сколько пользователей?", ChatMode.ADMIN)
+    second = await chat_manager.send_message("s1", "сколько пользователей", ChatMode.ADMIN)
+
+    assert first == second == ("Пользователей: 0", "SELECT COUNT(*) AS cnt FROM users")
+    assert llm_client.get_response.await_count == 2
+
+    # Данные изменились: SQL берется из кеша, ответ формируется заново
+    await database.upsert_user(1, None, "Test", None, None, is_premium=False, is_bot=False)
+    llm_client.get_response = AsyncMock(return_value="Пользователей: 1")
+
+    response, _ = await chat_manager.send_message("s1", "Сколько пользователей?", ChatMode.ADMIN)
+
+    assert response == "Пользователей: 1"
+    assert llm_client.get_response.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_admin_answer_from_cache(database: Database) -> None:
+    """Тест что потоковый admin режим отдает ответ из кеша без выполнения SQL."""
+
+    async def stream_response(messages, system_prompt=None):
+        yield LLMResponse("One row")
+
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(return_value="SELECT 1 AS value")
+    llm_client.stream_response = stream_response
+    chat_manager = ChatManager(database, llm_client, AdminQueryCache())
+
+    first = [event async for event in chat_manager.stream_message("s1", "One?", ChatMode.ADMIN)]
+    llm_client.stream_response = MagicMock(side_effect=AssertionError("LLM must not be called"))
+    second = [event async for event in chat_manager.stream_message("s1", "One?", ChatMode.ADMIN)]
+
+    assert second == [
+        ("sql", {"sql_query": "SELECT 1 AS value"}),
+        ("rows", {"row_count": 1}),
+        ("token", {"content": "One row"}),
+        ("done", {"response": "One row", "sql_query": "SELECT 1 AS value"}),
+    ]
+    assert first[-1] == second[-1]
+    assert llm_client.get_response.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_sql_is_regenerated(database: Database) -> None:
+    """Тест что после ошибки выполнения SQL запрашивается у LLM заново."""
+    config = Config(
+        telegram_bot_token="test_token",
+        openrouter_api_key="test_api_key",
+        openrouter_model="test/model",
+        system_prompt="Test prompt",
+        temperature=0.0,
+    )
+    llm_client = LLMClient(config, MemoryResponseCache(max_entries=10))
+    chat_manager = ChatManager(database, llm_client, AdminQueryCache())
+    answers = iter(["SELECT * FROM missing_table", "SELECT 1 AS value", "One row"])
+
+    def completion(**kwargs: object) -> MagicMock:
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = next(answers)
+        response.usage = None
+        return response
+
+    create = AsyncMock(side_effect=completion)
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        failed, _ = await chat_manager.send_message("s1", "One?", ChatMode.ADMIN)
+        response, sql_query = await chat_manager.send_message("s1", "One?", ChatMode.ADMIN)
+
+    assert failed.startswith("Ошибка выполнения SQL запроса")
+    assert (response, sql_query) == ("One row", "SELECT 1 AS value")
+    assert create.await_count == 3
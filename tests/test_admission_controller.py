@@ -0,0 +1,118 @@
+"""Тесты для AdmissionController."""
+
+import asyncio
+
+import pytest
+
+from src.admission_controller import AdmissionController, AdmissionRejectedError
+
+
+async def hold_slot(
+    controller: AdmissionController, release: asyncio.Event, key: int | None = None
+) -> None:
+    """Занятие слота до установки события release."""
+    async with controller.slot(key):
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrency_and_queues() -> None:
+    """Тест что сверх max_concurrent запросы ждут освобождения слота."""
+    controller = AdmissionController(max_concurrent=2, queue_timeout=1.0)
+    release = asyncio.Event()
+    holders = [asyncio.create_task(hold_slot(controller, release)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    assert controller.in_flight == 2
+    assert controller.queue_depth == 1
+
+    release.set()
+    await asyncio.gather(*holders)
+
+    stats = controller.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 1
+    assert stats["admitted"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rejects_over_per_user_limit() -> None:
+    """Тест что запросы пользователя сверх per_user_limit отклоняются сразу."""
+    controller = AdmissionController(max_concurrent=10, per_user_limit=1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold_slot(controller, release, key=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        async with controller.slot(1):
+            pass
+    assert exc_info.value.reason == "user_limit"
+
+    # Другой пользователь не ограничен
+    async with controller.slot(2):
+        pass
+
+    release.set()
+    await holder
+    async with controller.slot(1):
+        pass
+    assert controller.rejected["user_limit"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full() -> None:
+    """Тест что при заполненной очереди запрос отклоняется без ожидания."""
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+    holders = [asyncio.create_task(hold_slot(controller, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError, match="queue_full"):
+        async with controller.slot():
+            pass
+
+    release.set()
+    await asyncio.gather(*holders)
+
+
+@pytest.mark.asyncio
+async def test_rejects_after_queue_timeout() -> None:
+    """Тест что запрос отклоняется, если слот не освободился за queue_timeout."""
+    controller = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold_slot(controller, release, key=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError, match="queue_timeout"):
+        async with controller.slot(2):
+            pass
+
+    assert controller.queue_depth == 0
+    assert controller.rejected["queue_timeout"] == 1
+    release.set()
+    await holder
+    # Слот и счетчик пользователя освобождены
+    assert controller.in_flight == 0
+    async with controller.slot(2):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_does_not_wait_or_skip_queue() -> None:
+    """Тест что try_acquire не ждет слот и не обходит очередь."""
+    controller = AdmissionController(max_concurrent=2, queue_timeout=1.0)
+
+    assert await controller.try_acquire()
+    assert controller.in_flight == 1
+
+    release = asyncio.Event()
+    holders = [asyncio.create_task(hold_slot(controller, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+    assert not await controller.try_acquire()
+
+    controller.release()
+    release.set()
+    await asyncio.gather(*holders)
+    assert controller.in_flight == 0
@@ -0,0 +1,57 @@
+"""Тесты общих ресурсов FastAPI приложения, создаваемых в lifespan."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.chat_manager import ChatManager
+from src.stats.mock_collector import MockStatCollector
+
+CONFIG_ENV = ("TELEGRAM_BOT_TOKEN", "OPENROUTER_API_KEY", "OPENROUTER_MODEL", "SYSTEM_PROMPT")
+
+
+def test_lifespan_creates_shared_resources(
+    monkeypatch: pytest.MonkeyPatch, test_database_url: str
+) -> None:
+    """Тест что ресурсы создаются один раз, прогреваются и закрываются при остановке."""
+    for name in CONFIG_ENV:
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("DATABASE_URL", test_database_url)
+    monkeypatch.setenv("USE_REAL_STATS", "false")
+
+    with TestClient(app) as client:
+        chat_manager = app.state.chat_manager
+        database = app.state.database
+        llm_client = app.state.llm_client
+
+        assert isinstance(chat_manager, ChatManager)
+        assert chat_manager.database is database
+        assert isinstance(app.state.stat_collector, MockStatCollector)
+        # Пул открыт до первого запроса
+        assert database.get_pool_stats()["pool_size"] >= 1
+
+        assert client.get("/api/stats/dashboard").status_code == 200
+        assert client.get("/api/stats/dashboard").status_code == 200
+        assert app.state.chat_manager is chat_manager
+
+    assert llm_client.client.is_closed()
+    assert database.pool.closed
+
+
+def test_lifespan_without_llm_config_disables_chat(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    """Тест что без конфигурации LLM статистика работает, а чат отвечает 503."""
+    for name in CONFIG_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("USE_REAL_STATS", "false")
+    # В рабочей директории не должно быть .env
+    monkeypatch.chdir(tmp_path)
+
+    with TestClient(app) as client:
+        assert app.state.database is None
+        assert client.get("/api/stats/dashboard").status_code == 200
+        response = client.get("/api/chat/history/s1")
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Chat is not configured"}
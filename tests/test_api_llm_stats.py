@@ -0,0 +1,63 @@
+"""Тесты endpoint метрик LLM (/api/stats/llm)."""
+
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.config import Config
+from src.llm_client import LLMClient
+from src.response_cache.memory_backend import MemoryResponseCache
+
+
+def make_config(**overrides: object) -> Config:
+    """Тестовая конфигурация LLMClient."""
+    return Config(
+        telegram_bot_token="test_token",
+        openrouter_api_key="test_api_key",
+        openrouter_model="test/model",
+        system_prompt="Test prompt",
+        **overrides,  # type: ignore[arg-type]
+    )
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """TestClient без lifespan: LLMClient задается в тесте через app.state."""
+    previous = getattr(app.state, "llm_client", None)
+    yield TestClient(app)
+    app.state.llm_client = previous
+
+
+def test_llm_stats_include_admission(client: TestClient) -> None:
+    """Тест что метрики лимита одновременных запросов отдаются под ключом admission."""
+    app.state.llm_client = LLMClient(make_config(llm_max_concurrent=2))
+
+    response = client.get("/api/stats/llm")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["admission"]["in_flight"] == 0
+    assert body["admission"]["queue_depth"] == 0
+    assert "avg_wait_ms" in body["admission"]
+    assert "test/model" in body
+
+
+def test_llm_stats_without_admission(client: TestClient) -> None:
+    """Тест что без лимита одновременных запросов ключа admission нет."""
+    app.state.llm_client = LLMClient(make_config(llm_max_concurrent=0))
+
+    assert "admission" not in client.get("/api/stats/llm").json()
+
+
+def test_llm_stats_include_response_cache(client: TestClient) -> None:
+    """Тест что метрики кеша ответов отдаются под ключом response_cache."""
+    cache = MemoryResponseCache(max_entries=10)
+    cache.hits, cache.misses = 3, 1
+    app.state.llm_client = LLMClient(make_config(), cache)
+
+    body = client.get("/api/stats/llm").json()
+
+    assert body["response_cache"]["hits"] == 3
+    assert body["response_cache"]["hit_rate"] == 0.75
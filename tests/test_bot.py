@@ -1,10 +1,12 @@
 """Юнит-тесты для модуля bot."""
 
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from aiohttp.test_utils import TestClient, TestServer
 
-from src.bot import TelegramBot
+from src.bot import SECRET_TOKEN_HEADER, TelegramBot
 from src.config import Config
 from src.handlers import MessageHandler
 
@@ -167,3 +169,127 @@ def test_dispatcher_initialization(config):
 
     # Проверяем что у диспетчера есть message router
     assert bot.dp.message is not None
+
+
+@pytest.mark.asyncio
+async def test_start_runs_shutdown_callbacks(config):
+    """Тест что при остановке polling вызываются shutdown callbacks."""
+    bot = TelegramBot(config)
+    bot.dp.start_polling = AsyncMock()
+    bot.bot.session = MagicMock()
+    bot.bot.session.close = AsyncMock()
+
+    flush = AsyncMock()
+    failing = AsyncMock(side_effect=RuntimeError("flush failed"))
+    bot.add_shutdown_callback(failing)
+    bot.add_shutdown_callback(flush)
+
+    await bot.start()
+
+    failing.assert_awaited_once()
+    flush.assert_awaited_once()
+    bot.bot.session.close.assert_awaited_once()
+
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+        "text": "Привет",
+    },
+}
+
+
+@pytest.fixture
+def webhook_config(config):
+    """Фикстура конфигурации в режиме webhook."""
+    return config.model_copy(
+        update={
+            "telegram_mode": "webhook",
+            "telegram_webhook_url": "https://bot.example.com/telegram/webhook",
+            "telegram_webhook_secret": "secret",
+            "telegram_webhook_max_concurrent_updates": 1,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_invalid_secret(webhook_config):
+    """Тест что обновление с неверным секретом не передается в Dispatcher."""
+    bot = TelegramBot(webhook_config)
+    bot.dp.feed_update = AsyncMock()
+
+    async with TestClient(TestServer(bot.create_webhook_app())) as client:
+        response = await client.post(
+            "/telegram/webhook", json=UPDATE, headers={SECRET_TOKEN_HEADER: "wrong"}
+        )
+        missing = await client.post("/telegram/webhook", json=UPDATE)
+        non_ascii = await client.post(
+            "/telegram/webhook", json=UPDATE, headers={SECRET_TOKEN_HEADER: "секрет"}
+        )
+
+    assert response.status == 401
+    assert missing.status == 401
+    assert non_ascii.status == 401
+    bot.dp.feed_update.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_webhook_feeds_update_to_dispatcher(webhook_config):
+    """Тест что обновление с верным секретом обрабатывается Dispatcher."""
+    bot = TelegramBot(webhook_config)
+    processed = asyncio.Event()
+
+    async def feed_update(bot_instance, update):
+        assert update.message.text == "Привет"
+        processed.set()
+
+    bot.dp.feed_update = feed_update
+
+    async with TestClient(TestServer(bot.create_webhook_app())) as client:
+        response = await client.post(
+            "/telegram/webhook", json=UPDATE, headers={SECRET_TOKEN_HEADER: "secret"}
+        )
+        await asyncio.wait_for(processed.wait(), 1)
+        invalid = await client.post(
+            "/telegram/webhook", data=b"not json", headers={SECRET_TOKEN_HEADER: "secret"}
+        )
+        health = await client.get("/health")
+
+    assert response.status == 200
+    assert invalid.status == 400
+    assert health.status == 200
+
+
+@pytest.mark.asyncio
+async def test_webhook_limits_concurrent_updates(webhook_config):
+    """Тест что сверх лимита обновление не принимается, пока не завершится текущее."""
+    bot = TelegramBot(webhook_config)
+    release = asyncio.Event()
+    started: list[int] = []
+
+    async def feed_update(bot_instance, update):
+        started.append(update.update_id)
+        await release.wait()
+
+    bot.dp.feed_update = feed_update
+    headers = {SECRET_TOKEN_HEADER: "secret"}
+
+    async with TestClient(TestServer(bot.create_webhook_app())) as client:
+        first = await client.post("/telegram/webhook", json=UPDATE, headers=headers)
+        second = asyncio.create_task(
+            client.post("/telegram/webhook", json={**UPDATE, "update_id": 2}, headers=headers)
+        )
+        await asyncio.sleep(0.1)
+        assert not second.done()
+        assert started == [1]
+
+        release.set()
+        assert (await second).status == 200
+        await asyncio.sleep(0)
+
+    assert first.status == 200
+    assert started == [1, 2]
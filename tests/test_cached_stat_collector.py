@@ -0,0 +1,136 @@
+"""Тесты для кеширующего сборщика статистики CachedStatCollector."""
+
+import asyncio
+
+import pytest
+
+from src.stats.cached_collector import CachedStatCollector
+from src.stats.collector import StatCollector
+from src.stats.mock_collector import MockStatCollector
+from src.stats.models import DashboardStats
+
+
+class FakeCollector(StatCollector):
+    """Сборщик, который считает вызовы и ждет разрешения на ответ."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error: Exception | None = None
+        self._mock = MockStatCollector()
+
+    async def get_dashboard_stats(self) -> DashboardStats:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        stats = await self._mock.get_dashboard_stats()
+        stats.overview.total_users = self.calls
+        return stats
+
+
+@pytest.mark.asyncio
+async def test_fresh_value_served_from_cache() -> None:
+    """Тест что свежее значение не пересчитывается и сообщает возраст."""
+    inner = FakeCollector()
+    collector = CachedStatCollector(inner, ttl=60.0)
+
+    first = await collector.get_dashboard_stats()
+    second = await collector.get_dashboard_stats()
+
+    assert inner.calls == 1
+    assert second.overview.total_users == first.overview.total_users
+    assert second.metadata.cache_age_seconds >= first.metadata.cache_age_seconds
+    assert collector.stats()["hits"] == 1
+    assert collector.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_computation() -> None:
+    """Тест single-flight: одновременные промахи ждут одно вычисление."""
+    inner = FakeCollector()
+    inner.release.clear()
+    collector = CachedStatCollector(inner, ttl=60.0)
+
+    tasks = [asyncio.create_task(collector.get_dashboard_stats()) for _ in range(5)]
+    await asyncio.sleep(0)
+    inner.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert inner.calls == 1
+    assert {result.overview.total_users for result in results} == {1}
+
+
+@pytest.mark.asyncio
+async def test_stale_value_returned_while_refreshing() -> None:
+    """Тест stale-while-revalidate: устаревшее значение отдается сразу."""
+    inner = FakeCollector()
+    collector = CachedStatCollector(inner, ttl=0.01)
+    await collector.get_dashboard_stats()
+    await asyncio.sleep(0.02)
+
+    inner.release.clear()
+    stale = await asyncio.wait_for(collector.get_dashboard_stats(), timeout=1)
+    again = await asyncio.wait_for(collector.get_dashboard_stats(), timeout=1)
+
+    assert stale.overview.total_users == 1
+    assert again.overview.total_users == 1
+    # Одно фоновое обновление на все запросы
+    assert inner.calls == 2
+
+    inner.release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    fresh = await collector.get_dashboard_stats()
+    assert fresh.overview.total_users == 2
+    assert collector.stats()["stale_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_value() -> None:
+    """Тест что ошибка фонового обновления не ломает ответ."""
+    inner = FakeCollector()
+    collector = CachedStatCollector(inner, ttl=0.01)
+    await collector.get_dashboard_stats()
+    await asyncio.sleep(0.02)
+
+    inner.error = RuntimeError("database is down")
+    await collector.get_dashboard_stats()
+    # Даем фоновому обновлению завершиться с ошибкой
+    await asyncio.sleep(0.005)
+    stale = await collector.get_dashboard_stats()
+
+    assert stale.overview.total_users == 1
+    assert collector.stats()["refresh_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_first_computation_raises_and_retries() -> None:
+    """Тест что без значения в кеше ошибка передается, а следующий запрос повторяет вычисление."""
+    inner = FakeCollector()
+    inner.error = RuntimeError("database is down")
+    collector = CachedStatCollector(inner, ttl=60.0)
+
+    with pytest.raises(RuntimeError, match="database is down"):
+        await collector.get_dashboard_stats()
+
+    inner.error = None
+    stats = await collector.get_dashboard_stats()
+    assert stats.overview.total_users == 2
+    assert stats.metadata.cache_age_seconds >= 0
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_background_refresh() -> None:
+    """Тест что close отменяет незавершенное фоновое обновление."""
+    inner = FakeCollector()
+    inner.release.clear()
+    collector = CachedStatCollector(inner, ttl=60.0)
+    waiter = asyncio.create_task(collector.get_dashboard_stats())
+    await asyncio.sleep(0)
+
+    await collector.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
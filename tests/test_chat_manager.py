@@ -0,0 +1,41 @@
+"""Тесты выполнения SQL admin режима (ChatManager._execute_sql)."""
+
+from unittest.mock import MagicMock
+
+import psycopg
+import pytest
+
+from src.chat_manager import ChatManager
+from src.database import Database
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_rolls_back_session_settings(database: Database) -> None:
+    """Тест что настройки сессии из запроса не остаются на соединении пула."""
+    chat_manager = ChatManager(database, MagicMock())
+
+    await chat_manager._execute_sql("SELECT set_config('application_name', 'leaked', false)")
+
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("SELECT current_setting('application_name') AS name")
+        row = await cur.fetchone()
+    assert row is not None
+    assert row["name"] != "leaked"
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_is_read_only(database: Database) -> None:
+    """Тест что запрос с изменением данных отклоняется."""
+    chat_manager = ChatManager(database, MagicMock())
+
+    with pytest.raises(psycopg.errors.ReadOnlySqlTransaction):
+        await chat_manager._execute_sql("SELECT nextval('messages_id_seq')")
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_rejects_multiple_statements(database: Database) -> None:
+    """Тест что после SELECT нельзя завершить транзакцию и выполнить другую команду."""
+    chat_manager = ChatManager(database, MagicMock())
+
+    with pytest.raises(psycopg.errors.SyntaxError):
+        await chat_manager._execute_sql("SELECT 1; COMMIT; SELECT 2")
@@ -0,0 +1,118 @@
+"""Тесты потокового ответа веб-чата (ChatManager.stream_message и SSE endpoint)."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.api.chat import get_chat_manager
+from src.chat_manager import ChatManager, ChatMode
+from src.database import Database
+from src.llm_client import LLMError
+from src.llm_response import LLMResponse
+
+
+def fake_stream(*contents: str):
+    """Подмена LLMClient.stream_response, отдающая заданные фрагменты."""
+
+    async def stream_response(messages, system_prompt=None):
+        for content in contents:
+            yield LLMResponse(content)
+
+    return stream_response
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Разбор тела text/event-stream в список (event, data)."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_message_normal_mode(database: Database) -> None:
+    """Тест что normal режим отдает токены и сохраняет ответ после завершения."""
+    llm_client = MagicMock()
+    llm_client.stream_response = fake_stream("Hel", "lo")
+    chat_manager = ChatManager(database, llm_client)
+
+    events = [event async for event in chat_manager.stream_message("s1", "Hi")]
+
+    assert events == [
+        ("token", {"content": "Hel"}),
+        ("token", {"content": "lo"}),
+        ("done", {"response": "Hello", "sql_query": None}),
+    ]
+    assert await chat_manager.get_history("s1") == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_message_admin_mode_stages(database: Database) -> None:
+    """Тест что admin режим отдает SQL, количество строк и затем ответ."""
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(return_value="```sql\nSELECT 1 AS value\n```")
+    llm_client.stream_response = fake_stream("One ", "row")
+    chat_manager = ChatManager(database, llm_client)
+
+    events = [
+        event async for event in chat_manager.stream_message("s1", "How many?", ChatMode.ADMIN)
+    ]
+
+    assert events == [
+        ("sql", {"sql_query": "SELECT 1 AS value"}),
+        ("rows", {"row_count": 1}),
+        ("token", {"content": "One "}),
+        ("token", {"content": "row"}),
+        ("done", {"response": "One row", "sql_query": "SELECT 1 AS value"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_message_not_persisted_on_failure(database: Database) -> None:
+    """Тест что при обрыве потока ответ ассистента не сохраняется."""
+
+    async def broken_stream(messages, system_prompt=None):
+        yield LLMResponse("Part")
+        raise LLMError("Stream broken")
+
+    llm_client = MagicMock()
+    llm_client.stream_response = broken_stream
+    chat_manager = ChatManager(database, llm_client)
+
+    with pytest.raises(LLMError):
+        async for _ in chat_manager.stream_message("s1", "Hi"):
+            pass
+
+    assert await chat_manager.get_history("s1") == [{"role": "user", "content": "Hi"}]
+
+
+def test_stream_endpoint_emits_sse_events() -> None:
+    """Тест SSE endpoint: события сериализуются, ошибка отдается событием error."""
+
+    async def stream_message(session_id, message, mode):
+        yield "token", {"content": "Привет"}
+        raise RuntimeError("boom")
+
+    chat_manager = MagicMock()
+    chat_manager.stream_message = stream_message
+    app.dependency_overrides[get_chat_manager] = lambda: chat_manager
+    try:
+        response = TestClient(app).post(
+            "/api/chat/message/stream", json={"message": "Hi", "session_id": "s1"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert parse_sse(response.text) == [
+        ("token", {"content": "Привет"}),
+        ("error", {"detail": "Error processing message: boom"}),
+    ]
@@ -0,0 +1,101 @@
+"""Тесты для CircuitBreaker."""
+
+import pytest
+
+from src import circuit_breaker
+from src.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    """Управляемая замена time.monotonic."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Фикстура, подменяющая часы модуля circuit_breaker."""
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def test_opens_after_threshold(clock: FakeClock) -> None:
+    """Тест что цепь размыкается после failure_threshold ошибок подряд."""
+    breaker = CircuitBreaker("model", failure_threshold=3, recovery_timeout=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_failure_count(clock: FakeClock) -> None:
+    """Тест что успешный ответ обнуляет счетчик ошибок."""
+    breaker = CircuitBreaker("model", failure_threshold=2, recovery_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_single_probe(clock: FakeClock) -> None:
+    """Тест что после recovery_timeout пропускается один пробный запрос."""
+    breaker = CircuitBreaker("model", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock: FakeClock) -> None:
+    """Тест что ошибка пробного запроса снова размыкает цепь."""
+    breaker = CircuitBreaker("model", failure_threshold=3, recovery_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow_request()
+
+
+def test_released_probe_can_be_retried(clock: FakeClock) -> None:
+    """Тест что отмененный пробный запрос освобождает слот."""
+    breaker = CircuitBreaker("model", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_zero_threshold_disables_breaker(clock: FakeClock) -> None:
+    """Тест что failure_threshold=0 выключает размыкание."""
+    breaker = CircuitBreaker("model", failure_threshold=0, recovery_timeout=30)
+
+    for _ in range(100):
+        breaker.record_failure()
+
+    assert breaker.allow_request()
@@ -100,6 +100,28 @@ def test_config_from_real_env():
     assert config.timeout > 0
 
 
+def test_config_webhook_mode_requires_url_and_secret(monkeypatch):
+    """Тест что режим webhook требует URL и секрет, а неизвестный режим отклоняется."""
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "test_bot_token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test_api_key")
+    monkeypatch.setenv("OPENROUTER_MODEL", "test_model")
+    monkeypatch.setenv("SYSTEM_PROMPT", "Test prompt")
+    monkeypatch.setenv("TELEGRAM_MODE", "webhook")
+    monkeypatch.setenv("TELEGRAM_WEBHOOK_URL", "https://bot.example.com/telegram/webhook")
+
+    from src.config import Config
+
+    with pytest.raises(ValidationError, match="telegram_webhook_secret"):
+        Config()
+
+    monkeypatch.setenv("TELEGRAM_WEBHOOK_SECRET", "secret")
+    assert Config().telegram_mode == "webhook"
+
+    monkeypatch.setenv("TELEGRAM_MODE", "push")
+    with pytest.raises(ValidationError, match="telegram_mode"):
+        Config()
+
+
 @pytest.mark.integration
 def test_config_telegram_token_format():
     """Тест формата Telegram токена из реальной конфигурации."""
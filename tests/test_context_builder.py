@@ -0,0 +1,109 @@
+"""Тесты для подсчета токенов и построителя контекста."""
+
+from unittest.mock import MagicMock, patch
+
+from src.context_builder import ContextBuilder
+from src.token_counter import MESSAGE_OVERHEAD_TOKENS, TokenCounter
+
+
+def msg(content: str, role: str = "user") -> dict[str, str]:
+    """Сообщение в формате OpenAI API."""
+    return {"role": role, "content": content}
+
+
+def make_builder(token_budget: int) -> ContextBuilder:
+    """Построитель контекста с оценкой токенов по символам (3 символа = 1 токен)."""
+    return ContextBuilder(TokenCounter(encoding_name=None), token_budget)
+
+
+def test_fallback_count_by_characters():
+    """Тест оценки токенов по символам без токенизатора."""
+    counter = TokenCounter(encoding_name=None)
+
+    assert not counter.is_exact
+    assert counter.count("") == 0
+    assert counter.count("abc") == 1
+    assert counter.count("abcd") == 2
+    assert counter.count_message(msg("abc")) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_count_is_memoized():
+    """Тест что повторный подсчет того же текста не вызывает токенизатор."""
+    counter = TokenCounter(encoding_name=None)
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2, 3]
+    counter._encoding = encoding
+
+    assert counter.count("hello world") == 3
+    assert counter.count("hello world") == 3
+
+    encoding.encode.assert_called_once()
+    assert counter.hits == 1
+    assert counter.misses == 1
+
+
+def test_count_cache_is_bounded():
+    """Тест вытеснения старых результатов при переполнении кеша."""
+    counter = TokenCounter(encoding_name=None, cache_size=2)
+
+    for text in ("a", "bb", "ccc"):
+        counter.count(text)
+
+    assert len(counter._cache) == 2
+
+
+def test_missing_tiktoken_falls_back_to_estimate():
+    """Тест что без tiktoken счетчик работает по оценке."""
+    with patch.dict("sys.modules", {"tiktoken": None}):
+        counter = TokenCounter("o200k_base")
+
+    assert not counter.is_exact
+    assert counter.count("abcdef") == 2
+
+
+def test_build_keeps_all_messages_within_budget():
+    """Тест что короткая история передается целиком."""
+    builder = make_builder(token_budget=100)
+    history = [msg("a" * 3), msg("b" * 3, "assistant"), msg("c" * 3)]
+
+    assert builder.build(history) == history
+    assert builder.dropped_messages == 0
+
+
+def test_build_drops_oldest_messages_over_budget():
+    """Тест что в контекст попадают последние сообщения, помещающиеся в бюджет."""
+    builder = make_builder(token_budget=2 * (10 + MESSAGE_OVERHEAD_TOKENS))
+    history = [msg("a" * 30), msg("b" * 30, "assistant"), msg("c" * 30)]
+
+    assert builder.build(history) == history[1:]
+    assert builder.dropped_messages == 1
+
+
+def test_build_stops_at_large_message():
+    """Тест что большое старое сообщение отсекает все, что было до него."""
+    builder = make_builder(token_budget=50)
+    history = [msg("x"), msg("pasted file " * 100), msg("question")]
+
+    assert builder.build(history) == [msg("question")]
+
+
+def test_build_always_keeps_latest_message():
+    """Тест что текущий запрос попадает в контекст даже сверх бюджета."""
+    builder = make_builder(token_budget=5)
+    history = [msg("old"), msg("a" * 300)]
+
+    assert builder.build(history) == [msg("a" * 300)]
+
+
+def test_build_accounts_for_system_prompt():
+    """Тест что системный промпт расходует бюджет."""
+    builder = make_builder(token_budget=2 * (1 + MESSAGE_OVERHEAD_TOKENS))
+    history = [msg("abc"), msg("def")]
+
+    assert builder.build(history) == history
+    assert builder.build(history, system_prompt="sys") == [msg("def")]
+
+
+def test_build_empty_history():
+    """Тест пустой истории."""
+    assert make_builder(token_budget=10).build([]) == []
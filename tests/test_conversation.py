@@ -1,9 +1,12 @@
 """Тесты для модуля conversation с базой данных."""
 
+from unittest.mock import patch
+
 import pytest
 
 from src.conversation import Conversation
 from src.database import Database
+from src.history_cache import HistoryCache
 
 
 @pytest.fixture
@@ -71,9 +74,9 @@ async def test_get_history_with_limit(conversation: Conversation, database: Data
     # Получаем последние 3 сообщения
     history = await conversation.get_history(chat_id, user_id, limit=3)
     assert len(history) == 3
-    assert history[0]["content"] == "Message 0"
-    assert history[1]["content"] == "Message 1"
-    assert history[2]["content"] == "Message 2"
+    assert history[0]["content"] == "Message 2"
+    assert history[1]["content"] == "Message 3"
+    assert history[2]["content"] == "Message 4"
 
 
 @pytest.mark.asyncio
@@ -255,3 +258,208 @@ async def test_soft_delete_persists_data(conversation: Conversation, database: D
         row = cur.fetchone()
         assert row is not None
         assert row["deleted_at"] is not None  # Проверяем что deleted_at установлен
+
+
+def make_user_profile(user_id: int, first_name: str = "Test") -> dict[str, object]:
+    """Поля пользователя для ingest_user_turn."""
+    return {
+        "user_id": user_id,
+        "username": "test_user",
+        "first_name": first_name,
+        "last_name": None,
+        "language_code": "en",
+        "is_premium": False,
+        "is_bot": False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_ingest_user_turn_creates_user_and_returns_history(
+    conversation: Conversation, database: Database
+) -> None:
+    """Тест что ingest_user_turn сохраняет пользователя, сообщение и возвращает историю."""
+    chat_id = 123
+    user_id = 456
+
+    history = await conversation.ingest_user_turn(
+        chat_id, "Hello", make_user_profile(user_id), limit=10
+    )
+
+    assert history == [{"role": "user", "content": "Hello"}]
+    user = await database.get_user(user_id)
+    assert user is not None
+    assert user["first_name"] == "Test"
+
+
+@pytest.mark.asyncio
+async def test_ingest_user_turn_updates_user_and_appends_message(
+    conversation: Conversation, database: Database
+) -> None:
+    """Тест что повторный ingest обновляет профиль и дополняет историю."""
+    chat_id = 123
+    user_id = 456
+
+    await conversation.ingest_user_turn(chat_id, "First", make_user_profile(user_id))
+    await conversation.add_message(chat_id, user_id, "assistant", "Reply")
+    history = await conversation.ingest_user_turn(
+        chat_id, "Second", make_user_profile(user_id, first_name="Renamed")
+    )
+
+    assert [msg["content"] for msg in history] == ["First", "Reply", "Second"]
+    user = await database.get_user(user_id)
+    assert user is not None
+    assert user["first_name"] == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_ingest_user_turns_reads_history_once(
+    conversation: Conversation, database: Database
+) -> None:
+    """Тест что серия сообщений сохраняется по порядку, а история читается один раз."""
+    chat_id = 123
+    user_id = 456
+    await conversation.ingest_user_turn(chat_id, "Before", make_user_profile(user_id))
+
+    with patch.object(database, "_history_query", wraps=database._history_query) as history_query:
+        history = await conversation.ingest_user_turns(
+            chat_id, ["Part 1", "Part 2", "Part 3"], make_user_profile(user_id), limit=3
+        )
+
+    assert history_query.call_count == 1
+    assert [msg["content"] for msg in history] == ["Part 1", "Part 2", "Part 3"]
+    all_history = await database.get_history(chat_id, user_id)
+    assert [msg["content"] for msg in all_history] == ["Before", "Part 1", "Part 2", "Part 3"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_user_turn_respects_limit(
+    conversation: Conversation, database: Database
+) -> None:
+    """Тест что ingest_user_turn применяет тот же лимит, что и get_history."""
+    chat_id = 123
+    user_id = 456
+
+    for i in range(5):
+        history = await conversation.ingest_user_turn(
+            chat_id, f"Message {i}", make_user_profile(user_id), limit=3
+        )
+
+    assert len(history) == 3
+    assert history == await conversation.get_history(chat_id, user_id, limit=3)
+
+
+@pytest.fixture
+def cached_conversation(database: Database) -> Conversation:
+    """Фикстура для создания Conversation с кешем истории."""
+    cache = HistoryCache(window=10, max_entries=100, max_chars=100_000, ttl=60.0)
+    return Conversation(database, cache)
+
+
+@pytest.mark.asyncio
+async def test_cached_history_served_from_memory(
+    cached_conversation: Conversation, database: Database
+) -> None:
+    """Тест что повторное чтение истории обслуживается кешем."""
+    chat_id = 123
+    user_id = 456
+    await database.upsert_user(user_id, "test_user", "Test", "User", "en", False, False)
+    await cached_conversation.add_message(chat_id, user_id, "user", "Hello")
+
+    first = await cached_conversation.get_history(chat_id, user_id, limit=10)
+    await cached_conversation.add_message(chat_id, user_id, "assistant", "Hi!")
+    second = await cached_conversation.get_history(chat_id, user_id, limit=10)
+
+    assert first == [{"role": "user", "content": "Hello"}]
+    assert second == await database.get_history(chat_id, user_id, limit=10)
+    assert cached_conversation.cache is not None
+    assert cached_conversation.cache.stats()["hits"] == 1
+    assert cached_conversation.cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_ingest_skips_history_query(cached_conversation: Conversation) -> None:
+    """Тест что ingest_user_turn при попадании в кеш возвращает ту же историю, что и БД."""
+    chat_id = 123
+    user_id = 456
+
+    await cached_conversation.ingest_user_turn(chat_id, "First", make_user_profile(user_id))
+    await cached_conversation.add_message(chat_id, user_id, "assistant", "Reply")
+    history = await cached_conversation.ingest_user_turn(
+        chat_id, "Second", make_user_profile(user_id), limit=10
+    )
+
+    assert [msg["content"] for msg in history] == ["First", "Reply", "Second"]
+    assert history == await cached_conversation.db.get_history(chat_id, user_id, limit=10)
+    assert cached_conversation.cache is not None
+    assert cached_conversation.cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_ingest_turns_appends_all_messages(
+    cached_conversation: Conversation,
+) -> None:
+    """Тест что серия сообщений при попадании в кеш дополняет окно по порядку."""
+    chat_id = 123
+    user_id = 456
+
+    await cached_conversation.ingest_user_turn(chat_id, "First", make_user_profile(user_id))
+    history = await cached_conversation.ingest_user_turns(
+        chat_id, ["Part 1", "Part 2"], make_user_profile(user_id), limit=10
+    )
+
+    assert [msg["content"] for msg in history] == ["First", "Part 1", "Part 2"]
+    assert history == await cached_conversation.db.get_history(chat_id, user_id, limit=10)
+    assert await cached_conversation.get_history(chat_id, user_id, limit=10) == history
+
+
+@pytest.mark.asyncio
+async def test_clear_history_invalidates_cache(
+    cached_conversation: Conversation, database: Database
+) -> None:
+    """Тест что clear_history удаляет диалог из кеша."""
+    chat_id = 123
+    user_id = 456
+    await cached_conversation.ingest_user_turn(chat_id, "Hello", make_user_profile(user_id))
+
+    await cached_conversation.clear_history(chat_id, user_id)
+
+    assert await cached_conversation.get_history(chat_id, user_id) == []
+
+
+@pytest.mark.asyncio
+async def test_long_history_not_served_from_cache(
+    cached_conversation: Conversation, database: Database
+) -> None:
+    """Тест что история длиннее окна читается из БД с правильным лимитом."""
+    chat_id = 123
+    user_id = 456
+    await database.upsert_user(user_id, "test_user", "Test", "User", "en", False, False)
+    for i in range(12):
+        await cached_conversation.add_message(chat_id, user_id, "user", f"Message {i}")
+
+    history = await cached_conversation.get_history(chat_id, user_id, limit=3)
+
+    assert history == await database.get_history(chat_id, user_id, limit=3)
+    assert cached_conversation.cache is not None
+    assert cached_conversation.cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_long_history_window_served_from_cache(
+    cached_conversation: Conversation, database: Database
+) -> None:
+    """Тест что последние сообщения длинной истории после первого чтения берутся из кеша."""
+    chat_id = 123
+    user_id = 456
+    await database.upsert_user(user_id, "test_user", "Test", "User", "en", False, False)
+    for i in range(12):
+        await cached_conversation.add_message(chat_id, user_id, "user", f"Message {i}")
+
+    await cached_conversation.get_history(chat_id, user_id, limit=3)
+    await cached_conversation.add_message(chat_id, user_id, "assistant", "Reply")
+    history = await cached_conversation.get_history(chat_id, user_id, limit=3)
+
+    assert [msg["content"] for msg in history] == ["Message 10", "Message 11", "Reply"]
+    assert history == await database.get_history(chat_id, user_id, limit=3)
+    assert cached_conversation.cache is not None
+    assert cached_conversation.cache.stats()["hits"] == 1
@@ -0,0 +1,55 @@
+"""Тесты для пула соединений Database."""
+
+import pytest
+
+from src.database import Database
+
+
+@pytest.mark.asyncio
+async def test_pool_opens_lazily_on_first_query(database: Database) -> None:
+    """Тест что пул открывается при первом запросе без явного open()."""
+    history = await database.get_history(111, 222)
+
+    assert history == []
+    assert database.get_pool_stats()["pool_size"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections(database: Database) -> None:
+    """Тест что последовательные запросы переиспользуют соединения из пула."""
+    await database.open()
+    connections_before = database.get_pool_stats().get("connections_num", 0)
+
+    await database.upsert_user(222, "pool_user", "Pool", None, "en", False, False)
+    for i in range(10):
+        await database.add_message(111, 222, "user", f"Message {i}")
+    history = await database.get_history(111, 222)
+
+    assert len(history) == 10
+    stats = database.get_pool_stats()
+    assert stats.get("connections_num", 0) == connections_before
+    assert stats["requests_num"] >= 12
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_contain_size_metrics(database: Database) -> None:
+    """Тест что метрики пула содержат размеры пула."""
+    await database.open()
+
+    stats = database.get_pool_stats()
+
+    assert stats["pool_min"] == 1
+    assert stats["pool_max"] == 10
+    assert "requests_waiting" in stats
+
+
+@pytest.mark.asyncio
+async def test_close_is_idempotent(test_database_url: str) -> None:
+    """Тест что повторное закрытие пула не вызывает ошибок."""
+    db = Database(test_database_url, timeout=10)
+    await db.open()
+
+    await db.close()
+    await db.close()
+
+    assert db.pool.closed
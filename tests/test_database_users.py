@@ -1,9 +1,11 @@
 """Тесты для работы с пользователями в Database."""
 
 import os
+from collections.abc import AsyncIterator
 from datetime import datetime
 
 import pytest
+import pytest_asyncio
 
 from src.database import Database
 
@@ -14,11 +16,13 @@ pytestmark = pytest.mark.skipif(
 )
 
 
-@pytest.fixture
-def db() -> Database:
+@pytest_asyncio.fixture
+async def db() -> AsyncIterator[Database]:
     """Фикстура для создания экземпляра Database."""
     database_url = os.environ["DATABASE_URL"]
-    return Database(database_url, timeout=10)
+    database = Database(database_url, timeout=10)
+    yield database
+    await database.close()
 
 
 class TestUpsertUser:
@@ -296,4 +300,3 @@ class TestGetUserStats:
         assert stats["total_characters"] == 0
         assert stats["first_message_at"] is None
         assert stats["last_message_at"] is None
-
@@ -0,0 +1,121 @@
+"""Регрессионные тесты: запросы к БД не должны блокировать event loop.
+
+Таблица блокируется отдельным синхронным соединением, и операция ждет снятия
+блокировки. Неблокирующая реализация в это время отдает управление event loop:
+задача операции остается незавершенной, пока тест не снимет блокировку.
+Блокирующая реализация не отдает управление до конца операции, поэтому к
+моменту проверки задача уже завершена. Проверка не зависит от скорости машины.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable
+from unittest.mock import MagicMock
+
+import psycopg
+import pytest
+
+from src.chat_manager import ChatManager
+from src.database import Database
+from src.stats.real_collector import RealStatCollector
+
+# Максимальное время удержания блокировки: блокирующая реализация
+# завершается через это время и тест падает, а не зависает
+LOCK_TIMEOUT = 5.0
+
+
+def hold_table_lock(database_url: str, table: str) -> threading.Event:
+    """Захват эксклюзивной блокировки таблицы до сигнала или LOCK_TIMEOUT.
+
+    Блокировка удерживается отдельным синхронным соединением в фоновом потоке,
+    поэтому снимается независимо от состояния event loop.
+
+    Args:
+        database_url: URL тестовой БД
+        table: Имя таблицы
+
+    Returns:
+        Событие, установка которого снимает блокировку
+    """
+    locked = threading.Event()
+    release = threading.Event()
+
+    def worker() -> None:
+        with psycopg.connect(database_url) as conn:
+            conn.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+            locked.set()
+            release.wait(timeout=LOCK_TIMEOUT)
+            conn.rollback()
+
+    threading.Thread(target=worker, daemon=True).start()
+    locked.wait(timeout=5)
+    return release
+
+
+async def assert_yields_while_waiting(
+    operation: Awaitable[object], release: threading.Event
+) -> None:
+    """Проверка, что операция отдает управление event loop, ожидая блокировку.
+
+    Args:
+        operation: Корутина, которая ждет снятия блокировки таблицы
+        release: Событие, снимающее блокировку (см. hold_table_lock)
+    """
+    task = asyncio.ensure_future(operation)
+    try:
+        # Управление возвращается сюда, только если операция не блокирует loop
+        await asyncio.sleep(0.05)
+        assert not task.done(), "operation blocked the event loop until the lock was released"
+    finally:
+        release.set()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_get_history_does_not_block_event_loop(
+    database: Database, test_database_url: str
+) -> None:
+    """Тест что ожидание ответа PostgreSQL в get_history не блокирует loop."""
+    await database.open()
+    release = hold_table_lock(test_database_url, "messages")
+
+    await assert_yields_while_waiting(database.get_history(1, 1), release)
+
+
+@pytest.mark.asyncio
+async def test_upsert_user_does_not_block_event_loop(
+    database: Database, test_database_url: str
+) -> None:
+    """Тест что запись пользователя не блокирует loop во время ожидания блокировки."""
+    await database.open()
+    release = hold_table_lock(test_database_url, "users")
+
+    await assert_yields_while_waiting(
+        database.upsert_user(1, "user", "User", None, "en", False, False), release
+    )
+
+
+@pytest.mark.asyncio
+async def test_chat_manager_sql_does_not_block_event_loop(
+    database: Database, test_database_url: str
+) -> None:
+    """Тест что выполнение SQL в ChatManager не блокирует loop."""
+    await database.open()
+    chat_manager = ChatManager(database, MagicMock())
+    release = hold_table_lock(test_database_url, "messages")
+
+    await assert_yields_while_waiting(
+        chat_manager._execute_sql("SELECT COUNT(*) FROM messages"), release
+    )
+
+
+@pytest.mark.asyncio
+async def test_stat_collector_does_not_block_event_loop(
+    database: Database, test_database_url: str
+) -> None:
+    """Тест что сбор статистики не блокирует loop."""
+    await database.open()
+    collector = RealStatCollector(database)
+    release = hold_table_lock(test_database_url, "users")
+
+    await assert_yields_while_waiting(collector.get_dashboard_stats(), release)
@@ -1,5 +1,6 @@
 """Тесты для модуля handlers."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -7,9 +8,12 @@ from aiogram import types
 from openai import APIError, APITimeoutError
 
 from src.config import Config
+from src.context_builder import ContextBuilder
 from src.conversation import Conversation
 from src.handlers import MessageHandler
-from src.llm_client import LLMClient, LLMError
+from src.llm_client import LLMBusyError, LLMClient, LLMError
+from src.llm_response import LLMResponse
+from src.token_counter import TokenCounter
 
 
 @pytest.fixture
@@ -295,9 +299,11 @@ async def test_handle_message_timeout_error(message_handler, conversation):
     mock_bot.send_chat_action = AsyncMock()
     mock_message.bot = mock_bot
 
-    # Мокаем llm_client.get_response чтобы вызвать APITimeoutError
+    # Мокаем llm_client.get_completion чтобы вызвать APITimeoutError
     with patch.object(
-        message_handler.llm_client, "get_response", side_effect=APITimeoutError("Request timeout")
+        message_handler.llm_client,
+        "get_completion",
+        side_effect=APITimeoutError("Request timeout"),
     ):
         await message_handler.handle_message(mock_message)
 
@@ -336,8 +342,8 @@ async def test_handle_message_api_error(message_handler, conversation):
         message="API Error", request=MagicMock(), body={"error": {"message": "Rate limit exceeded"}}
     )
 
-    # Мокаем llm_client.get_response чтобы вызвать APIError
-    with patch.object(message_handler.llm_client, "get_response", side_effect=api_error):
+    # Мокаем llm_client.get_completion чтобы вызвать APIError
+    with patch.object(message_handler.llm_client, "get_completion", side_effect=api_error):
         await message_handler.handle_message(mock_message)
 
     # Проверяем что было отправлено сообщение об ошибке
@@ -369,9 +375,9 @@ async def test_handle_message_llm_error(message_handler, conversation):
     mock_bot.send_chat_action = AsyncMock()
     mock_message.bot = mock_bot
 
-    # Мокаем llm_client.get_response чтобы вызвать LLMError
+    # Мокаем llm_client.get_completion чтобы вызвать LLMError
     with patch.object(
-        message_handler.llm_client, "get_response", side_effect=LLMError("Empty response")
+        message_handler.llm_client, "get_completion", side_effect=LLMError("Empty response")
     ):
         await message_handler.handle_message(mock_message)
 
@@ -404,9 +410,11 @@ async def test_handle_message_unexpected_error(message_handler, conversation):
     mock_bot.send_chat_action = AsyncMock()
     mock_message.bot = mock_bot
 
-    # Мокаем llm_client.get_response чтобы вызвать неожиданную ошибку
+    # Мокаем llm_client.get_completion чтобы вызвать неожиданную ошибку
     with patch.object(
-        message_handler.llm_client, "get_response", side_effect=ValueError("Unexpected error")
+        message_handler.llm_client,
+        "get_completion",
+        side_effect=ValueError("Unexpected error"),
     ):
         await message_handler.handle_message(mock_message)
 
@@ -439,9 +447,11 @@ async def test_handle_message_success(message_handler, conversation):
     mock_bot.send_chat_action = AsyncMock()
     mock_message.bot = mock_bot
 
-    # Мокаем llm_client.get_response чтобы вернуть успешный ответ
+    # Мокаем llm_client.get_completion чтобы вернуть успешный ответ
     with patch.object(
-        message_handler.llm_client, "get_response", return_value="Hello! How can I help you?"
+        message_handler.llm_client,
+        "get_completion",
+        return_value=LLMResponse("Hello! How can I help you?"),
     ):
         await message_handler.handle_message(mock_message)
 
@@ -460,6 +470,219 @@ async def test_handle_message_success(message_handler, conversation):
     assert history[1]["content"] == "Hello! How can I help you?"
 
 
+@pytest.mark.asyncio
+async def test_handle_message_stores_token_usage(config, llm_client, database):
+    """Тест что токены запроса пользователя и usage ответа сохраняются в БД."""
+    conversation = Conversation(database, token_counter=TokenCounter(encoding_name=None))
+    message_handler = MessageHandler(config, llm_client, conversation, database)
+
+    mock_message = MagicMock(spec=types.Message)
+    mock_message.from_user = MagicMock(spec=types.User)
+    mock_message.from_user.id = 123
+    mock_message.from_user.username = "testuser123"
+    mock_message.from_user.first_name = "Test"
+    mock_message.from_user.last_name = "User"
+    mock_message.from_user.language_code = "en"
+    mock_message.from_user.is_premium = False
+    mock_message.from_user.is_bot = False
+    mock_message.chat = MagicMock(spec=types.Chat)
+    mock_message.chat.id = 456
+    mock_message.text = "Hello!"
+    mock_message.answer = AsyncMock()
+    mock_message.bot = None
+
+    with patch.object(
+        message_handler.llm_client,
+        "get_completion",
+        return_value=LLMResponse("Hi there", prompt_tokens=50, completion_tokens=3),
+    ):
+        await message_handler.handle_message(mock_message)
+
+    stats = await database.get_user_stats(123)
+    assert stats["prompt_tokens"] == 50
+    assert stats["completion_tokens"] == 3
+    assert stats["total_tokens"] == 2 + 3  # "Hello!" по оценке (6 символов / 3) + ответ
+
+
+def make_text_message(user_id: int = 123, chat_id: int = 456, text: str = "Hello") -> MagicMock:
+    """Мок текстового сообщения пользователя."""
+    mock_message = MagicMock(spec=types.Message)
+    mock_message.from_user = MagicMock(spec=types.User)
+    mock_message.from_user.id = user_id
+    mock_message.from_user.username = f"testuser{user_id}"
+    mock_message.from_user.first_name = "Test"
+    mock_message.from_user.last_name = "User"
+    mock_message.from_user.language_code = "en"
+    mock_message.from_user.is_premium = False
+    mock_message.from_user.is_bot = False
+    mock_message.chat = MagicMock(spec=types.Chat)
+    mock_message.chat.id = chat_id
+    mock_message.text = text
+    mock_message.bot = None
+    return mock_message
+
+
+def fake_stream(*chunks: LLMResponse, error: Exception | None = None):
+    """Фабрика подмены LLMClient.stream_response, отдающей заданные фрагменты."""
+
+    async def stream_response(messages, system_prompt=None, user_key=None):
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    return stream_response
+
+
+@pytest.fixture
+def streaming_handler(llm_client, conversation, database):
+    """Фикстура MessageHandler в режиме потоковой генерации без задержки между правками."""
+    streaming_config = Config(
+        telegram_bot_token="test_bot_token_123",
+        openrouter_api_key="test_api_key_456",
+        openrouter_model="test/model",
+        system_prompt="You are a test assistant",
+        llm_streaming=True,
+        llm_stream_edit_interval=0,
+    )
+    return MessageHandler(streaming_config, llm_client, conversation, database)
+
+
+@pytest.mark.asyncio
+async def test_handle_message_streaming_edits_placeholder(streaming_handler, conversation):
+    """Тест что потоковый ответ показывается правками сообщения-заглушки."""
+    mock_message = make_text_message()
+    placeholder = MagicMock(spec=types.Message)
+    placeholder.edit_text = AsyncMock()
+    mock_message.answer = AsyncMock(return_value=placeholder)
+
+    stream = fake_stream(
+        LLMResponse("Hello"),
+        LLMResponse(", world"),
+        LLMResponse("", prompt_tokens=20, completion_tokens=3),
+    )
+    with patch.object(streaming_handler.llm_client, "stream_response", stream):
+        await streaming_handler.handle_message(mock_message)
+
+    mock_message.answer.assert_called_once()
+    edits = [call.args[0] for call in placeholder.edit_text.call_args_list]
+    assert edits == ["Hello", "Hello, world", "Hello, world"]
+
+    history = await conversation.get_history(456, 123)
+    assert history[-1] == {"role": "assistant", "content": "Hello, world"}
+    stats = await conversation.db.get_user_stats(123)
+    assert stats["prompt_tokens"] == 20
+    assert stats["completion_tokens"] == 3
+
+
+@pytest.mark.asyncio
+async def test_handle_message_streaming_throttles_edits(streaming_handler):
+    """Тест что промежуточные правки не чаще llm_stream_edit_interval."""
+    streaming_handler.config.llm_stream_edit_interval = 60
+    mock_message = make_text_message()
+    placeholder = MagicMock(spec=types.Message)
+    placeholder.edit_text = AsyncMock()
+    mock_message.answer = AsyncMock(return_value=placeholder)
+
+    stream = fake_stream(*(LLMResponse(f"{i} ") for i in range(10)))
+    with patch.object(streaming_handler.llm_client, "stream_response", stream):
+        await streaming_handler.handle_message(mock_message)
+
+    edits = [call.args[0] for call in placeholder.edit_text.call_args_list]
+    assert edits == ["0 ", "".join(f"{i} " for i in range(10))]
+
+
+@pytest.mark.asyncio
+async def test_handle_message_streaming_error_removes_placeholder(streaming_handler):
+    """Тест что при ошибке посреди генерации заглушка удаляется и отправляется ошибка."""
+    mock_message = make_text_message()
+    placeholder = MagicMock(spec=types.Message)
+    placeholder.edit_text = AsyncMock()
+    placeholder.delete = AsyncMock()
+    mock_message.answer = AsyncMock(return_value=placeholder)
+
+    stream = fake_stream(LLMResponse("Part"), error=LLMError("Stream broken"))
+    with patch.object(streaming_handler.llm_client, "stream_response", stream):
+        await streaming_handler.handle_message(mock_message)
+
+    placeholder.delete.assert_called_once()
+    error_text = mock_message.answer.call_args_list[-1].args[0]
+    assert "Stream broken" in error_text
+
+
+@pytest.mark.asyncio
+async def test_handle_message_applies_token_budget(config, llm_client, conversation, database):
+    """Тест что в LLM отправляются только сообщения, помещающиеся в бюджет токенов."""
+    context_builder = ContextBuilder(TokenCounter(encoding_name=None), token_budget=100)
+    message_handler = MessageHandler(config, llm_client, conversation, database, context_builder)
+    await database.upsert_user(123, "testuser123", "Test", "User", "en", False, False)
+    await conversation.add_message(456, 123, "user", "def f():\n    pass\n" * 200)
+    await conversation.add_message(456, 123, "assistant", "Looks fine")
+
+    mock_message = MagicMock(spec=types.Message)
+    mock_message.from_user = MagicMock(spec=types.User)
+    mock_message.from_user.id = 123
+    mock_message.from_user.username = "testuser123"
+    mock_message.from_user.first_name = "Test"
+    mock_message.from_user.last_name = "User"
+    mock_message.from_user.language_code = "en"
+    mock_message.from_user.is_premium = False
+    mock_message.from_user.is_bot = False
+    mock_message.chat = MagicMock(spec=types.Chat)
+    mock_message.chat.id = 456
+    mock_message.text = "Thanks!"
+    mock_message.answer = AsyncMock()
+    mock_message.bot = None
+
+    with patch.object(
+        message_handler.llm_client, "get_completion", return_value=LLMResponse("You're welcome")
+    ) as llm:
+        await message_handler.handle_message(mock_message)
+
+    assert llm.call_args.kwargs["messages"] == [
+        {"role": "assistant", "content": "Looks fine"},
+        {"role": "user", "content": "Thanks!"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_not_limited_by_history_length(
+    config, llm_client, conversation, database
+):
+    """Тест что с бюджетом токенов короткие реплики не обрезаются по max_history_length."""
+    config.max_history_length = 4
+    context_builder = ContextBuilder(TokenCounter(encoding_name=None), token_budget=10_000)
+    message_handler = MessageHandler(config, llm_client, conversation, database, context_builder)
+    await database.upsert_user(123, "testuser123", "Test", "User", "en", False, False)
+    for i in range(10):
+        await conversation.add_message(456, 123, "user", f"Question {i}")
+        await conversation.add_message(456, 123, "assistant", f"Answer {i}")
+
+    mock_message = MagicMock(spec=types.Message)
+    mock_message.from_user = MagicMock(spec=types.User)
+    mock_message.from_user.id = 123
+    mock_message.from_user.username = "testuser123"
+    mock_message.from_user.first_name = "Test"
+    mock_message.from_user.last_name = "User"
+    mock_message.from_user.language_code = "en"
+    mock_message.from_user.is_premium = False
+    mock_message.from_user.is_bot = False
+    mock_message.chat = MagicMock(spec=types.Chat)
+    mock_message.chat.id = 456
+    mock_message.text = "Thanks!"
+    mock_message.answer = AsyncMock()
+    mock_message.bot = None
+
+    with patch.object(
+        message_handler.llm_client, "get_completion", return_value=LLMResponse("You're welcome")
+    ) as llm:
+        await message_handler.handle_message(mock_message)
+
+    sent = llm.call_args.kwargs["messages"]
+    assert len(sent) == 21
+    assert sent[0] == {"role": "user", "content": "Question 0"}
+
+
 @pytest.mark.asyncio
 async def test_reset_command_without_user(message_handler):
     """Тест reset команды без пользователя."""
@@ -685,7 +908,7 @@ async def test_user_auto_save_on_message(message_handler, database):
 
     # Мокаем LLM ответ
     with patch.object(
-        message_handler.llm_client, "get_response", return_value="Test response"
+        message_handler.llm_client, "get_completion", return_value=LLMResponse("Test response")
     ):
         await message_handler.handle_message(mock_message)
 
@@ -699,3 +922,109 @@ async def test_user_auto_save_on_message(message_handler, database):
     assert user["language_code"] == "de"
     assert user["is_premium"] is False
     assert user["is_bot"] is False
+
+
+@pytest.mark.asyncio
+async def test_handle_message_llm_busy(message_handler, conversation):
+    """Тест что при превышении лимита запросов к LLM пользователь сразу получает ответ "занято"."""
+    mock_message = make_text_message(user_id=777, chat_id=778)
+    mock_message.answer = AsyncMock()
+
+    with patch.object(
+        message_handler.llm_client,
+        "get_completion",
+        side_effect=LLMBusyError("Too many concurrent LLM requests (queue_full)"),
+    ) as get_completion:
+        await message_handler.handle_message(mock_message)
+
+    assert get_completion.call_args.kwargs["user_key"] == 777
+    mock_message.answer.assert_called_once()
+    assert "много запросов" in mock_message.answer.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_handle_message_same_chat_processed_in_order(message_handler):
+    """Тест что второе сообщение диалога отправляется в LLM с ответом на первое в истории."""
+    first = make_text_message(user_id=321, chat_id=654, text="First")
+    second = make_text_message(user_id=321, chat_id=654, text="Second")
+    first.answer = AsyncMock()
+    second.answer = AsyncMock()
+    histories: list[list[dict[str, str]]] = []
+
+    async def get_completion(messages, **kwargs):
+        histories.append(list(messages))
+        await asyncio.sleep(0.05)
+        return LLMResponse(f"Answer {len(histories)}")
+
+    with patch.object(message_handler.llm_client, "get_completion", side_effect=get_completion):
+        await asyncio.gather(
+            message_handler.handle_message(first), message_handler.handle_message(second)
+        )
+
+    assert [message["content"] for message in histories[1]] == ["First", "Answer 1", "Second"]
+    assert message_handler.serializer.stats()["contended"] == 1
+    assert message_handler.serializer.active_keys == 0
+
+
+@pytest.mark.asyncio
+async def test_handle_message_coalesces_burst(config, llm_client, conversation, database):
+    """Тест что серия сообщений сохраняется по отдельности и получает один ответ."""
+    config.chat_coalesce_window_ms = 50
+    message_handler = MessageHandler(config, llm_client, conversation, database)
+    fragments = [make_text_message(user_id=432, chat_id=765, text=f"part {i}") for i in range(3)]
+    for fragment in fragments:
+        fragment.answer = AsyncMock()
+
+    async def send(index: int) -> None:
+        await asyncio.sleep(index * 0.01)
+        await message_handler.handle_message(fragments[index])
+
+    with patch.object(
+        message_handler.llm_client, "get_completion", return_value=LLMResponse("Reviewed")
+    ) as llm:
+        await asyncio.gather(*(send(i) for i in range(3)))
+
+    llm.assert_called_once()
+    sent = [message["content"] for message in llm.call_args.kwargs["messages"]]
+    assert sent == ["part 0", "part 1", "part 2"]
+    fragments[0].answer.assert_not_called()
+    fragments[2].answer.assert_called_once_with("Reviewed")
+
+    history = await conversation.get_history(765, 432)
+    assert [message["content"] for message in history] == [
+        "part 0",
+        "part 1",
+        "part 2",
+        "Reviewed",
+    ]
+    assert message_handler.coalescer is not None
+    assert message_handler.coalescer.stats()["merged"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reset_answers_pending_burst_before_clearing(
+    config, llm_client, conversation, database
+):
+    """Тест что /reset во время окна объединения выполняется после ответа на серию."""
+    config.chat_coalesce_window_ms = 200
+    message_handler = MessageHandler(config, llm_client, conversation, database)
+    fragments = [make_text_message(user_id=432, chat_id=765, text=f"part {i}") for i in range(2)]
+    reset = make_text_message(user_id=432, chat_id=765, text="/reset")
+    for message in [*fragments, reset]:
+        message.answer = AsyncMock()
+
+    with patch.object(
+        message_handler.llm_client, "get_completion", return_value=LLMResponse("Reviewed")
+    ) as llm:
+        pending = [
+            asyncio.create_task(message_handler.handle_message(fragment)) for fragment in fragments
+        ]
+        await asyncio.sleep(0)
+        await message_handler.reset_command(reset)
+        await asyncio.gather(*pending)
+
+    llm.assert_called_once()
+    sent = [message["content"] for message in llm.call_args.kwargs["messages"]]
+    assert sent == ["part 0", "part 1"]
+    fragments[1].answer.assert_called_once_with("Reviewed")
+    assert await conversation.get_history(765, 432) == []
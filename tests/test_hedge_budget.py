@@ -0,0 +1,37 @@
+"""Тесты для HedgeBudget."""
+
+from src.hedge_budget import HedgeBudget
+
+
+def test_budget_limits_hedge_rate() -> None:
+    """Тест что дополнительных запросов не больше доли ratio."""
+    budget = HedgeBudget(0.05)
+    hedged = 0
+    for _ in range(200):
+        budget.record_request()
+        if budget.try_acquire():
+            hedged += 1
+
+    assert hedged == 10
+    assert budget.stats()["fired"] == 10
+    assert budget.stats()["denied"] == 190
+    assert budget.stats()["hedge_rate"] == 0.05
+
+
+def test_tokens_capped() -> None:
+    """Тест что запас токенов не превышает max_tokens."""
+    budget = HedgeBudget(0.5, max_tokens=2)
+    for _ in range(100):
+        budget.record_request()
+
+    assert [budget.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_record_win() -> None:
+    """Тест счетчика выигравших hedged-запросов."""
+    budget = HedgeBudget(1.0)
+    budget.record_request()
+    assert budget.try_acquire()
+    budget.record_win()
+
+    assert budget.stats()["won"] == 1
@@ -0,0 +1,146 @@
+"""Тесты для кеша окон истории HistoryCache."""
+
+import time
+from unittest.mock import patch
+
+from src.history_cache import HistoryCache
+
+
+def make_cache(
+    window: int = 3, max_entries: int = 10, max_chars: int = 1000, ttl: float = 60.0
+) -> HistoryCache:
+    """Создание кеша с параметрами по умолчанию для тестов."""
+    return HistoryCache(window=window, max_entries=max_entries, max_chars=max_chars, ttl=ttl)
+
+
+def msg(content: str, role: str = "user") -> dict[str, str]:
+    """Сообщение в формате OpenAI API."""
+    return {"role": role, "content": content}
+
+
+def test_get_missing_key_is_miss():
+    """Тест промаха для отсутствующего диалога."""
+    cache = make_cache()
+
+    assert cache.get((1, 2)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_put_and_get_returns_copy():
+    """Тест попадания и что кеш возвращает копию истории."""
+    cache = make_cache()
+    cache.put((1, 2), [msg("a"), msg("b", "assistant")])
+
+    history = cache.get((1, 2))
+    assert history == [msg("a"), msg("b", "assistant")]
+    assert cache.stats()["hits"] == 1
+
+    history.append(msg("c"))
+    assert cache.get((1, 2)) == [msg("a"), msg("b", "assistant")]
+
+
+def test_get_applies_limit():
+    """Тест что лимит возвращает последние сообщения (как Database.get_history)."""
+    cache = make_cache()
+    cache.put((1, 2), [msg("a"), msg("b"), msg("c")])
+
+    assert cache.get((1, 2), limit=2) == [msg("b"), msg("c")]
+
+
+def test_history_longer_than_window_keeps_last_messages():
+    """Тест что от истории длиннее окна кешируются только последние сообщения."""
+    cache = make_cache(window=2)
+    cache.put((1, 2), [msg("a"), msg("b"), msg("c")])
+
+    assert cache.get((1, 2)) is None
+    assert cache.get((1, 2), limit=2) == [msg("b"), msg("c")]
+    assert cache.get((1, 2), limit=3) is None
+
+
+def test_incomplete_history_serves_only_limited_reads():
+    """Тест что неполная история отвечает только на запросы в пределах окна."""
+    cache = make_cache()
+    cache.put((1, 2), [msg("b"), msg("c")], complete=False)
+
+    assert cache.get((1, 2)) is None
+    assert cache.get((1, 2), limit=3) is None
+    assert cache.get((1, 2), limit=1) == [msg("c")]
+
+
+def test_append_updates_cached_window():
+    """Тест что append дополняет закешированное окно."""
+    cache = make_cache()
+    cache.put((1, 2), [msg("a")])
+
+    cache.append((1, 2), "assistant", "b")
+
+    assert cache.get((1, 2)) == [msg("a"), msg("b", "assistant")]
+
+
+def test_append_without_entry_is_ignored():
+    """Тест что append не создает запись для незакешированного диалога."""
+    cache = make_cache()
+
+    cache.append((1, 2), "user", "a")
+
+    assert cache.get((1, 2)) is None
+
+
+def test_window_overflow_makes_entry_incomplete():
+    """Тест что после переполнения окна кеш не отвечает за полную историю."""
+    cache = make_cache(window=2)
+    cache.put((1, 2), [msg("a"), msg("b")])
+
+    cache.append((1, 2), "user", "c")
+
+    assert cache.get((1, 2)) is None
+    assert cache.get((1, 2), limit=2) == [msg("b"), msg("c")]
+    assert cache.stats()["chars"] == 2
+
+
+def test_invalidate_drops_entry():
+    """Тест что invalidate удаляет диалог из кеша."""
+    cache = make_cache()
+    cache.put((1, 2), [msg("a")])
+
+    cache.invalidate((1, 2))
+
+    assert cache.get((1, 2)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entries():
+    """Тест вытеснения давно неиспользуемого диалога при превышении max_entries."""
+    cache = make_cache(max_entries=2)
+    cache.put((1, 1), [msg("a")])
+    cache.put((2, 2), [msg("b")])
+    cache.get((1, 1))  # (1, 1) становится самым свежим
+
+    cache.put((3, 3), [msg("c")])
+
+    assert cache.get((2, 2)) is None
+    assert cache.get((1, 1)) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_memory_cap():
+    """Тест вытеснения при превышении суммарного объема текста."""
+    cache = make_cache(max_chars=10)
+    cache.put((1, 1), [msg("x" * 6)])
+
+    cache.put((2, 2), [msg("y" * 6)])
+
+    assert cache.get((1, 1)) is None
+    assert cache.get((2, 2)) is not None
+    assert cache.stats()["chars"] == 6
+
+
+def test_entry_expires_after_ttl():
+    """Тест что запись устаревает через ttl."""
+    cache = make_cache(ttl=10.0)
+    cache.put((1, 2), [msg("a")])
+
+    with patch("src.history_cache.time.monotonic", return_value=time.monotonic() + 11):
+        assert cache.get((1, 2)) is None
+
+    assert cache.stats()["entries"] == 0
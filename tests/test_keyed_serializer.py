@@ -0,0 +1,98 @@
+"""Тесты для KeyedSerializer."""
+
+import asyncio
+
+import pytest
+
+from src.keyed_serializer import KeyedSerializer
+
+
+@pytest.mark.asyncio
+async def test_same_key_runs_in_order() -> None:
+    """Тест что задачи с одним ключом выполняются по очереди в порядке прихода."""
+    serializer = KeyedSerializer()
+    events: list[str] = []
+
+    async def task(name: str, delay: float) -> None:
+        async with serializer.hold("chat"):
+            events.append(f"{name} start")
+            await asyncio.sleep(delay)
+            events.append(f"{name} end")
+
+    await asyncio.gather(task("first", 0.02), task("second", 0), task("third", 0))
+
+    assert events == [
+        "first start",
+        "first end",
+        "second start",
+        "second end",
+        "third start",
+        "third end",
+    ]
+    assert serializer.stats()["contended"] == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_in_parallel() -> None:
+    """Тест что задачи с разными ключами не ждут друг друга."""
+    serializer = KeyedSerializer()
+    both_started = asyncio.Event()
+    started = 0
+
+    async def task(key: int) -> None:
+        nonlocal started
+        async with serializer.hold(key):
+            started += 1
+            if started == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), 1)
+
+    await asyncio.gather(task(1), task(2))
+
+    assert serializer.stats()["max_active_keys"] == 2
+    assert serializer.stats()["contended"] == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_key_evicted() -> None:
+    """Тест что ключ без задач удаляется, в том числе после ошибки."""
+    serializer = KeyedSerializer()
+
+    async with serializer.hold("chat"):
+        assert serializer.active_keys == 1
+    assert serializer.active_keys == 0
+
+    with pytest.raises(RuntimeError):
+        async with serializer.hold("chat"):
+            raise RuntimeError("handler failed")
+    assert serializer.active_keys == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_key() -> None:
+    """Тест что отмена ожидающей задачи не блокирует очередь и не оставляет ключ."""
+    serializer = KeyedSerializer()
+    release = asyncio.Event()
+
+    async def holder() -> None:
+        async with serializer.hold("chat"):
+            await release.wait()
+
+    async def waiter() -> None:
+        async with serializer.hold("chat"):
+            pass
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    second = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    second.cancel()
+    release.set()
+    await first
+    with pytest.raises(asyncio.CancelledError):
+        await second
+
+    assert serializer.active_keys == 0
+    stats = serializer.stats()
+    assert stats["acquired"] == 1
+    assert stats["max_wait_ms"] >= 0
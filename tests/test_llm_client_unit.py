@@ -1,12 +1,15 @@
 """Юнит-тесты для модуля llm_client."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
-from openai import APIError, APITimeoutError
+from openai import APIError, APIStatusError, APITimeoutError
 
 from src.config import Config
-from src.llm_client import LLMClient, LLMError
+from src.llm_client import CircuitOpenError, LLMBusyError, LLMClient, LLMError
+from src.llm_response import LLMResponse
 
 
 @pytest.fixture
@@ -20,6 +23,8 @@ def config():
         temperature=0.7,
         max_tokens=100,
         timeout=30,
+        # Без случайного исследования порядок моделей детерминирован
+        llm_router_explore_rate=0.0,
     )
 
 
@@ -35,6 +40,57 @@ def test_llm_client_initialization(llm_client, config):
     assert llm_client.client is not None
 
 
+def test_llm_client_uses_tuned_http_client(llm_client, config):
+    """Тест что OpenAI SDK использует HTTP клиент с таймаутами из конфигурации."""
+    assert llm_client.client._client is llm_client.http_client
+    assert llm_client.http_client.timeout.connect == config.llm_http_connect_timeout
+    assert llm_client.http_client.timeout.read == config.timeout
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_not_closed(config):
+    """Тест что переданный общий HTTP клиент закрывает его владелец, а не LLMClient."""
+    http_client = httpx.AsyncClient()
+    llm_client = LLMClient(config, http_client=http_client)
+
+    await llm_client.close()
+
+    assert not http_client.is_closed
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connection(config):
+    """Тест что прогрев отправляет запросы к API до первого вызова LLM."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(404)
+
+    config.llm_http_warmup_connections = 2
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    llm_client = LLMClient(config, http_client=http_client)
+
+    await llm_client.warm_up()
+
+    assert [request.method for request in requests] == ["HEAD", "HEAD"]
+    assert str(requests[0].url).startswith(config.openrouter_base_url)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_is_not_raised(config):
+    """Тест что ошибка прогрева только логируется."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("Connection refused")
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    llm_client = LLMClient(config, http_client=http_client)
+
+    await llm_client.warm_up()
+
+
 @pytest.mark.asyncio
 async def test_get_response_success(llm_client):
     """Тест успешного получения ответа от LLM."""
@@ -198,7 +254,8 @@ async def test_get_response_uses_config_parameters(llm_client, config):
         assert call_args[1]["model"] == config.openrouter_model
         assert call_args[1]["temperature"] == config.temperature
         assert call_args[1]["max_tokens"] == config.max_tokens
-        assert call_args[1]["timeout"] == config.timeout
+        assert call_args[1]["timeout"].read == config.timeout
+        assert call_args[1]["timeout"].connect == config.llm_http_connect_timeout
 
 
 @pytest.mark.asyncio
@@ -227,6 +284,450 @@ async def test_get_response_with_multiple_messages(llm_client):
         assert len(sent_messages) == 4  # system + 3 messages
 
 
+@pytest.mark.asyncio
+async def test_get_completion_returns_usage(llm_client):
+    """Тест что get_completion возвращает расход токенов из ответа API."""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Response"
+    mock_response.usage.prompt_tokens = 42
+    mock_response.usage.completion_tokens = 7
+
+    with patch.object(
+        llm_client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        return_value=mock_response,
+    ):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response == LLMResponse("Response", prompt_tokens=42, completion_tokens=7)
+
+
+@pytest.mark.asyncio
+async def test_get_completion_without_usage(llm_client):
+    """Тест ответа провайдера без usage."""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Response"
+    mock_response.usage = None
+
+    with patch.object(
+        llm_client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        return_value=mock_response,
+    ):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response == LLMResponse("Response")
+
+
+class FakeStream:
+    """Поток чанков, имитирующий AsyncStream из openai SDK."""
+
+    def __init__(self, chunks: list[MagicMock]) -> None:
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def make_chunk(content: str | None = None, usage: tuple[int, int] | None = None) -> MagicMock:
+    """Чанк потокового ответа с приращением текста и/или usage."""
+    chunk = MagicMock()
+    if content is None:
+        chunk.choices = []
+    else:
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = content
+    if usage is None:
+        chunk.usage = None
+    else:
+        chunk.usage.prompt_tokens, chunk.usage.completion_tokens = usage
+    return chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_chunks_and_usage(llm_client):
+    """Тест что stream_response отдает фрагменты текста и usage в конце."""
+    stream = FakeStream([make_chunk("Hel"), make_chunk("lo"), make_chunk(usage=(12, 2))])
+
+    with patch.object(
+        llm_client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        return_value=stream,
+    ) as mock_create:
+        chunks = [
+            chunk async for chunk in llm_client.stream_response([{"role": "user", "content": "Hi"}])
+        ]
+
+    assert chunks == [
+        LLMResponse("Hel"),
+        LLMResponse("lo"),
+        LLMResponse("", prompt_tokens=12, completion_tokens=2),
+    ]
+    assert mock_create.call_args.kwargs["stream"] is True
+    assert stream.closed
+
+
+@pytest.mark.asyncio
+async def test_stream_response_empty_raises_llm_error(llm_client):
+    """Тест что пустой потоковый ответ приводит к LLMError."""
+    stream = FakeStream([make_chunk(""), make_chunk(usage=(5, 0))])
+
+    with (
+        patch.object(
+            llm_client.client.chat.completions,
+            "create",
+            new_callable=AsyncMock,
+            return_value=stream,
+        ),
+        pytest.raises(LLMError, match="Empty response"),
+    ):
+        async for _ in llm_client.stream_response([{"role": "user", "content": "Hi"}]):
+            pass
+
+
+def make_status_error(status_code: int, headers: dict[str, str] | None = None) -> APIStatusError:
+    """Создание ошибки API с кодом ответа и заголовками."""
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return APIStatusError(f"Error {status_code}", response=response, body=None)
+
+
+def make_completion(content: str) -> MagicMock:
+    """Создание ответа chat.completions.create с заданным текстом."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.usage = None
+    return response
+
+
+@pytest.mark.asyncio
+async def test_get_completion_retries_server_errors(llm_client):
+    """Тест что 5xx повторяется с задержкой и затем возвращается ответ."""
+    create = AsyncMock(side_effect=[make_status_error(503), make_completion("ok")])
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        patch("src.llm_client.asyncio.sleep", new_callable=AsyncMock) as sleep,
+    ):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "ok"
+    assert create.await_count == 2
+    assert sleep.await_count == 1
+    assert 0 <= sleep.await_args.args[0] <= llm_client.config.llm_retry_base_delay
+    assert llm_client.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_get_completion_honors_retry_after(llm_client):
+    """Тест что задержка перед повтором не меньше Retry-After."""
+    create = AsyncMock(
+        side_effect=[make_status_error(429, {"retry-after": "3"}), make_completion("ok")]
+    )
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        patch("src.llm_client.asyncio.sleep", new_callable=AsyncMock) as sleep,
+    ):
+        await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    sleep.assert_awaited_once_with(3.0)
+
+
+@pytest.mark.asyncio
+async def test_get_completion_gives_up_on_long_retry_after(llm_client):
+    """Тест что Retry-After больше llm_retry_max_delay не ожидается."""
+    create = AsyncMock(side_effect=make_status_error(429, {"retry-after": "120"}))
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        patch("src.llm_client.asyncio.sleep", new_callable=AsyncMock) as sleep,
+        pytest.raises(APIStatusError),
+    ):
+        await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert create.await_count == 1
+    sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_completion_does_not_retry_client_errors(llm_client):
+    """Тест что 4xx (кроме 408/409/429) не повторяется."""
+    create = AsyncMock(side_effect=make_status_error(400))
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        pytest.raises(APIStatusError),
+    ):
+        await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert create.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast(config):
+    """Тест что после серии сбоев запросы отклоняются без обращения к API."""
+    config.llm_max_retries = 0
+    config.llm_circuit_failure_threshold = 2
+    llm_client = LLMClient(config)
+    create = AsyncMock(side_effect=make_status_error(502))
+    messages = [{"role": "user", "content": "Test"}]
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        for _ in range(2):
+            with pytest.raises(APIStatusError):
+                await llm_client.get_completion(messages)
+
+        with pytest.raises(CircuitOpenError):
+            await llm_client.get_completion(messages)
+
+    assert create.await_count == 2
+    assert issubclass(CircuitOpenError, LLMError)
+
+
+@pytest.mark.asyncio
+async def test_get_completion_falls_back_on_rate_limit(config):
+    """Тест что при 429 запрос сразу уходит резервной модели со своим таймаутом."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.openrouter_model_timeouts = {"backup/model": 5}
+    llm_client = LLMClient(config)
+    create = AsyncMock(side_effect=[make_status_error(429), make_completion("ok")])
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        patch("src.llm_client.asyncio.sleep", new_callable=AsyncMock) as sleep,
+    ):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "ok"
+    assert [call.kwargs["model"] for call in create.await_args_list] == [
+        "test/model",
+        "backup/model",
+    ]
+    assert [call.kwargs["timeout"].read for call in create.await_args_list] == [30, 5]
+    sleep.assert_not_awaited()
+
+    stats = llm_client.get_model_stats()
+    assert stats["test/model"]["failures"] == 1
+    assert stats["backup/model"]["successes"] == 1
+    assert stats["backup/model"]["circuit"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_get_completion_falls_back_on_timeout(config):
+    """Тест перехода на резервную модель при таймауте основной."""
+    config.openrouter_fallback_models = ["backup/model"]
+    llm_client = LLMClient(config)
+    create = AsyncMock(side_effect=[APITimeoutError(request=MagicMock()), make_completion("ok")])
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "ok"
+    assert create.await_args_list[1].kwargs["model"] == "backup/model"
+
+
+@pytest.mark.asyncio
+async def test_get_completion_skips_model_with_open_circuit(config):
+    """Тест что модель с разомкнутым circuit breaker пробуется последней."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.llm_circuit_failure_threshold = 1
+    llm_client = LLMClient(config)
+    llm_client._get_breaker("test/model").record_failure()
+    create = AsyncMock(return_value=make_completion("ok"))
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    create.assert_awaited_once()
+    assert create.await_args.kwargs["model"] == "backup/model"
+
+
+@pytest.mark.asyncio
+async def test_get_completion_client_error_does_not_fall_back(config):
+    """Тест что ошибка запроса (400) не переводит запрос на резервную модель."""
+    config.openrouter_fallback_models = ["backup/model"]
+    llm_client = LLMClient(config)
+    create = AsyncMock(side_effect=make_status_error(400))
+
+    with (
+        patch.object(llm_client.client.chat.completions, "create", create),
+        pytest.raises(APIStatusError),
+    ):
+        await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert create.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_and_cancels_primary(config):
+    """Тест что при медленном ответе hedged-запрос к резервной модели побеждает."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.llm_hedge_budget = 1.0
+    config.llm_hedge_default_delay = 0.01
+    llm_client = LLMClient(config)
+    cancelled = asyncio.Event()
+
+    async def create(**kwargs):
+        if kwargs["model"] == "test/model":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return make_completion(kwargs["model"])
+
+    with patch.object(llm_client.client.chat.completions, "create", side_effect=create):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "backup/model"
+    assert cancelled.is_set()
+    assert llm_client.hedge_budget is not None
+    assert llm_client.hedge_budget.stats()["fired"] == 1
+    assert llm_client.hedge_budget.stats()["won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_not_fired_without_budget(config):
+    """Тест что без токенов бюджета hedged-запрос не отправляется."""
+    config.llm_hedge_budget = 0.05
+    config.llm_hedge_default_delay = 0.01
+    llm_client = LLMClient(config)
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.05)
+        return make_completion("ok")
+
+    create_mock = AsyncMock(side_effect=create)
+    with patch.object(llm_client.client.chat.completions, "create", create_mock):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "ok"
+    assert create_mock.await_count == 1
+    assert llm_client.hedge_budget is not None
+    assert llm_client.hedge_budget.stats()["denied"] == 1
+
+
+@pytest.mark.asyncio
+async def test_primary_does_not_fall_back_to_hedged_model(config):
+    """Тест что основной запрос не переходит на модель, занятую hedged-запросом."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.llm_hedge_budget = 1.0
+    config.llm_hedge_default_delay = 0.01
+    llm_client = LLMClient(config)
+    primary_failed = asyncio.Event()
+
+    async def create(**kwargs):
+        if kwargs["model"] == "test/model":
+            await asyncio.sleep(0.05)
+            primary_failed.set()
+            raise APITimeoutError(request=MagicMock())
+        await primary_failed.wait()
+        return make_completion(kwargs["model"])
+
+    create_mock = AsyncMock(side_effect=create)
+    with patch.object(llm_client.client.chat.completions, "create", create_mock):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "backup/model"
+    assert [call.kwargs["model"] for call in create_mock.await_args_list] == [
+        "test/model",
+        "backup/model",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_needs_free_admission_slot(config):
+    """Тест что hedged-запрос не отправляется без свободного слота лимита."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.llm_hedge_budget = 1.0
+    config.llm_hedge_default_delay = 0.01
+    config.llm_max_concurrent = 1
+    llm_client = LLMClient(config)
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.05)
+        return make_completion(kwargs["model"])
+
+    create_mock = AsyncMock(side_effect=create)
+    with patch.object(llm_client.client.chat.completions, "create", create_mock):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "test/model"
+    assert create_mock.await_count == 1
+    assert llm_client.admission is not None
+    assert llm_client.admission.stats()["in_flight"] == 0
+    assert llm_client.hedge_budget is not None
+    assert llm_client.hedge_budget.stats()["fired"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_holds_own_admission_slot(config):
+    """Тест что hedged-запрос занимает и освобождает собственный слот."""
+    config.openrouter_fallback_models = ["backup/model"]
+    config.llm_hedge_budget = 1.0
+    config.llm_hedge_default_delay = 0.01
+    config.llm_max_concurrent = 2
+    llm_client = LLMClient(config)
+    assert llm_client.admission is not None
+    in_flight: list[float] = []
+
+    async def create(**kwargs):
+        if kwargs["model"] == "test/model":
+            await asyncio.sleep(10)
+        in_flight.append(llm_client.admission.stats()["in_flight"])
+        return make_completion(kwargs["model"])
+
+    with patch.object(llm_client.client.chat.completions, "create", side_effect=create):
+        response = await llm_client.get_completion([{"role": "user", "content": "Test"}])
+
+    assert response.content == "backup/model"
+    assert in_flight == [2]
+    assert llm_client.admission.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_completion_busy_when_user_limit_reached(config):
+    """Тест что запрос сверх лимита пользователя отклоняется с LLMBusyError."""
+    config.llm_per_user_concurrency = 1
+    llm_client = LLMClient(config)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_create(**kwargs):
+        started.set()
+        await release.wait()
+        return make_completion("ok")
+
+    messages = [{"role": "user", "content": "Test"}]
+    with patch.object(llm_client.client.chat.completions, "create", side_effect=slow_create):
+        first = asyncio.create_task(llm_client.get_completion(messages, user_key=1))
+        await started.wait()
+
+        with pytest.raises(LLMBusyError):
+            await llm_client.get_completion(messages, user_key=1)
+
+        release.set()
+        assert (await first).content == "ok"
+
+    assert llm_client.admission is not None
+    assert llm_client.admission.stats()["rejected_user_limit"] == 1
+
+
 def test_llm_error_is_exception():
     """Тест что LLMError является исключением."""
     error = LLMError("Test error")
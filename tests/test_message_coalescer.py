@@ -0,0 +1,70 @@
+"""Тесты для MessageCoalescer."""
+
+import asyncio
+
+import pytest
+
+from src.message_coalescer import MessageCoalescer
+
+
+@pytest.mark.asyncio
+async def test_burst_returned_to_last_message() -> None:
+    """Тест что серию получает последнее сообщение, остальные - None."""
+    coalescer: MessageCoalescer[str] = MessageCoalescer(window=0.05)
+
+    async def send(text: str, delay: float) -> list[str] | None:
+        await asyncio.sleep(delay)
+        return await coalescer.collect("chat", text)
+
+    results = await asyncio.gather(send("a", 0), send("b", 0.01), send("c", 0.02))
+
+    assert results == [None, None, ["a", "b", "c"]]
+    assert coalescer.stats() == {"groups": 1, "merged": 2, "pending_keys": 0}
+
+
+@pytest.mark.asyncio
+async def test_pause_longer_than_window_splits_bursts() -> None:
+    """Тест что после паузы длиннее окна начинается новая серия."""
+    coalescer: MessageCoalescer[str] = MessageCoalescer(window=0.01)
+
+    assert await coalescer.collect("chat", "a") == ["a"]
+    assert await coalescer.collect("chat", "b") == ["b"]
+    assert coalescer.stats()["merged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_keys_are_independent() -> None:
+    """Тест что сообщения разных диалогов не объединяются."""
+    coalescer: MessageCoalescer[str] = MessageCoalescer(window=0.02)
+
+    results = await asyncio.gather(coalescer.collect(1, "a"), coalescer.collect(2, "b"))
+
+    assert results == [["a"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_last_message_drops_burst() -> None:
+    """Тест что отмена последнего сообщения не оставляет незавершенную серию."""
+    coalescer: MessageCoalescer[str] = MessageCoalescer(window=10)
+
+    task = asyncio.create_task(coalescer.collect("chat", "a"))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert coalescer.pending_keys == 0
+
+
+@pytest.mark.asyncio
+async def test_take_ends_burst_early() -> None:
+    """Тест что take() забирает серию, а ожидающие сообщения ее не обрабатывают."""
+    coalescer: MessageCoalescer[str] = MessageCoalescer(window=0.02)
+
+    pending = [asyncio.create_task(coalescer.collect("chat", item)) for item in "ab"]
+    await asyncio.sleep(0)
+
+    assert coalescer.take("chat") == ["a", "b"]
+    assert coalescer.take("chat") is None
+    assert await asyncio.gather(*pending) == [None, None]
+    assert coalescer.stats() == {"groups": 1, "merged": 1, "pending_keys": 0}
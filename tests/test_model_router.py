@@ -0,0 +1,103 @@
+"""Тесты для ModelRouter."""
+
+import random
+
+from src.model_router import ModelRouter
+
+
+def test_config_order_without_samples() -> None:
+    """Тест что без замеров модели идут в порядке конфигурации без дублей."""
+    router = ModelRouter(["primary", "backup", "primary"], explore_rate=0.0)
+
+    assert router.models == ["primary", "backup"]
+    assert router.order() == ["primary", "backup"]
+
+
+def test_fastest_model_first() -> None:
+    """Тест что модель с меньшим p50 идет первой после набора min_samples замеров."""
+    router = ModelRouter(["slow", "fast"], min_samples=3, explore_rate=0.0)
+    for _ in range(3):
+        router.record_success("slow", 2.0)
+        router.record_success("fast", 0.5)
+
+    assert router.order() == ["fast", "slow"]
+
+
+def test_unmeasured_model_after_measured() -> None:
+    """Тест что модель без достаточного числа замеров идет после измеренной."""
+    router = ModelRouter(["primary", "backup"], min_samples=2, explore_rate=0.0)
+    router.record_success("primary", 1.0)
+    router.record_success("backup", 3.0)
+    router.record_success("backup", 3.0)
+
+    assert router.order() == ["backup", "primary"]
+
+
+def test_unavailable_model_last() -> None:
+    """Тест что недоступная модель ставится в конец."""
+    router = ModelRouter(["primary", "backup"], explore_rate=0.0)
+
+    assert router.order(lambda model: model != "primary") == ["backup", "primary"]
+
+
+def test_window_keeps_recent_latencies() -> None:
+    """Тест что перцентили считаются по последним window замерам."""
+    router = ModelRouter(["model"], window=4, min_samples=4)
+    for latency in (9.0, 9.0, 9.0, 9.0, 0.1, 0.2, 0.3, 0.4):
+        router.record_success("model", latency)
+
+    assert router.percentile("model", 50) == 0.2
+    assert router.percentile("model", 95) == 0.4
+
+
+def test_stats() -> None:
+    """Тест метрик: счетчики и перцентили в миллисекундах."""
+    router = ModelRouter(["model", "other"], min_samples=1)
+    router.record_success("model", 0.25)
+    router.record_failure("model")
+
+    stats = router.stats()
+
+    assert stats["model"] == {
+        "successes": 1,
+        "failures": 1,
+        "explored": 0,
+        "p50_ms": 250.0,
+        "p95_ms": 250.0,
+    }
+    assert stats["other"]["p50_ms"] is None
+
+
+def test_explores_non_leading_model() -> None:
+    """Тест что часть запросов уходит отстающей модели и она может вернуть трафик."""
+    router = ModelRouter(
+        ["primary", "backup"], min_samples=3, explore_rate=0.1, rng=random.Random(1)
+    )
+    for _ in range(3):
+        router.record_success("primary", 5.0)
+        router.record_success("backup", 1.0)
+
+    leaders = [router.order()[0] for _ in range(1000)]
+
+    assert 50 <= leaders.count("primary") <= 150
+    assert router.stats()["primary"]["explored"] == leaders.count("primary")
+    assert router.leader() == "backup"
+
+    # Основная модель снова быстрая: ее окно обновляется запросами исследования
+    for _ in range(3):
+        router.record_success("primary", 0.2)
+    assert router.leader() == "primary"
+
+
+def test_does_not_explore_unavailable_model() -> None:
+    """Тест что исследование не отправляет запросы недоступной модели."""
+    router = ModelRouter(["primary", "backup"], explore_rate=1.0)
+
+    assert router.order(lambda model: model != "backup") == ["primary", "backup"]
+
+
+def test_explore_rate_zero_keeps_ranking() -> None:
+    """Тест что при explore_rate=0 порядок определяется только латентностью."""
+    router = ModelRouter(["primary", "backup"], explore_rate=0.0)
+
+    assert all(router.order() == ["primary", "backup"] for _ in range(100))
@@ -43,6 +43,8 @@ async def test_real_stat_collector_basic(database: Database) -> None:
     assert stats.messages.first_message_date is not None
     assert stats.messages.last_message_date is not None
     assert stats.messages.user_to_assistant_ratio >= 0
+    assert stats.messages.avg_tokens >= 0
+    assert stats.messages.total_tokens >= 0
 
 
 @pytest.mark.asyncio
@@ -69,7 +71,13 @@ async def test_real_stat_collector_with_data(database: Database) -> None:
     # Добавляем тестовые сообщения
     await database.add_message(test_chat_id, test_user_id, "user", "Привет!")
     await database.add_message(
-        test_chat_id, test_user_id, "assistant", "Здравствуйте!"
+        test_chat_id,
+        test_user_id,
+        "assistant",
+        "Здравствуйте!",
+        token_count=4,
+        prompt_tokens=30,
+        completion_tokens=4,
     )
 
     # Создаем сборщик и получаем статистику
@@ -96,6 +104,11 @@ async def test_real_stat_collector_with_data(database: Database) -> None:
     # Проверяем соотношение user/assistant
     assert stats.messages.user_to_assistant_ratio > 0
 
+    # Проверяем, что учтен расход токенов ответа
+    assert stats.messages.prompt_tokens >= 30
+    assert stats.messages.completion_tokens >= 4
+    assert stats.messages.total_tokens >= 4
+
 
 @pytest.mark.asyncio
 async def test_real_stat_collector_language_distribution(database: Database) -> None:
@@ -160,3 +173,148 @@ async def test_real_stat_collector_language_distribution(database: Database) ->
     assert stats.users.by_language["de"] >= 1
     assert stats.users.by_language["unknown"] >= 1
 
+
+@pytest.mark.asyncio
+async def test_real_stat_collector_windows_and_bots(database: Database) -> None:
+    """Тест окон 7/30 дней и исключения ботов из активных пользователей.
+
+    Сравниваются метрики до и после добавления данных, так как тестовая БД
+    общая для всех тестов.
+
+    Args:
+        database: Фикстура тестовой базы данных
+    """
+    human_id, bot_id, chat_id = 2001, 2002, 2003
+    for user_id, is_bot in ((human_id, False), (bot_id, True)):
+        await database.upsert_user(
+            user_id=user_id,
+            username=None,
+            first_name="Window",
+            last_name=None,
+            language_code="en",
+            is_premium=False,
+            is_bot=is_bot,
+        )
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("DELETE FROM messages WHERE user_id IN (%s, %s)", (human_id, bot_id))
+        await conn.commit()
+
+    collector = RealStatCollector(database)
+    before = await collector.get_dashboard_stats()
+
+    # Сообщение человека 20 дней назад и сообщение бота сегодня
+    await database.add_message(chat_id, human_id, "user", "old message")
+    await database.add_message(chat_id, bot_id, "user", "bot message")
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            "UPDATE messages SET created_at = NOW() - INTERVAL '20 days' WHERE user_id = %s",
+            (human_id,),
+        )
+        await conn.commit()
+
+    after = await collector.get_dashboard_stats()
+
+    assert after.overview.total_messages - before.overview.total_messages == 2
+    assert after.overview.messages_7d - before.overview.messages_7d == 1
+    assert after.overview.messages_30d - before.overview.messages_30d == 2
+    assert after.overview.active_users_7d == before.overview.active_users_7d
+    assert after.overview.active_users_30d - before.overview.active_users_30d == 1
+
+
+@pytest.mark.asyncio
+async def test_rollups_match_messages_after_changes(database: Database) -> None:
+    """Тест что дневные агрегаты совпадают с прямым подсчетом по messages и users.
+
+    Агрегаты поддерживаются триггерами, поэтому проверяются все виды изменений:
+    вставка, soft delete, изменение даты, удаление пользователя и смена языка.
+
+    Args:
+        database: Фикстура тестовой базы данных
+    """
+    chat_id = 3000
+    profiles = {3001: ("ru", True, False), 3002: ("en", False, False), 3003: (None, False, True)}
+    for user_id, (language_code, is_premium, is_bot) in profiles.items():
+        await database.upsert_user(
+            user_id=user_id,
+            username=None,
+            first_name="Rollup",
+            last_name=None,
+            language_code=language_code,
+            is_premium=is_premium,
+            is_bot=is_bot,
+        )
+        await database.add_message(chat_id, user_id, "user", f"hello from {user_id}")
+        await database.add_message(
+            chat_id,
+            user_id,
+            "assistant",
+            "answer",
+            token_count=2,
+            prompt_tokens=20,
+            completion_tokens=2,
+        )
+
+    await database.clear_history(chat_id, 3002)
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            "UPDATE messages SET created_at = created_at - INTERVAL '10 days' "
+            "WHERE user_id = 3001 AND role = 'user'"
+        )
+        await cur.execute("DELETE FROM users WHERE user_id = 3003")
+        await conn.commit()
+    await database.upsert_user(3002, None, "Rollup", None, "de", is_premium=False, is_bot=False)
+
+    stats = await RealStatCollector(database).get_dashboard_stats()
+
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            """
+            SELECT
+                COUNT(*) AS total_messages,
+                COUNT(*) FILTER (WHERE created_at::date > CURRENT_DATE - 7) AS messages_7d,
+                COUNT(*) FILTER (WHERE created_at::date > CURRENT_DATE - 30) AS messages_30d,
+                COALESCE(SUM(token_count), 0) AS total_tokens,
+                COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                COALESCE(SUM(completion_tokens), 0) AS completion_tokens
+            FROM messages
+            WHERE deleted_at IS NULL
+            """
+        )
+        expected = await cur.fetchone()
+        await cur.execute(
+            """
+            SELECT
+                COUNT(DISTINCT m.user_id) FILTER (
+                    WHERE m.created_at::date > CURRENT_DATE - 7
+                ) AS active_users_7d,
+                COUNT(DISTINCT m.user_id) AS active_users_30d
+            FROM messages m
+            JOIN users u ON u.user_id = m.user_id
+            WHERE m.deleted_at IS NULL AND m.role = 'user' AND u.is_bot = FALSE
+            AND m.created_at::date > CURRENT_DATE - 30
+            """
+        )
+        expected_active = await cur.fetchone()
+        await cur.execute(
+            """
+            SELECT COALESCE(language_code, 'unknown') AS lang, COUNT(*) AS count
+            FROM users
+            WHERE is_bot = FALSE
+            GROUP BY 1
+            """
+        )
+        expected_languages = {row["lang"]: row["count"] for row in await cur.fetchall()}
+
+    assert expected is not None
+    assert expected_active is not None
+    assert stats.overview.total_messages == expected["total_messages"]
+    assert stats.overview.messages_7d == expected["messages_7d"]
+    assert stats.overview.messages_30d == expected["messages_30d"]
+    assert stats.overview.active_users_7d == expected_active["active_users_7d"]
+    assert stats.overview.active_users_30d == expected_active["active_users_30d"]
+    assert stats.messages.total_tokens == expected["total_tokens"]
+    assert stats.messages.prompt_tokens == expected["prompt_tokens"]
+    assert stats.messages.completion_tokens == expected["completion_tokens"]
+    assert stats.overview.total_users == sum(expected_languages.values())
+    for lang in ("ru", "en", "de", "unknown"):
+        assert stats.users.by_language[lang] == expected_languages.get(lang, 0)
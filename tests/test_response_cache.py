@@ -0,0 +1,197 @@
+"""Тесты кеша ответов LLM (хранилища и использование в LLMClient)."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from openai import APITimeoutError
+
+from src.config import Config
+from src.database import Database
+from src.llm_client import LLMClient
+from src.response_cache import memory_backend, postgres_backend
+from src.response_cache.backend import ResponseCacheBackend
+from src.response_cache.memory_backend import MemoryResponseCache
+from src.response_cache.postgres_backend import PostgresResponseCache
+
+
+class FailingCache(ResponseCacheBackend):
+    """Хранилище, в котором любая операция завершается ошибкой."""
+
+    async def _load(self, key: str) -> str | None:
+        raise ConnectionError("storage is down")
+
+    async def _store(self, key: str, content: str, ttl: float) -> None:
+        raise ConnectionError("storage is down")
+
+
+def make_config(temperature: float = 0.0) -> Config:
+    """Тестовая конфигурация LLMClient."""
+    return Config(
+        telegram_bot_token="test_token",
+        openrouter_api_key="test_api_key",
+        openrouter_model="test/model",
+        system_prompt="Test prompt",
+        temperature=temperature,
+        llm_router_explore_rate=0.0,
+    )
+
+
+def make_completion(content: str) -> MagicMock:
+    """Ответ chat.completions.create с заданным текстом."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.usage = None
+    return response
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест вытеснения по LRU и устаревания записей по TTL."""
+    now = 1000.0
+    monkeypatch.setattr(memory_backend.time, "monotonic", lambda: now)
+    cache = MemoryResponseCache(max_entries=2)
+
+    await cache.set("a", "A", ttl=10)
+    await cache.set("b", "B", ttl=10)
+    assert await cache.get("a") == "A"
+    await cache.set("c", "C", ttl=10)
+
+    # "b" вытеснен как самый давно использованный
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "C"
+    assert cache.evictions == 1
+
+    now += 10
+    assert await cache.get("a") is None
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "stores": 3,
+        "errors": 0,
+        "hit_rate": 0.5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_storage_errors_do_not_fail_requests() -> None:
+    """Тест что ошибка хранилища считается промахом и не пробрасывается."""
+    cache = FailingCache()
+
+    await cache.set("a", "A", ttl=10)
+    assert await cache.get("a") is None
+    assert cache.errors == 2
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_postgres_cache_roundtrip_ttl_and_size_cap(
+    database: Database, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест чтения, устаревания и ограничения размера таблицы кеша."""
+    monkeypatch.setattr(postgres_backend, "PRUNE_INTERVAL", 3)
+    cache = PostgresResponseCache(database, max_entries=2)
+
+    await cache.set("a" * 64, "A", ttl=60)
+    await cache.set("b" * 64, "B", ttl=-1)
+    assert await cache.get("a" * 64) == "A"
+    assert await cache.get("b" * 64) is None
+
+    # Третья запись запускает очистку: устаревшая удаляется, остается не больше 2
+    await cache.set("c" * 64, "C", ttl=60)
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("SELECT cache_key FROM llm_response_cache ORDER BY cache_key")
+        keys = [row["cache_key"] for row in await cur.fetchall()]
+    assert keys == ["a" * 64, "c" * 64]
+
+
+@pytest.mark.asyncio
+async def test_llm_client_caches_deterministic_requests() -> None:
+    """Тест что при temperature=0 повторный запрос обслуживается из кеша."""
+    cache = MemoryResponseCache(max_entries=10)
+    llm_client = LLMClient(make_config(temperature=0.0), cache)
+    create = AsyncMock(return_value=make_completion("answer"))
+    messages = [{"role": "user", "content": "Test"}]
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        first = await llm_client.get_completion(messages, system_prompt="Prompt")
+        second = await llm_client.get_completion(messages, system_prompt="Prompt")
+        # Другой системный промпт - другой ключ
+        await llm_client.get_completion(messages, system_prompt="Other")
+        # Обход кеша
+        await llm_client.get_completion(messages, system_prompt="Prompt", cache=False)
+
+    assert first.content == second.content == "answer"
+    assert second.prompt_tokens is None
+    assert create.await_count == 3
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_client_caches_only_on_request_when_nondeterministic() -> None:
+    """Тест что при temperature>0 кеш используется только с cache=True."""
+    cache = MemoryResponseCache(max_entries=10)
+    llm_client = LLMClient(make_config(temperature=0.7), cache)
+    create = AsyncMock(return_value=make_completion("SELECT 1"))
+    messages = [{"role": "user", "content": "Сколько пользователей?"}]
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        await llm_client.get_response(messages)
+        await llm_client.get_response(messages)
+        assert create.await_count == 2
+
+        await llm_client.get_response(messages, cache=True)
+        assert await llm_client.get_response(messages, cache=True) == "SELECT 1"
+
+    assert create.await_count == 3
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_client_caches_answer_under_serving_model() -> None:
+    """Тест что ответ резервной модели кешируется под ее ключом, а не основной."""
+    config = make_config()
+    config.openrouter_fallback_models = ["backup/model"]
+    cache = MemoryResponseCache(max_entries=10)
+    llm_client = LLMClient(config, cache)
+    create = AsyncMock(
+        side_effect=[
+            APITimeoutError(request=MagicMock()),
+            make_completion("backup answer"),
+            make_completion("primary answer"),
+            make_completion("unused"),
+        ]
+    )
+    messages = [{"role": "user", "content": "Test"}]
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        assert await llm_client.get_response(messages) == "backup answer"
+        # Лидирует основная модель: ответ резервной под ее ключом не выдается
+        assert await llm_client.get_response(messages) == "primary answer"
+        assert await llm_client.get_response(messages) == "primary answer"
+
+    assert create.await_count == 3
+    assert cache.stores == 2
+
+
+@pytest.mark.asyncio
+async def test_llm_client_uses_cache_when_fallback_leads() -> None:
+    """Тест что кеш продолжает работать, когда маршрутизатор выбрал резервную модель."""
+    config = make_config()
+    config.openrouter_fallback_models = ["backup/model"]
+    cache = MemoryResponseCache(max_entries=10)
+    llm_client = LLMClient(config, cache)
+    for _ in range(llm_client.router.min_samples):
+        llm_client.router.record_success("test/model", 5.0)
+        llm_client.router.record_success("backup/model", 0.5)
+    create = AsyncMock(return_value=make_completion("backup answer"))
+    messages = [{"role": "user", "content": "Test"}]
+
+    with patch.object(llm_client.client.chat.completions, "create", create):
+        assert await llm_client.get_response(messages) == "backup answer"
+        assert await llm_client.get_response(messages) == "backup answer"
+
+    assert create.await_args is not None
+    assert create.await_args.kwargs["model"] == "backup/model"
+    assert create.await_count == 1
+    assert cache.hits == 1
@@ -0,0 +1,116 @@
+"""Тесты свертки изменений в дневные агрегаты статистики (RollupFolder)."""
+
+import asyncio
+
+import pytest
+
+from src.database import Database
+from src.stats.rollup_folder import RollupFolder
+
+
+async def count_deltas(database: Database) -> int:
+    """Количество несвернутых строк во всех таблицах *_delta."""
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            """
+            SELECT (SELECT COUNT(*) FROM message_stats_delta)
+                 + (SELECT COUNT(*) FROM user_activity_delta)
+                 + (SELECT COUNT(*) FROM user_language_delta) AS cnt
+            """
+        )
+        row = await cur.fetchone()
+    assert row is not None
+    return int(row["cnt"])
+
+
+async def today_user_messages(database: Database) -> int:
+    """Сообщения role = 'user' за сегодня в агрегате message_daily_stats."""
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute(
+            "SELECT COALESCE(SUM(message_count), 0) AS cnt FROM message_daily_stats "
+            "WHERE day = CURRENT_DATE AND role = 'user'"
+        )
+        row = await cur.fetchone()
+    assert row is not None
+    return int(row["cnt"])
+
+
+@pytest.mark.asyncio
+async def test_fold_moves_deltas_into_rollups(database: Database) -> None:
+    """Тест что запись только дописывает изменения, а fold переносит их в агрегаты."""
+    await database.upsert_user(4001, None, "Fold", None, "en", False, False)
+    await database.add_message(4000, 4001, "user", "first")
+    await database.add_message(4000, 4001, "user", "second")
+    await database.clear_history(4000, 4001)
+    folder = RollupFolder(database)
+
+    assert await count_deltas(database) > 0
+    assert await today_user_messages(database) == 0
+
+    await database.add_message(4000, 4001, "user", "third")
+    await folder.fold()
+
+    assert await count_deltas(database) == 0
+    assert await today_user_messages(database) == 1
+    async with database.connection() as conn, conn.cursor() as cur:
+        # День с сообщениями, удаленными и добавленными заново, остается один
+        await cur.execute("SELECT message_count FROM user_daily_activity WHERE user_id = 4001")
+        assert [row["message_count"] for row in await cur.fetchall()] == [1]
+
+
+@pytest.mark.asyncio
+async def test_fold_drops_emptied_activity_days(database: Database) -> None:
+    """Тест что день без сообщений пользователя удаляется из user_daily_activity."""
+    await database.upsert_user(4001, None, "Fold", None, "en", False, False)
+    await database.add_message(4000, 4001, "user", "hello")
+    folder = RollupFolder(database)
+    await folder.fold()
+
+    await database.clear_history(4000, 4001)
+    await folder.fold()
+
+    async with database.connection() as conn, conn.cursor() as cur:
+        await cur.execute("SELECT COUNT(*) AS cnt FROM user_daily_activity WHERE user_id = 4001")
+        row = await cur.fetchone()
+    assert row is not None
+    assert row["cnt"] == 0
+
+
+@pytest.mark.asyncio
+async def test_insert_does_not_wait_for_concurrent_insert(database: Database) -> None:
+    """Тест что вставки за один день не ждут друг друга на строке агрегата.
+
+    Пока первая транзакция не зафиксирована, вторая вставка того же дня и роли
+    должна завершиться: триггеры только дописывают строки в *_delta.
+    """
+    await database.upsert_user(4001, None, "Fold", None, "en", False, False)
+    await database.upsert_user(4002, None, "Fold", None, "en", False, False)
+
+    async with database.connection() as conn:
+        await conn.execute(
+            "INSERT INTO messages (chat_id, user_id, role, content, character_count) "
+            "VALUES (4000, 4001, 'user', 'open', 4)"
+        )
+        await asyncio.wait_for(database.add_message(4000, 4002, "user", "other"), timeout=5)
+        await conn.rollback()
+
+    await RollupFolder(database).fold()
+    assert await today_user_messages(database) == 1
+
+
+@pytest.mark.asyncio
+async def test_background_fold(database: Database) -> None:
+    """Тест что фоновая задача сворачивает изменения раз в interval."""
+    await database.upsert_user(4001, None, "Fold", None, "en", False, False)
+    await database.add_message(4000, 4001, "user", "hello")
+    folder = RollupFolder(database, interval=0.05)
+
+    folder.start()
+    try:
+        await asyncio.sleep(0.3)
+    finally:
+        await folder.stop()
+
+    assert folder.folds >= 1
+    assert await count_deltas(database) == 0
+    assert await today_user_messages(database) == 1
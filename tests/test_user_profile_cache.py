@@ -0,0 +1,129 @@
+"""Тесты для кеша отпечатков профилей UserProfileCache."""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.database import Database
+from src.user_profile_cache import UserProfileCache
+
+ROW = (1, "user", "Name", None, "ru", False, False)
+
+
+def test_unknown_user_is_not_fresh():
+    """Тест промаха для пользователя, профиль которого не записывался."""
+    cache = UserProfileCache(ttl=60.0)
+
+    assert cache.is_fresh(ROW) is False
+    assert cache.stats()["misses"] == 1
+
+
+def test_remembered_profile_is_fresh():
+    """Тест попадания для неизменившегося профиля."""
+    cache = UserProfileCache(ttl=60.0)
+    cache.remember(ROW)
+
+    assert cache.is_fresh(ROW) is True
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 0}
+
+
+def test_changed_profile_is_not_fresh():
+    """Тест промаха при изменении любого поля профиля."""
+    cache = UserProfileCache(ttl=60.0)
+    cache.remember(ROW)
+
+    assert cache.is_fresh((1, "user", "Name", None, "ru", True, False)) is False
+    # Устаревший отпечаток удален
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_profile_is_not_fresh():
+    """Тест устаревания отпечатка через ttl."""
+    cache = UserProfileCache(ttl=60.0)
+    cache.remember(ROW)
+
+    with patch("src.user_profile_cache.time.monotonic", return_value=time.monotonic() + 61):
+        assert cache.is_fresh(ROW) is False
+
+
+def test_invalidate_removes_profile():
+    """Тест удаления отпечатка."""
+    cache = UserProfileCache(ttl=60.0)
+    cache.remember(ROW)
+    cache.invalidate(1)
+
+    assert cache.is_fresh(ROW) is False
+
+
+def test_lru_eviction():
+    """Тест вытеснения давно использованного профиля при превышении max_entries."""
+    cache = UserProfileCache(ttl=60.0, max_entries=2)
+    cache.remember((1, "a", "A", None, None, False, False))
+    cache.remember((2, "b", "B", None, None, False, False))
+    assert cache.is_fresh((1, "a", "A", None, None, False, False)) is True
+
+    cache.remember((3, "c", "C", None, None, False, False))
+
+    assert cache.is_fresh((2, "b", "B", None, None, False, False)) is False
+    assert cache.is_fresh((1, "a", "A", None, None, False, False)) is True
+
+
+PROFILE = {
+    "user_id": 999000006,
+    "username": "same_user",
+    "first_name": "Same",
+    "last_name": None,
+    "language_code": "ru",
+    "is_premium": False,
+    "is_bot": False,
+}
+
+
+@pytest.mark.asyncio
+async def test_upsert_unchanged_profile_keeps_row(database: Database) -> None:
+    """Тест что UPSERT неизменившегося профиля не перезаписывает строку."""
+    await database.upsert_user(**PROFILE)
+    original_user = await database.get_user(PROFILE["user_id"])
+    assert original_user is not None
+
+    await database.upsert_user(**PROFILE)
+
+    user = await database.get_user(PROFILE["user_id"])
+    assert user is not None
+    assert user["updated_at"] == original_user["updated_at"]
+
+    await database.upsert_user(**{**PROFILE, "username": "renamed_user"})
+    user = await database.get_user(PROFILE["user_id"])
+    assert user is not None
+    assert user["username"] == "renamed_user"
+    assert user["updated_at"] > original_user["updated_at"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_skipped_by_profile_cache(database: Database, test_database_url: str) -> None:
+    """Тест что неизменившийся профиль не отправляется в БД повторно."""
+    cached = Database(test_database_url, timeout=10, user_profile_cache_ttl=60.0)
+    try:
+        await cached.upsert_user(**PROFILE)
+        # Строка изменена в обход процесса: пропущенный UPSERT ее не трогает
+        async with database.connection() as conn:
+            await conn.execute(
+                "UPDATE users SET username = 'external' WHERE user_id = %s",
+                (PROFILE["user_id"],),
+            )
+        await cached.upsert_user(**PROFILE)
+
+        assert cached.user_profiles is not None
+        assert cached.user_profiles.stats()["hits"] == 1
+        user = await database.get_user(PROFILE["user_id"])
+        assert user is not None
+        assert user["username"] == "external"
+
+        # Изменившийся профиль записывается
+        await cached.upsert_user(**{**PROFILE, "username": "renamed_user"})
+        user = await database.get_user(PROFILE["user_id"])
+        assert user is not None
+        assert user["username"] == "renamed_user"
+    finally:
+        await cached.close()
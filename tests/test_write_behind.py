@@ -0,0 +1,324 @@
+"""Тесты для буфера отложенной записи WriteBehindQueue."""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import psycopg
+import pytest
+import pytest_asyncio
+
+from src.database import Database
+from src.write_behind import MessageRow, UserRow, WriteBehindQueue
+
+
+class RecordingWriter:
+    """Writer, запоминающий записанные пакеты."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.batches: list[tuple[list[UserRow], list[MessageRow]]] = []
+        self.fail = fail
+
+    async def __call__(self, users: list[UserRow], messages: list[MessageRow]) -> None:
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append((users, messages))
+
+
+def make_message(chat_id: int = 1, user_id: int = 2, content: str = "text") -> MessageRow:
+    """Строка сообщения для тестов."""
+    return (chat_id, user_id, "assistant", content, len(content), None, None, None)
+
+
+def make_user(user_id: int = 2, first_name: str = "Test") -> UserRow:
+    """Строка пользователя для тестов."""
+    return (user_id, "user", first_name, None, "en", False, False)
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_users_and_messages_in_one_batch() -> None:
+    """Тест что flush пишет пользователей и сообщения одним пакетом."""
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(writer, flush_interval_ms=10_000, max_batch=100)
+
+    queue.upsert_user(make_user())
+    queue.add_message(make_message(content="a"))
+    queue.add_message(make_message(content="b"))
+    await queue.flush()
+
+    assert len(writer.batches) == 1
+    users, messages = writer.batches[0]
+    assert users == [make_user()]
+    assert [row[3] for row in messages] == ["a", "b"]
+    assert queue.pending_count == 0
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_user_upserts_are_coalesced_by_user_id() -> None:
+    """Тест что повторные профили одного пользователя схлопываются."""
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(writer, flush_interval_ms=10_000, max_batch=100)
+
+    queue.upsert_user(make_user(first_name="Old"))
+    queue.upsert_user(make_user(first_name="New"))
+    await queue.stop()
+
+    users, _ = writer.batches[0]
+    assert users == [make_user(first_name="New")]
+
+
+@pytest.mark.asyncio
+async def test_background_flush_after_interval() -> None:
+    """Тест что строки записываются фоновой задачей через flush_interval."""
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(writer, flush_interval_ms=20, max_batch=100)
+
+    queue.add_message(make_message())
+    await asyncio.sleep(0.1)
+
+    assert len(writer.batches) == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_triggers_early_flush() -> None:
+    """Тест что заполнение пакета запускает запись раньше интервала."""
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(writer, flush_interval_ms=10_000, max_batch=3)
+
+    for i in range(3):
+        queue.add_message(make_message(content=str(i)))
+    await asyncio.sleep(0.05)
+
+    assert len(writer.batches) == 1
+    assert len(writer.batches[0][1]) == 3
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_has_pending_by_chat_and_user() -> None:
+    """Тест проверки незаписанных строк по чату и пользователю."""
+    queue = WriteBehindQueue(RecordingWriter(), flush_interval_ms=10_000, max_batch=100)
+
+    queue.add_message(make_message(chat_id=1, user_id=2))
+
+    assert queue.has_pending(1, 2)
+    assert queue.has_pending(user_id=2)
+    assert not queue.has_pending(1, 3)
+    await queue.flush()
+    assert not queue.has_pending(1, 2)
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows() -> None:
+    """Тест что при ошибке записи строки остаются в буфере."""
+    writer = RecordingWriter(fail=True)
+    queue = WriteBehindQueue(writer, flush_interval_ms=10_000, max_batch=100)
+    queue.add_message(make_message())
+
+    with pytest.raises(RuntimeError):
+        await queue.flush()
+
+    assert queue.pending_count == 1
+    assert queue.has_pending(1, 2)
+    assert queue.failed_flushes == 1
+
+    writer.fail = False
+    await queue.stop()
+    assert len(writer.batches) == 1
+
+
+class BadRowWriter(RecordingWriter):
+    """Writer, который не может записать пакет с сообщением "bad"."""
+
+    async def __call__(self, users: list[UserRow], messages: list[MessageRow]) -> None:
+        if any(row[3] == "bad" for row in messages):
+            raise ValueError("bad row")
+        await super().__call__(users, messages)
+
+
+@pytest.mark.asyncio
+async def test_bad_row_does_not_block_other_rows() -> None:
+    """Тест что после ошибки пакета остальные строки записываются по одной."""
+    writer = BadRowWriter()
+    queue = WriteBehindQueue(writer, flush_interval_ms=10_000, max_batch=100)
+    queue.upsert_user(make_user())
+    queue.add_message(make_message(content="a"))
+    queue.add_message(make_message(chat_id=5, content="bad"))
+    queue.add_message(make_message(content="b"))
+
+    with pytest.raises(ValueError):
+        await queue.flush()
+
+    written = [row for _, messages in writer.batches for row in messages]
+    assert [row[3] for row in written] == ["a", "b"]
+    assert [users for users, _ in writer.batches if users] == [[make_user()]]
+    assert queue.pending_count == 1
+    assert not queue.has_pending(1, 2)
+    assert queue.has_pending(5, 2)
+
+
+@pytest.mark.asyncio
+async def test_row_dropped_after_max_retries() -> None:
+    """Тест что строка, не записавшаяся max_retries раз, удаляется из буфера."""
+    writer = BadRowWriter()
+    dropped: list[int] = []
+    queue = WriteBehindQueue(
+        writer,
+        flush_interval_ms=10_000,
+        max_batch=100,
+        max_retries=2,
+        on_user_dropped=dropped.append,
+    )
+    queue.add_message(make_message(content="bad"))
+
+    with pytest.raises(ValueError):
+        await queue.flush()
+    await queue.flush()
+
+    assert queue.pending_count == 0
+    assert queue.dropped_rows == 1
+    assert dropped == []
+
+    queue.add_message(make_message(content="c"))
+    await queue.stop()
+    assert [row[3] for _, messages in writer.batches for row in messages] == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_transient_error_keeps_retry_budget() -> None:
+    """Тест что временные ошибки не расходуют попытки записи строк."""
+    writer = RecordingWriter(fail=True)
+    queue = WriteBehindQueue(
+        writer,
+        flush_interval_ms=10_000,
+        max_batch=100,
+        max_retries=1,
+        transient_errors=(RuntimeError,),
+    )
+    queue.add_message(make_message())
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            await queue.flush()
+
+    assert queue.pending_count == 1
+    assert queue.dropped_rows == 0
+    writer.fail = False
+    await queue.stop()
+    assert len(writer.batches) == 1
+
+
+def test_is_full() -> None:
+    """Тест что буфер считается заполненным при max_pending строк."""
+    queue = WriteBehindQueue(RecordingWriter(), flush_interval_ms=10_000, max_batch=100)
+    queue.max_pending = 2
+    queue._messages = [(make_message(), 0)]
+
+    assert not queue.is_full
+    queue._users = {2: (make_user(), 0)}
+    assert queue.is_full
+
+
+@pytest_asyncio.fixture
+async def write_behind_database(
+    database: Database, test_database_url: str
+) -> AsyncIterator[Database]:
+    """Database с включенной отложенной записью (поверх схемы из фикстуры database)."""
+    db = Database(test_database_url, timeout=10, write_behind_interval_ms=10_000)
+    yield db
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_deferred_message_visible_in_history(write_behind_database: Database) -> None:
+    """Тест read-your-writes: отложенное сообщение видно в get_history того же чата."""
+    db = write_behind_database
+    await db.upsert_user(456, "user", "Test", None, "en", False, False)
+    await db.add_message(123, 456, "user", "Question")
+
+    await db.add_message(123, 456, "assistant", "Answer", defer=True)
+    assert db.write_behind is not None
+    assert db.write_behind.pending_count == 1
+
+    history = await db.get_history(123, 456)
+
+    assert [msg["content"] for msg in history] == ["Question", "Answer"]
+    assert db.write_behind.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_deferred_upsert_visible_in_get_user(write_behind_database: Database) -> None:
+    """Тест read-your-writes: отложенный профиль виден в get_user."""
+    db = write_behind_database
+
+    await db.upsert_user(456, "user", "Deferred", None, "en", False, False, defer=True)
+    user = await db.get_user(456)
+
+    assert user is not None
+    assert user["first_name"] == "Deferred"
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_deferred_writes(
+    write_behind_database: Database, database: Database
+) -> None:
+    """Тест что close() записывает все отложенные строки."""
+    db = write_behind_database
+    await db.upsert_user(456, "user", "Test", None, "en", False, False, defer=True)
+    await db.add_message(123, 456, "assistant", "Answer", defer=True)
+
+    await db.close()
+
+    history = await database.get_history(123, 456)
+    assert history == [{"role": "assistant", "content": "Answer"}]
+
+
+@pytest.mark.asyncio
+async def test_defer_ignored_without_write_behind(database: Database) -> None:
+    """Тест что без write-behind defer=True записывает сразу."""
+    await database.upsert_user(456, "user", "Test", None, "en", False, False, defer=True)
+    await database.add_message(123, 456, "user", "Hello", defer=True)
+
+    assert database.write_behind is None
+    assert len(await database.get_history(123, 456)) == 1
+
+
+@pytest.mark.asyncio
+async def test_unwritable_message_does_not_block_queue(
+    write_behind_database: Database,
+) -> None:
+    """Тест что сообщение с NUL байтом не мешает записи остальных строк."""
+    db = write_behind_database
+    await db.upsert_user(456, "user", "Test", None, "en", False, False)
+    await db.add_message(123, 456, "assistant", "Broken\x00", defer=True)
+    await db.add_message(124, 456, "assistant", "Answer", defer=True)
+
+    with pytest.raises(psycopg.DataError):
+        await db.flush()
+
+    assert await db.get_history(124, 456) == [{"role": "assistant", "content": "Answer"}]
+    assert db.write_behind is not None
+    assert db.write_behind.has_pending(123, 456)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_writes_synchronously(database: Database, test_database_url: str) -> None:
+    """Тест что при заполненном буфере строки пишутся сразу."""
+    db = Database(
+        test_database_url, timeout=10, write_behind_interval_ms=10_000, write_behind_max_pending=1
+    )
+    try:
+        await db.upsert_user(456, "user", "Test", None, "en", False, False)
+        await db.add_message(123, 456, "assistant", "First", defer=True)
+        await db.add_message(123, 456, "assistant", "Second", defer=True)
+
+        assert db.write_behind is not None
+        assert db.write_behind.pending_count == 0
+        assert [msg["content"] for msg in await database.get_history(123, 456)] == [
+            "First",
+            "Second",
+        ]
+    finally:
+        await db.close()